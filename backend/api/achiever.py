@@ -4,12 +4,15 @@ from pydantic import BaseModel
 from typing import Optional
 import psycopg2
 from psycopg2 import sql
-from datetime import date
+from datetime import date, datetime
 from config import CORS_ORIGINS, APP_TITLE
 from api.middleware import get_current_user
 from db_pool import get_db_connection
+from api.student import search_students
+from api.pagination import decode_cursor, encode_cursor, page_size, parse_fields, project, split_page
+from api.responses import FastJSONResponse
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -45,15 +48,36 @@ class AchieverUpdate(BaseModel):
 
 # ── Routes ──
 
+ACHIEVER_LIST_FIELDS = [
+    "id", "admissionNo", "name", "gender", "dob", "community", "academicYear", "course",
+    "board", "studentMobile", "aadharNumber", "emailId", "grade", "photo", "batch", "batchId",
+    "achievement", "achievementDetails", "rank", "score", "achievedDate",
+]
+
+
 @app.get("/api/achiever")
-async def get_all_achievers(current_user: dict = Depends(get_current_user)):
-    """Fetch all achievers with joined student + batch info."""
+async def get_all_achievers(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Fetch achievers with joined student + batch info, newest first.
+    Pass limit (and the returned next_cursor) to page, fields=a,b to trim the
+    response, include_total=true for the overall count.
+    """
+    selected_fields = parse_fields(fields, ACHIEVER_LIST_FIELDS)
+    after = decode_cursor(cursor, (datetime.fromisoformat, int)) if cursor else None
+    limit = page_size(limit) if limit is not None else None
+
     conn = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
 
-        cursor.execute("""
+        query = """
             SELECT
                 a.achievement_id,
                 s.student_id,
@@ -83,11 +107,23 @@ async def get_all_achievers(current_user: dict = Depends(get_current_user)):
             FROM achievers a
             JOIN student s ON a.student_no = s.student_no
             LEFT JOIN batch b ON a.batch_id = b.batch_id
-            ORDER BY a.created_at DESC;
-        """)
-
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
+        """
+        params = []
+        if after:
+            query += " WHERE (a.created_at, a.achievement_id) < (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY a.created_at DESC, a.achievement_id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        db_cursor.execute(query, params)
+        rows, has_more = split_page(db_cursor.fetchall(), limit)
+        columns = [desc[0] for desc in db_cursor.description]
+        next_cursor = None
+        if has_more:
+            last = dict(zip(columns, rows[-1]))
+            next_cursor = encode_cursor((last["created_at"], last["achievement_id"]))
 
         achievers = []
         for row in rows:
@@ -122,8 +158,21 @@ async def get_all_achievers(current_user: dict = Depends(get_current_user)):
                 "achievedDate": record.get("achieved_date") or "",
             })
 
-        return {"achievers": achievers, "total": len(achievers)}
+        total = len(achievers)
+        if limit is not None:
+            total = None
+            if include_total:
+                db_cursor.execute("SELECT COUNT(*) FROM achievers a JOIN student s ON a.student_no = s.student_no")
+                total = db_cursor.fetchone()[0]
+
+        return {
+            "achievers": project(achievers, selected_fields),
+            "total": total,
+            "next_cursor": next_cursor,
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
@@ -207,44 +256,7 @@ async def search_students_for_achiever(
             return {"students": [], "total": 0}
 
         limit = max(1, min(limit, 50))
-
-        cursor.execute("""
-            SELECT
-                s.student_id,
-                s.student_name,
-                s.grade,
-                s.course,
-                s.board,
-                s.photo_url,
-                s.batch_id,
-                b.batch_name,
-                b.start_year,
-                b.end_year
-            FROM student s
-            LEFT JOIN batch b ON b.batch_id = s.batch_id
-            WHERE LOWER(s.student_id) LIKE LOWER(%s)
-            ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
-                s.student_name ASC
-            LIMIT %s
-        """, (f"%{q}%", limit))
-
-        rows = cursor.fetchall()
-        students = []
-        for row in rows:
-            students.append({
-                "student_id": row[0],
-                "student_name": row[1],
-                "grade": row[2],
-                "course": row[3],
-                "board": row[4],
-                "photo_url": row[5],
-                "batch_id": row[6],
-                "batch_name": row[7],
-                "academic_year": f"{row[8]}-{row[9]}" if row[8] and row[9] else "",
-            })
+        students = search_students(cursor, q, limit, include_names=False)
 
         return {"students": students, "total": len(students)}
     except Exception as e:
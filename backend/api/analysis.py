@@ -6,12 +6,16 @@ import psycopg2
 from psycopg2 import sql
 from datetime import date, datetime
 from collections import defaultdict
+from itertools import chain, groupby
 import math
 from config import CORS_ORIGINS, APP_TITLE
 from api.middleware import get_current_user
-from db_pool import get_db_connection
+from db_pool import get_db_connection, prepared_statement
+from api.pagination import decode_cursor, encode_cursor, page_size, parse_fields, project, split_page
+from api.query_builder import Filters, daily_score_sql, mock_subject_score_sql, mock_total_score_sql, normalized_subject_sql
+from api.responses import FastJSONResponse, ReleasingStreamingResponse, dumps
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -30,6 +34,12 @@ def safe_numeric_cast(column):
     return f"CASE WHEN {column} ~ '^-?[0-9]+(\\.[0-9]+)?$' THEN {column}::NUMERIC ELSE NULL END"
 
 
+def mock_subject_order(subject_key: str):
+    """Sort key listing the standard mock subjects first, then any others alphabetically"""
+    keys = list(MOCK_SUBJECT_CONFIG)
+    return (keys.index(subject_key), "") if subject_key in keys else (len(keys), subject_key)
+
+
 # Helper: Python function to safely parse a mark value
 def safe_parse_mark(value):
     """Parse a mark value to a number, returning None for non-numeric values like 'A', '-'."""
@@ -214,10 +224,6 @@ def normalize_subject_key(value: str) -> str:
     return label.strip().lower()
 
 
-def normalized_subject_sql(column: str) -> str:
-    return f"CASE WHEN LOWER(TRIM({column})) IN ('maths', 'mathematics') THEN 'mathematics' ELSE LOWER(TRIM({column})) END"
-
-
 
 # ==================== FILTER OPTIONS ENDPOINTS ====================
 
@@ -290,269 +296,380 @@ async def get_filter_options(current_user: dict = Depends(get_current_user)):
 
 # ==================== SUBJECTWISE ANALYSIS ====================
 
-@app.get("/api/analysis/subjectwise")
-async def get_subjectwise_analysis(
+# Rows fetched per round trip by the named cursors of the streaming mode
+STREAM_ITERSIZE = 2000
+
+
+def subjectwise_daily_query(grade, admission_number, batch_id, subject, from_date, to_date):
+    """Unit test rows with student info (without ORDER BY)"""
+    filters = (
+        Filters()
+        .roster(grade, admission_number, batch_id)
+        .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        .date_range("dt.test_date", from_date, to_date)
+    )
+    query = f"""
+        SELECT
+            s.student_id,
+            s.student_name,
+            s.grade,
+            b.batch_name,
+            dt.subject,
+            dt.unit_name,
+            dt.total_marks,
+            dt.test_date,
+            s.sort_key
+        FROM daily_test dt
+        JOIN student s ON dt.student_no = s.student_no
+        JOIN batch b ON s.batch_id = b.batch_id
+        WHERE {filters.sql}
+    """
+    return query, filters.params
+
+
+def subjectwise_mock_query(grade, admission_number, batch_id, from_date, to_date):
+    """Monthly test average per student and subject (without ORDER BY)"""
+    filters = Filters().roster(grade, admission_number, batch_id).date_range("mt.test_date", from_date, to_date)
+    query = f"""
+        SELECT
+            s.student_id,
+            s.student_name,
+            sm.subject_key,
+            AVG({mock_subject_score_sql()}) AS avg_score,
+            s.sort_key
+        FROM mock_test mt
+        JOIN mock_test_subject_mark sm ON sm.test_id = mt.test_id
+        JOIN student s ON mt.student_no = s.student_no
+        JOIN batch b ON s.batch_id = b.batch_id
+        WHERE {filters.sql}
+        GROUP BY s.student_id, s.sort_key, s.student_name, sm.subject_key
+    """
+    return query, filters.params
+
+
+def daily_subjects(student_rows) -> dict:
+    """Unit tests of one student grouped by subject, with running mark totals"""
+    subjects = {}
+    for row in student_rows:
+        subj = normalize_subject_label(row[4]) if row[4] else row[4]
+        if subj not in subjects:
+            subjects[subj] = {
+                "tests": [],
+                "total_marks": 0,
+                "count": 0
+            }
+        subjects[subj]["tests"].append({
+            "unit_name": row[5],
+            "marks": row[6],
+            "date": row[7]
+        })
+        numeric_mark = safe_parse_mark(row[6])
+        if numeric_mark is not None:
+            subjects[subj]["total_marks"] += numeric_mark
+            subjects[subj]["count"] += 1
+    return subjects
+
+
+def mock_averages(student_rows) -> dict:
+    averages = {key: None for key in MOCK_SUBJECT_CONFIG}
+    for row in student_rows:
+        if row[3] is not None:
+            averages[row[2]] = round(float(row[3]), 1)
+    return averages
+
+
+def add_subject_stats(acc: dict, subjects: dict):
+    """Fold one student's daily_subjects() into the running per-subject statistics"""
+    for subj, subj_data in subjects.items():
+        stats = acc.setdefault(subj, {"sum": 0, "students": 0, "top": None, "lowest": None, "count": 0})
+        stats["count"] += subj_data["count"]
+        if subj_data["count"] > 0:
+            avg_score = subj_data["total_marks"] / subj_data["count"]
+            stats["sum"] += avg_score
+            stats["students"] += 1
+            stats["top"] = avg_score if stats["top"] is None else max(stats["top"], avg_score)
+            stats["lowest"] = avg_score if stats["lowest"] is None else min(stats["lowest"], avg_score)
+
+
+def subject_stats_summary(acc: dict) -> dict:
+    """Average / top / lowest of the per-student unit test averages of each subject"""
+    stats_summary = {}
+    for subj, stats in acc.items():
+        if stats["students"]:
+            stats_summary[subj] = {
+                "average": round(stats["sum"] / stats["students"], 1),
+                "top_score": round(stats["top"], 1),
+                "lowest": round(stats["lowest"], 1),
+                "total_tests": stats["count"],
+                "total_students": stats["students"]
+            }
+    return stats_summary
+
+
+def subjectwise_payload(
+    cursor,
     grade: Optional[str] = None,
     admission_number: Optional[str] = None,
     batch_id: Optional[int] = None,
     subject: Optional[str] = None,
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
-):
+    columnar: bool = False
+) -> dict:
     """
-    Get subjectwise analysis data with filters.
-    Returns unit test performance grouped by subject for each student.
+    Unit test performance grouped by subject for each student, plus monthly
+    test averages and per-subject summary statistics.
+    columnar=True returns the same data as parallel arrays (see columnar_subjectwise).
     """
-    conn = None
-    cursor = None
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    query, params = subjectwise_daily_query(grade, admission_number, batch_id, subject, from_date, to_date)
+    cursor.execute(query + " ORDER BY s.sort_key, s.student_name ASC, dt.subject, dt.test_date", params)
+    rows = cursor.fetchall()
+
+    query, params = subjectwise_mock_query(grade, admission_number, batch_id, from_date, to_date)
+    cursor.execute(query + " ORDER BY s.sort_key, s.student_id", params)
+    mock_rows = cursor.fetchall()
+
+    # Aggregate unit test data per student per subject
+    student_daily = {}
+    for sid, student_rows in groupby(rows, key=lambda row: row[0]):
+        student_rows = list(student_rows)
+        first = student_rows[0]
+        student_daily[sid] = {
+            "student_id": first[0],
+            "student_name": first[1],
+            "grade": first[2],
+            "batch": first[3],
+            "subjects": daily_subjects(student_rows)
+        }
 
-        # Build the query for unit test data with student info
-        query = """
-            SELECT
-                s.student_id,
-                s.student_name,
-                s.grade,
-                b.batch_name,
-                dt.subject,
-                dt.unit_name,
-                dt.total_marks,
-                dt.test_date
-            FROM daily_test dt
-            JOIN student s ON dt.student_no = s.student_no
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE 1=1
-        """
-        params = []
+    # Monthly test averages per student
+    student_mock = {}
+    for student_id, student_rows in groupby(mock_rows, key=lambda row: row[0]):
+        student_rows = list(student_rows)
+        student_mock[student_id] = {
+            "student_name": student_rows[0][1],
+            "averages": mock_averages(student_rows)
+        }
 
-        if grade:
-            query += " AND s.grade = %s"
-            params.append(grade)
+    stats = {}
+    for data in student_daily.values():
+        add_subject_stats(stats, data["subjects"])
+    stats_summary = subject_stats_summary(stats)
+    if columnar:
+        return columnar_subjectwise(rows, student_daily, student_mock, stats_summary)
+
+    # Build combined student-level results
+    all_student_ids = set(list(student_daily.keys()) + list(student_mock.keys()))
+    results = []
+
+    for sid in all_student_ids:
+        daily = student_daily.get(sid, {})
+        mock = student_mock.get(sid, {})
+
+        student_result = {
+            "student_id": sid,
+            "student_name": daily.get("student_name") or mock.get("student_name", ""),
+            "grade": daily.get("grade", ""),
+            "batch": daily.get("batch", ""),
+            "daily_tests": daily.get("subjects", {}),
+        }
 
-        if admission_number:
-            query += " AND s.student_id ILIKE %s"
-            params.append(f"%{admission_number}%")
+        # Add monthly test averages
+        student_result["mock_averages"] = mock["averages"] if mock else None
 
-        if batch_id:
-            query += " AND s.batch_id = %s"
-            params.append(batch_id)
+        results.append(student_result)
 
-        if subject:
-            query += f" AND {normalized_subject_sql('dt.subject')} = %s"
-            params.append(normalize_subject_key(subject))
+    return {
+        "students": results,
+        "subject_stats": stats_summary,
+        "total_students": len(results)
+    }
 
-        if from_date:
-            query += " AND dt.test_date >= %s"
-            params.append(from_date)
 
-        if to_date:
-            query += " AND dt.test_date <= %s"
-            params.append(to_date)
+def columnar_subjectwise(rows: list, student_daily: dict, student_mock: dict, stats_summary: dict) -> dict:
+    """
+    Subjectwise analysis as parallel arrays instead of one nested object per
+    test. Subject, unit and date strings are stored once in lookup tables;
+    tests refer to them (and to the student) by index:
 
-        query += """
-            ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
-                s.student_name ASC,
-                dt.subject,
-                dt.test_date
-        """
+        tests.subject[i] -> subjects[...], tests.unit[i] -> units[...],
+        tests.date[i] -> dates[...], tests.student[i] -> students.*[...]
 
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        # Also get monthly test data for subject-level marks
-        mock_query = """
-            SELECT
-                s.student_id,
-                s.student_name,
-                s.grade,
-                b.batch_name,
-                mt.maths_marks,
-                mt.physics_marks,
-                mt.chemistry_marks,
-                mt.biology_marks,
-                mt.total_marks,
-                mt.maths_total_marks,
-                mt.physics_total_marks,
-                mt.chemistry_total_marks,
-                mt.biology_total_marks,
-                mt.test_total_marks,
-                mt.test_date
-            FROM mock_test mt
-            JOIN student s ON mt.student_no = s.student_no
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE 1=1
-        """
-        mock_params = []
+    students.mock_averages holds one array per mock subject, aligned with
+    students.student_id.
+    """
+    def interner(table: list):
+        index = {}
+
+        def intern(value):
+            if value not in index:
+                index[value] = len(table)
+                table.append(value)
+            return index[value]
+        return intern
+
+    subjects, units, dates = [], [], []
+    subject_idx, unit_idx, date_idx = interner(subjects), interner(units), interner(dates)
+
+    # Students in roster order, then students that only have monthly tests
+    student_ids = list(student_daily.keys()) + [sid for sid in student_mock if sid not in student_daily]
+    student_idx = {sid: i for i, sid in enumerate(student_ids)}
+
+    students = {
+        "student_id": student_ids,
+        "student_name": [],
+        "grade": [],
+        "batch": [],
+        "mock_averages": {key: [] for key in MOCK_SUBJECT_CONFIG},
+    }
+    for sid in student_ids:
+        daily = student_daily.get(sid, {})
+        mock = student_mock.get(sid)
+        students["student_name"].append(daily.get("student_name") or (mock or {}).get("student_name", ""))
+        students["grade"].append(daily.get("grade", ""))
+        students["batch"].append(daily.get("batch", ""))
+        for key in MOCK_SUBJECT_CONFIG:
+            students["mock_averages"][key].append(mock["averages"][key] if mock else None)
+
+    tests = {"student": [], "subject": [], "unit": [], "date": [], "marks": []}
+    for row in rows:
+        tests["student"].append(student_idx[row[0]])
+        tests["subject"].append(subject_idx(normalize_subject_label(row[4]) if row[4] else row[4]))
+        tests["unit"].append(unit_idx(row[5]))
+        tests["date"].append(date_idx(row[7]))
+        tests["marks"].append(row[6])
+
+    return {
+        "format": "columnar",
+        "subjects": subjects,
+        "units": units,
+        "dates": dates,
+        "students": students,
+        "tests": tests,
+        "subject_stats": stats_summary,
+        "total_students": len(student_ids)
+    }
+
+
+def iter_subjectwise(conn, grade, admission_number, batch_id, subject, from_date, to_date):
+    """
+    Streaming counterpart of subjectwise_payload: yields one
+    {"type": "student", ...} record per student, then a {"type": "summary"}
+    record with the subject statistics.
 
-        if grade:
-            mock_query += " AND s.grade = %s"
-            mock_params.append(grade)
+    Unit test rows and monthly test averages come through one server-side
+    cursor, ordered by student, so only the current student's rows are held
+    in memory.
+    """
+    daily_query, daily_params = subjectwise_daily_query(grade, admission_number, batch_id, subject, from_date, to_date)
+    mock_query, mock_params = subjectwise_mock_query(grade, admission_number, batch_id, from_date, to_date)
+    cursor = conn.cursor(name="subjectwise_stream")
+    cursor.itersize = STREAM_ITERSIZE
+    cursor.execute(f"""
+        SELECT 'daily' AS kind, d.student_id, d.student_name, d.grade, d.batch_name,
+               d.subject, d.unit_name, d.total_marks, d.test_date, NULL::NUMERIC AS avg_score, d.sort_key
+        FROM ({daily_query}) d
+        UNION ALL
+        SELECT 'mock', m.student_id, m.student_name, NULL, NULL,
+               m.subject_key, NULL, NULL, NULL, m.avg_score, m.sort_key
+        FROM ({mock_query}) m
+        ORDER BY sort_key, student_id, kind, subject, test_date
+    """, daily_params + mock_params)
+
+    stats = {}
+    total_students = 0
+    for student_id, student_rows in groupby(cursor, key=lambda row: row[1]):
+        daily_rows, mock_rows = [], []
+        for row in student_rows:
+            if row[0] == "daily":
+                daily_rows.append(row[1:])
+            else:
+                mock_rows.append((row[1], row[2], row[5], row[9]))
 
-        if admission_number:
-            mock_query += " AND s.student_id ILIKE %s"
-            mock_params.append(f"%{admission_number}%")
+        subjects = daily_subjects(daily_rows)
+        add_subject_stats(stats, subjects)
+        first = daily_rows[0] if daily_rows else None
+        yield {
+            "type": "student",
+            "student_id": student_id,
+            "student_name": (first[1] if first else None) or (mock_rows[0][1] if mock_rows else ""),
+            "grade": first[2] if first else "",
+            "batch": first[3] if first else "",
+            "daily_tests": subjects,
+            "mock_averages": mock_averages(mock_rows) if mock_rows else None,
+        }
+        total_students += 1
 
-        if batch_id:
-            mock_query += " AND s.batch_id = %s"
-            mock_params.append(batch_id)
+    cursor.close()
+    yield {
+        "type": "summary",
+        "subject_stats": subject_stats_summary(stats),
+        "total_students": total_students
+    }
 
-        if from_date:
-            mock_query += " AND mt.test_date >= %s"
-            mock_params.append(from_date)
 
-        if to_date:
-            mock_query += " AND mt.test_date <= %s"
-            mock_params.append(to_date)
+def ndjson_response(conn, records) -> ReleasingStreamingResponse:
+    """
+    Stream records (an iterator of dicts) as newline-delimited JSON. The
+    connection is returned to the pool once the response ends, even when the
+    client goes away before the first line.
+    """
+    return ReleasingStreamingResponse(
+        (dumps(record) + b"\n" for record in records),
+        release=conn.close,
+        media_type="application/x-ndjson",
+    )
 
-        mock_query += """
-            ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
-                s.student_name ASC,
-                mt.test_date
-        """
-        cursor.execute(mock_query, mock_params)
-        mock_rows = cursor.fetchall()
 
-        # Aggregate unit test data per student per subject
-        student_daily = {}
-        for row in rows:
-            sid = row[0]
-            if sid not in student_daily:
-                student_daily[sid] = {
-                    "student_id": row[0],
-                    "student_name": row[1],
-                    "grade": row[2],
-                    "batch": row[3],
-                    "subjects": {}
-                }
-            subj = normalize_subject_label(row[4]) if row[4] else row[4]
-            if subj not in student_daily[sid]["subjects"]:
-                student_daily[sid]["subjects"][subj] = {
-                    "tests": [],
-                    "total_marks": 0,
-                    "count": 0
-                }
-            student_daily[sid]["subjects"][subj]["tests"].append({
-                "unit_name": row[5],
-                "marks": row[6],
-                "date": row[7].isoformat() if row[7] else None
-            })
-            numeric_mark = safe_parse_mark(row[6])
-            if numeric_mark is not None:
-                student_daily[sid]["subjects"][subj]["total_marks"] += numeric_mark
-                student_daily[sid]["subjects"][subj]["count"] += 1
-
-        # Aggregate monthly test data per student
-        student_mock = {}
-        for row in mock_rows:
-            sid = row[0]
-            if sid not in student_mock:
-                student_mock[sid] = {
-                    "student_id": row[0],
-                    "student_name": row[1],
-                    "maths_total": 0,
-                    "maths_count": 0,
-                    "physics_total": 0,
-                    "physics_count": 0,
-                    "chemistry_total": 0,
-                    "chemistry_count": 0,
-                    "biology_total": 0,
-                    "biology_count": 0
-                }
+@app.get("/api/analysis/subjectwise")
+async def get_subjectwise_analysis(
+    grade: Optional[str] = None,
+    admission_number: Optional[str] = None,
+    batch_id: Optional[int] = None,
+    subject: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    format: str = "nested",
+    stream: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get subjectwise analysis data with filters.
+    Returns unit test performance grouped by subject for each student.
+    format=columnar returns parallel arrays with interned subject/unit/date
+    tables, a much smaller payload for whole-grade queries.
+    stream=true returns NDJSON, one student per line followed by a summary
+    line; meant for whole-institute queries without a batch_id filter.
+    """
+    if format not in ("nested", "columnar"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be 'nested' or 'columnar'"
+        )
+    if stream and format != "nested":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="stream is only available with format=nested"
+        )
 
-            m_maths = safe_parse_mark(row[4])
-            m_physics = safe_parse_mark(row[5])
-            m_chemistry = safe_parse_mark(row[6])
-            m_biology = safe_parse_mark(row[7])
-
-            t_maths = safe_parse_mark(row[9])
-            t_physics = safe_parse_mark(row[10])
-            t_chemistry = safe_parse_mark(row[11])
-            t_biology = safe_parse_mark(row[12])
-
-            maths_score = (m_maths * 100 / t_maths) if (m_maths is not None and t_maths and t_maths > 0) else m_maths
-            physics_score = (m_physics * 100 / t_physics) if (m_physics is not None and t_physics and t_physics > 0) else m_physics
-            chemistry_score = (m_chemistry * 100 / t_chemistry) if (m_chemistry is not None and t_chemistry and t_chemistry > 0) else m_chemistry
-            biology_score = (m_biology * 100 / t_biology) if (m_biology is not None and t_biology and t_biology > 0) else m_biology
-
-            if m_maths is not None:
-                student_mock[sid]["maths_total"] += maths_score
-                student_mock[sid]["maths_count"] += 1
-            if m_physics is not None:
-                student_mock[sid]["physics_total"] += physics_score
-                student_mock[sid]["physics_count"] += 1
-            if m_chemistry is not None:
-                student_mock[sid]["chemistry_total"] += chemistry_score
-                student_mock[sid]["chemistry_count"] += 1
-            if m_biology is not None:
-                student_mock[sid]["biology_total"] += biology_score
-                student_mock[sid]["biology_count"] += 1
-
-        # Build combined student-level results
-        all_student_ids = set(list(student_daily.keys()) + list(student_mock.keys()))
-        results = []
-
-        for sid in all_student_ids:
-            daily = student_daily.get(sid, {})
-            mock = student_mock.get(sid, {})
-
-            student_result = {
-                "student_id": sid,
-                "student_name": daily.get("student_name") or mock.get("student_name", ""),
-                "grade": daily.get("grade", ""),
-                "batch": daily.get("batch", ""),
-                "daily_tests": daily.get("subjects", {}),
-            }
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        if stream:
+            records = iter_subjectwise(conn, grade, admission_number, batch_id, subject, from_date, to_date)
+            # Run the query now so errors surface as a 500 rather than a truncated stream
+            first = next(records)
+            response = ndjson_response(conn, chain([first], records))
+            conn = None
+            return response
 
-            # Add monthly test averages
-            if mock:
-                student_result["mock_averages"] = {
-                    "maths": round(mock["maths_total"] / mock["maths_count"], 1) if mock.get("maths_count", 0) > 0 else None,
-                    "physics": round(mock["physics_total"] / mock["physics_count"], 1) if mock.get("physics_count", 0) > 0 else None,
-                    "chemistry": round(mock["chemistry_total"] / mock["chemistry_count"], 1) if mock.get("chemistry_count", 0) > 0 else None,
-                    "biology": round(mock["biology_total"] / mock["biology_count"], 1) if mock.get("biology_count", 0) > 0 else None,
-                }
-            else:
-                student_result["mock_averages"] = None
-
-            results.append(student_result)
-
-        # Calculate overall subject statistics
-        subject_stats = {}
-        for sid, data in student_daily.items():
-            for subj, subj_data in data["subjects"].items():
-                if subj not in subject_stats:
-                    subject_stats[subj] = {"scores": [], "count": 0}
-                avg_score = subj_data["total_marks"] / subj_data["count"] if subj_data["count"] > 0 else None
-                if avg_score is not None:
-                    subject_stats[subj]["scores"].append(avg_score)
-                subject_stats[subj]["count"] += subj_data["count"]
-
-        stats_summary = {}
-        for subj, data in subject_stats.items():
-            scores = data["scores"]
-            if scores:
-                stats_summary[subj] = {
-                    "average": round(sum(scores) / len(scores), 1),
-                    "top_score": round(max(scores), 1),
-                    "lowest": round(min(scores), 1),
-                    "total_tests": data["count"],
-                    "total_students": len(scores)
-                }
+        cursor = conn.cursor()
 
-        return {
-            "students": results,
-            "subject_stats": stats_summary,
-            "total_students": len(results)
-        }
+        return FastJSONResponse(subjectwise_payload(
+            cursor, grade, admission_number, batch_id, subject, from_date, to_date,
+            columnar=(format == "columnar")
+        ))
 
     except HTTPException:
         raise
@@ -570,6 +687,201 @@ async def get_subjectwise_analysis(
 
 # ==================== BOARDWISE ANALYSIS ====================
 
+def boardwise_summaries(cursor, grade, admission_number, batch_id, subject, from_date, to_date) -> list:
+    """
+    Unit test and monthly test aggregates of each board.
+
+    One query scores every unit test mark, monthly test subject mark and
+    monthly test total into a single (board, kind, subject_key) stream read
+    from the normalized mock_test_subject_mark rows, so no per-subject CASE
+    is needed. Monthly test totals use an empty subject_key.
+    """
+    student_filters = Filters("s.board IS NOT NULL").roster(grade, admission_number, batch_id)
+    daily_filters = (
+        Filters("dt.student_no IN (SELECT student_no FROM students)")
+        .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        .date_range("dt.test_date", from_date, to_date)
+    )
+    mock_filters = Filters("mt.student_no IN (SELECT student_no FROM students)").date_range("mt.test_date", from_date, to_date)
+
+    # Each source is reduced to per-student partials first (hash aggregates
+    # with good estimates), so the board totals only combine a few rows per
+    # student and need no COUNT(DISTINCT). OFFSET 0 keeps each mark's
+    # safe_numeric() to one call instead of one per aggregate
+    partials = """
+        SUM(score) AS score_sum, COUNT(score) AS score_count,
+        MAX(score) AS max_score, MIN(score) AS min_score, COUNT(*) AS row_count
+    """
+    mock_score = "CASE WHEN total_marks > 0 THEN marks * 100.0 / total_marks ELSE marks END"
+    query = f"""
+        WITH students AS (
+            SELECT s.student_no, s.board
+            FROM student s
+            JOIN batch b ON s.batch_id = b.batch_id
+            WHERE {student_filters.sql}
+        ),
+        partials AS (
+            SELECT student_no, 'daily' AS kind, subject_key, {partials}
+            FROM (
+                SELECT dt.student_no, dt.subject_key, safe_numeric(dt.total_marks) AS score
+                FROM daily_test dt
+                WHERE {daily_filters.sql}
+                OFFSET 0
+            ) daily_scores
+            GROUP BY student_no, subject_key
+            UNION ALL
+            SELECT student_no, 'mock', subject_key, {partials}
+            FROM (
+                SELECT student_no, subject_key, {mock_score} AS score
+                FROM (
+                    SELECT mt.student_no, sm.subject_key, safe_numeric(sm.marks) AS marks, sm.total_marks
+                    FROM mock_test mt
+                    JOIN mock_test_subject_mark sm ON sm.test_id = mt.test_id AND sm.test_date = mt.test_date
+                    WHERE {mock_filters.sql}
+                    OFFSET 0
+                ) subject_marks
+            ) subject_scores
+            GROUP BY student_no, subject_key
+            UNION ALL
+            SELECT student_no, 'mock', '', {partials}
+            FROM (
+                SELECT student_no, {mock_score} AS score
+                FROM (
+                    SELECT mt.student_no, safe_numeric(mt.total_marks) AS marks, mt.test_total_marks AS total_marks
+                    FROM mock_test mt
+                    WHERE {mock_filters.sql}
+                    OFFSET 0
+                ) test_marks
+            ) total_scores
+            GROUP BY student_no
+        )
+        SELECT
+            st.board,
+            p.kind,
+            p.subject_key,
+            SUM(p.score_sum) / NULLIF(SUM(p.score_count), 0) AS avg_score,
+            MAX(p.max_score) AS max_score,
+            MIN(p.min_score) AS min_score,
+            SUM(p.row_count)::INT AS test_count,
+            COUNT(*) AS student_count
+        FROM partials p
+        JOIN students st ON st.student_no = p.student_no
+        GROUP BY st.board, p.kind, p.subject_key
+        ORDER BY st.board, p.kind, p.subject_key
+    """
+    cursor.execute(query, student_filters.params + daily_filters.params + mock_filters.params + mock_filters.params)
+
+    boards_daily = {}
+    boards_mock = {}
+    for board, kind, subject_key, avg_score, max_score, min_score, test_count, student_count in cursor.fetchall():
+        average = round(float(avg_score), 1) if avg_score is not None else None
+        if kind == "daily":
+            daily = boards_daily.setdefault(board, {"subjects": {}, "student_count": 0})
+            subject_label = normalize_subject_label(subject_key) if subject_key else subject_key
+            daily["subjects"][subject_label] = {
+                "average": average,
+                "top_score": max_score,
+                "lowest": min_score,
+                "test_count": test_count
+            }
+            daily["student_count"] = max(daily["student_count"], student_count)
+            continue
+
+        mock = boards_mock.setdefault(board, {key: None for key in MOCK_SUBJECT_CONFIG})
+        if subject_key == "":
+            mock.update({
+                "avg_total": average,
+                "top_total": max_score,
+                "lowest_total": min_score,
+                "test_count": test_count,
+                "student_count": student_count
+            })
+        elif subject_key in MOCK_SUBJECT_CONFIG:
+            mock[subject_key] = average
+
+    # Combine into results
+    board_results = []
+    for board in sorted(set(boards_daily) | set(boards_mock)):
+        daily = boards_daily.get(board, {"subjects": {}, "student_count": 0})
+        mock = boards_mock.get(board, {})
+
+        board_results.append({
+            "board": board,
+            "daily_test_data": daily["subjects"],
+            "mock_test_data": mock if mock else None,
+            "student_count": max(
+                daily["student_count"],
+                mock.get("student_count", 0)
+            )
+        })
+
+    return board_results
+
+
+def boardwise_student_query(grade, batch_id, subject, from_date, to_date):
+    """Per-student unit test average of each subject, ordered by board and roster"""
+    filters = (
+        Filters("s.board IS NOT NULL")
+        .roster(grade, None, batch_id)
+        .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        .date_range("dt.test_date", from_date, to_date)
+    )
+    query = f"""
+        SELECT
+            s.student_id,
+            s.student_name,
+            s.board,
+            s.grade,
+            b.batch_name,
+            dt.subject,
+            AVG(safe_numeric(dt.total_marks)) as avg_marks
+        FROM daily_test dt
+        JOIN student s ON dt.student_no = s.student_no
+        JOIN batch b ON s.batch_id = b.batch_id
+        WHERE {filters.sql}
+        GROUP BY s.student_id, s.sort_key, s.student_name, s.board, s.grade, b.batch_name, dt.subject
+        ORDER BY
+            s.board,
+            s.sort_key,
+            s.student_name ASC
+    """
+    return query, filters.params
+
+
+def board_students(rows):
+    """Yield (board, student) per student from boardwise_student_query rows"""
+    for (board, _), student_rows in groupby(rows, key=lambda row: (row[2], row[0])):
+        student_rows = list(student_rows)
+        first = student_rows[0]
+        yield board, {
+            "student_id": first[0],
+            "student_name": first[1],
+            "grade": first[3],
+            "batch": first[4],
+            "subjects": {row[5]: round(float(row[6]), 1) for row in student_rows}
+        }
+
+
+def iter_boardwise(conn, cursor, grade, admission_number, batch_id, subject, from_date, to_date):
+    """
+    Streaming counterpart of the boardwise analysis: one {"type": "board"}
+    record per board, then one {"type": "student"} record per student read
+    through a server-side cursor, then a {"type": "summary"} record.
+    """
+    board_results = boardwise_summaries(cursor, grade, admission_number, batch_id, subject, from_date, to_date)
+    for board_result in board_results:
+        yield {"type": "board", **board_result}
+
+    student_cursor = conn.cursor(name="boardwise_stream")
+    student_cursor.itersize = STREAM_ITERSIZE
+    student_cursor.execute(*boardwise_student_query(grade, batch_id, subject, from_date, to_date))
+    for board, student in board_students(student_cursor):
+        yield {"type": "student", "board": board, **student}
+    student_cursor.close()
+
+    yield {"type": "summary", "total_boards": len(board_results)}
+
+
 @app.get("/api/analysis/branchwise")
 async def get_boardwise_analysis(
     grade: Optional[str] = None,
@@ -578,11 +890,14 @@ async def get_boardwise_analysis(
     subject: Optional[str] = None,
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
+    stream: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get boardwise analysis data with filters.
     Aggregates performance by board across subjects.
+    stream=true returns NDJSON: board lines, one line per student, then a
+    summary line.
     """
     conn = None
     cursor = None
@@ -590,265 +905,26 @@ async def get_boardwise_analysis(
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get unit test data grouped by board
-        daily_query = """
-            SELECT
-                s.board,
-                dt.subject,
-                AVG(safe_numeric(dt.total_marks)) as avg_marks,
-                MAX(safe_numeric(dt.total_marks)) as max_marks,
-                MIN(safe_numeric(dt.total_marks)) as min_marks,
-                COUNT(*) as test_count,
-                COUNT(DISTINCT s.student_no) as student_count
-            FROM daily_test dt
-            JOIN student s ON dt.student_no = s.student_no
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE s.board IS NOT NULL
-        """
-        params = []
-
-        if grade:
-            daily_query += " AND s.grade = %s"
-            params.append(grade)
-
-        if admission_number:
-            daily_query += " AND s.student_id ILIKE %s"
-            params.append(f"%{admission_number}%")
+        if stream:
+            records = iter_boardwise(conn, cursor, grade, admission_number, batch_id, subject, from_date, to_date)
+            # Run the board queries now so errors surface as a 500 rather than a truncated stream
+            first = next(records)
+            response = ndjson_response(conn, chain([first], records))
+            conn = cursor = None
+            return response
 
-        if batch_id:
-            daily_query += " AND s.batch_id = %s"
-            params.append(batch_id)
-
-        if subject:
-            daily_query += f" AND {normalized_subject_sql('dt.subject')} = %s"
-            params.append(normalize_subject_key(subject))
-
-        if from_date:
-            daily_query += " AND dt.test_date >= %s"
-            params.append(from_date)
-
-        if to_date:
-            daily_query += " AND dt.test_date <= %s"
-            params.append(to_date)
-
-        daily_query += " GROUP BY s.board, dt.subject ORDER BY s.board, dt.subject"
-
-        cursor.execute(daily_query, params)
-        daily_rows = cursor.fetchall()
-
-        # Get monthly test data grouped by board
-        mock_maths_expr = """
-            CASE
-                WHEN mt.maths_total_marks IS NOT NULL AND mt.maths_total_marks > 0 AND safe_numeric(mt.maths_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.maths_marks) * 100.0 / mt.maths_total_marks)
-                ELSE safe_numeric(mt.maths_marks)
-            END
-        """
-        mock_physics_expr = """
-            CASE
-                WHEN mt.physics_total_marks IS NOT NULL AND mt.physics_total_marks > 0 AND safe_numeric(mt.physics_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.physics_marks) * 100.0 / mt.physics_total_marks)
-                ELSE safe_numeric(mt.physics_marks)
-            END
-        """
-        mock_chemistry_expr = """
-            CASE
-                WHEN mt.chemistry_total_marks IS NOT NULL AND mt.chemistry_total_marks > 0 AND safe_numeric(mt.chemistry_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.chemistry_marks) * 100.0 / mt.chemistry_total_marks)
-                ELSE safe_numeric(mt.chemistry_marks)
-            END
-        """
-        mock_biology_expr = """
-            CASE
-                WHEN mt.biology_total_marks IS NOT NULL AND mt.biology_total_marks > 0 AND safe_numeric(mt.biology_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.biology_marks) * 100.0 / mt.biology_total_marks)
-                ELSE safe_numeric(mt.biology_marks)
-            END
-        """
-        mock_total_expr = """
-            CASE
-                WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                ELSE safe_numeric(mt.total_marks)
-            END
-        """
-
-        mock_query = """
-            SELECT
-                s.board,
-                AVG({mock_maths_expr}) as avg_maths,
-                AVG({mock_physics_expr}) as avg_physics,
-                AVG({mock_chemistry_expr}) as avg_chemistry,
-                AVG({mock_biology_expr}) as avg_biology,
-                AVG({mock_total_expr}) as avg_total,
-                MAX({mock_total_expr}) as max_total,
-                MIN({mock_total_expr}) as min_total,
-                COUNT(*) as test_count,
-                COUNT(DISTINCT s.student_no) as student_count
-            FROM mock_test mt
-            JOIN student s ON mt.student_no = s.student_no
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE s.board IS NOT NULL
-        """.format(
-            mock_maths_expr=mock_maths_expr,
-            mock_physics_expr=mock_physics_expr,
-            mock_chemistry_expr=mock_chemistry_expr,
-            mock_biology_expr=mock_biology_expr,
-            mock_total_expr=mock_total_expr,
-        )
-        mock_params = []
-
-        if grade:
-            mock_query += " AND s.grade = %s"
-            mock_params.append(grade)
-
-        if admission_number:
-            mock_query += " AND s.student_id ILIKE %s"
-            mock_params.append(f"%{admission_number}%")
-
-        if batch_id:
-            mock_query += " AND s.batch_id = %s"
-            mock_params.append(batch_id)
-
-        if from_date:
-            mock_query += " AND mt.test_date >= %s"
-            mock_params.append(from_date)
-
-        if to_date:
-            mock_query += " AND mt.test_date <= %s"
-            mock_params.append(to_date)
-
-        mock_query += " GROUP BY s.board ORDER BY s.board"
-
-        cursor.execute(mock_query, mock_params)
-        mock_rows = cursor.fetchall()
-
-        # Build board-wise data from unit tests
-        boards_daily = {}
-        for row in daily_rows:
-            board = row[0]
-            if board not in boards_daily:
-                boards_daily[board] = {"subjects": {}, "student_count": 0}
-            subject_label = normalize_subject_label(row[1]) if row[1] else row[1]
-            boards_daily[board]["subjects"][subject_label] = {
-                "average": round(float(row[2]), 1) if row[2] is not None else None,
-                "top_score": row[3] if row[3] is not None else None,
-                "lowest": row[4] if row[4] is not None else None,
-                "test_count": row[5]
-            }
-            boards_daily[board]["student_count"] = max(
-                boards_daily[board]["student_count"], row[6]
-            )
-
-        # Build board-wise data from monthly tests
-        boards_mock = {}
-        for row in mock_rows:
-            board = row[0]
-            boards_mock[board] = {
-                "maths": round(float(row[1]), 1) if row[1] is not None else None,
-                "physics": round(float(row[2]), 1) if row[2] is not None else None,
-                "chemistry": round(float(row[3]), 1) if row[3] is not None else None,
-                "biology": round(float(row[4]), 1) if row[4] is not None else None,
-                "avg_total": round(float(row[5]), 1) if row[5] is not None else None,
-                "top_total": row[6] if row[6] is not None else None,
-                "lowest_total": row[7] if row[7] is not None else None,
-                "test_count": row[8],
-                "student_count": row[9]
-            }
-
-        # Combine into results
-        all_boards = set(list(boards_daily.keys()) + list(boards_mock.keys()))
-        board_results = []
-
-        for board in sorted(all_boards):
-            daily = boards_daily.get(board, {"subjects": {}, "student_count": 0})
-            mock = boards_mock.get(board, {})
-
-            board_result = {
-                "board": board,
-                "daily_test_data": daily["subjects"],
-                "mock_test_data": mock if mock else None,
-                "student_count": max(
-                    daily["student_count"],
-                    mock.get("student_count", 0)
-                )
-            }
-            board_results.append(board_result)
-
-        # Get individual student data per board for detailed view
-        student_query = """
-            SELECT
-                s.student_id,
-                s.student_name,
-                s.board,
-                s.grade,
-                b.batch_name,
-                dt.subject,
-                AVG(safe_numeric(dt.total_marks)) as avg_marks
-            FROM daily_test dt
-            JOIN student s ON dt.student_no = s.student_no
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE s.board IS NOT NULL
-        """
-        student_params = []
-
-        if grade:
-            student_query += " AND s.grade = %s"
-            student_params.append(grade)
-
-        if batch_id:
-            student_query += " AND s.batch_id = %s"
-            student_params.append(batch_id)
-
-        if subject:
-            student_query += f" AND {normalized_subject_sql('dt.subject')} = %s"
-            student_params.append(normalize_subject_key(subject))
-
-        if from_date:
-            student_query += " AND dt.test_date >= %s"
-            student_params.append(from_date)
-
-        if to_date:
-            student_query += " AND dt.test_date <= %s"
-            student_params.append(to_date)
-
-        student_query += " GROUP BY s.student_id, s.student_name, s.board, s.grade, b.batch_name, dt.subject"
-        student_query += """
-            ORDER BY
-                s.board,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
-                s.student_name ASC
-        """
-
-        cursor.execute(student_query, student_params)
-        student_rows = cursor.fetchall()
+        board_results = boardwise_summaries(cursor, grade, admission_number, batch_id, subject, from_date, to_date)
 
+        cursor.execute(*boardwise_student_query(grade, batch_id, subject, from_date, to_date))
         students_by_board = {}
-        for row in student_rows:
-            board = row[2]
-            sid = row[0]
-            if board not in students_by_board:
-                students_by_board[board] = {}
-            if sid not in students_by_board[board]:
-                students_by_board[board][sid] = {
-                    "student_id": row[0],
-                    "student_name": row[1],
-                    "grade": row[3],
-                    "batch": row[4],
-                    "subjects": {}
-                }
-            students_by_board[board][sid]["subjects"][row[5]] = round(float(row[6]), 1)
+        for board, student in board_students(cursor.fetchall()):
+            students_by_board.setdefault(board, []).append(student)
 
-        return {
+        return FastJSONResponse({
             "boards": board_results,
-            "students_by_board": {
-                board: list(students.values())
-                for board, students in students_by_board.items()
-            },
+            "students_by_board": students_by_board,
             "total_boards": len(board_results)
-        }
+        })
 
     except HTTPException:
         raise
@@ -918,9 +994,7 @@ async def get_students_for_analysis(
 
         query += """
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
+                s.sort_key,
                 s.student_name ASC
         """
 
@@ -956,6 +1030,186 @@ async def get_students_for_analysis(
             conn.close()
 
 
+# Statements behind the individual analysis page. The class statistics joins
+# plan in a few milliseconds each, so they run as prepared statements
+INDIVIDUAL_STUDENT_INFO = prepared_statement("individual_student_info", """
+    SELECT
+        s.student_no, s.student_id, s.student_name, s.course, s.board, s.grade,
+        s.photo_url, s.gender, s.email, s.student_mobile,
+        b.batch_name, b.batch_id, b.type, b.subjects
+    FROM student s
+    JOIN batch b ON s.batch_id = b.batch_id
+    WHERE s.student_no = %s
+""")
+
+INDIVIDUAL_DAILY_TESTS = prepared_statement("individual_daily_tests", """
+    SELECT
+        dt.test_id, dt.subject, dt.unit_name, dt.total_marks, dt.test_date,
+        dt.grade, dt.board, dt.subject_total_marks, dt.test_total_marks
+    FROM daily_test dt
+    WHERE dt.student_no = %s
+    ORDER BY dt.test_date DESC, dt.subject
+""")
+
+INDIVIDUAL_DAILY_CLASS_STATS = prepared_statement("individual_daily_class_stats", f"""
+    WITH student_tests AS (
+        SELECT DISTINCT
+            dt.test_date,
+            COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown') AS unit_name,
+            {normalized_subject_sql('dt.subject')} AS normalized_subject
+        FROM daily_test dt
+        WHERE dt.student_no = %s
+    )
+    SELECT
+        st.test_date,
+        st.normalized_subject,
+        st.unit_name,
+        ROUND(AVG(safe_numeric(dt2.total_marks))::numeric, 1) AS class_avg,
+        MAX(safe_numeric(dt2.total_marks)) AS class_high,
+        MIN(safe_numeric(dt2.total_marks)) AS class_low
+    FROM student_tests st
+    JOIN daily_test dt2
+        ON dt2.test_date = st.test_date
+        AND COALESCE(NULLIF(TRIM(dt2.unit_name), ''), 'Unknown') = st.unit_name
+        AND {normalized_subject_sql('dt2.subject')} = st.normalized_subject
+    JOIN student s2 ON s2.student_no = dt2.student_no
+    WHERE s2.batch_id = %s
+    GROUP BY st.test_date, st.normalized_subject, st.unit_name
+""")
+
+INDIVIDUAL_MOCK_TESTS = prepared_statement("individual_mock_tests", """
+    SELECT
+        mt.test_id, mt.test_date, mt.maths_marks, mt.physics_marks,
+        mt.chemistry_marks, mt.biology_marks, mt.total_marks,
+        mt.maths_unit_names, mt.physics_unit_names,
+        mt.chemistry_unit_names, mt.biology_unit_names,
+        mt.grade, mt.board,
+        mt.maths_total_marks, mt.physics_total_marks,
+        mt.chemistry_total_marks, mt.biology_total_marks,
+        mt.test_total_marks
+    FROM mock_test_wide mt
+    WHERE mt.student_no = %s
+    ORDER BY mt.test_date DESC
+""")
+
+INDIVIDUAL_MOCK_CLASS_STATS = prepared_statement("individual_mock_class_stats", """
+    WITH student_mock_groups AS (
+        SELECT DISTINCT
+            mt.test_date,
+            COALESCE(mt.maths_unit_names, ARRAY[]::text[]) AS maths_unit_names,
+            COALESCE(mt.physics_unit_names, ARRAY[]::text[]) AS physics_unit_names,
+            COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) AS chemistry_unit_names,
+            COALESCE(mt.biology_unit_names, ARRAY[]::text[]) AS biology_unit_names,
+            mt.maths_total_marks,
+            mt.physics_total_marks,
+            mt.chemistry_total_marks,
+            mt.biology_total_marks,
+            mt.test_total_marks
+        FROM mock_test_wide mt
+        WHERE mt.student_no = %s
+    )
+    SELECT
+        g.test_date,
+        g.maths_unit_names,
+        g.physics_unit_names,
+        g.chemistry_unit_names,
+        g.biology_unit_names,
+        g.maths_total_marks,
+        g.physics_total_marks,
+        g.chemistry_total_marks,
+        g.biology_total_marks,
+        g.test_total_marks,
+        ROUND(AVG(safe_numeric(mt2.total_marks))::numeric, 1) AS class_avg_total,
+        MAX(safe_numeric(mt2.total_marks)) AS class_high_total,
+        MIN(safe_numeric(mt2.total_marks)) AS class_low_total,
+        ROUND(AVG(safe_numeric(mt2.maths_marks))::numeric, 1) AS class_avg_maths,
+        MAX(safe_numeric(mt2.maths_marks)) AS class_high_maths,
+        MIN(safe_numeric(mt2.maths_marks)) AS class_low_maths,
+        ROUND(AVG(safe_numeric(mt2.physics_marks))::numeric, 1) AS class_avg_physics,
+        MAX(safe_numeric(mt2.physics_marks)) AS class_high_physics,
+        MIN(safe_numeric(mt2.physics_marks)) AS class_low_physics,
+        ROUND(AVG(safe_numeric(mt2.chemistry_marks))::numeric, 1) AS class_avg_chemistry,
+        MAX(safe_numeric(mt2.chemistry_marks)) AS class_high_chemistry,
+        MIN(safe_numeric(mt2.chemistry_marks)) AS class_low_chemistry,
+        ROUND(AVG(safe_numeric(mt2.biology_marks))::numeric, 1) AS class_avg_biology,
+        MAX(safe_numeric(mt2.biology_marks)) AS class_high_biology,
+        MIN(safe_numeric(mt2.biology_marks)) AS class_low_biology
+    FROM student_mock_groups g
+    JOIN mock_test_wide mt2
+        ON mt2.test_date = g.test_date
+       AND COALESCE(mt2.maths_unit_names, ARRAY[]::text[]) = g.maths_unit_names
+       AND COALESCE(mt2.physics_unit_names, ARRAY[]::text[]) = g.physics_unit_names
+       AND COALESCE(mt2.chemistry_unit_names, ARRAY[]::text[]) = g.chemistry_unit_names
+       AND COALESCE(mt2.biology_unit_names, ARRAY[]::text[]) = g.biology_unit_names
+       AND mt2.maths_total_marks IS NOT DISTINCT FROM g.maths_total_marks
+       AND mt2.physics_total_marks IS NOT DISTINCT FROM g.physics_total_marks
+       AND mt2.chemistry_total_marks IS NOT DISTINCT FROM g.chemistry_total_marks
+       AND mt2.biology_total_marks IS NOT DISTINCT FROM g.biology_total_marks
+       AND mt2.test_total_marks IS NOT DISTINCT FROM g.test_total_marks
+    JOIN student s2 ON s2.student_no = mt2.student_no
+    WHERE s2.batch_id = %s
+    GROUP BY
+        g.test_date,
+        g.maths_unit_names,
+        g.physics_unit_names,
+        g.chemistry_unit_names,
+        g.biology_unit_names,
+        g.maths_total_marks,
+        g.physics_total_marks,
+        g.chemistry_total_marks,
+        g.biology_total_marks,
+        g.test_total_marks
+""")
+
+INDIVIDUAL_MOCK_REPORT_BAND = prepared_statement("individual_mock_report_band", """
+    WITH student_mock_groups AS (
+        SELECT DISTINCT
+            mt.test_date,
+            COALESCE(mt.maths_unit_names, ARRAY[]::text[]) AS maths_unit_names,
+            COALESCE(mt.physics_unit_names, ARRAY[]::text[]) AS physics_unit_names,
+            COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) AS chemistry_unit_names,
+            COALESCE(mt.biology_unit_names, ARRAY[]::text[]) AS biology_unit_names,
+            mt.maths_total_marks,
+            mt.physics_total_marks,
+            mt.chemistry_total_marks,
+            mt.biology_total_marks,
+            mt.test_total_marks
+        FROM mock_test_wide mt
+        WHERE mt.student_no = %s
+    )
+    SELECT
+        g.test_date,
+        g.maths_unit_names,
+        g.physics_unit_names,
+        g.chemistry_unit_names,
+        g.biology_unit_names,
+        g.maths_total_marks,
+        g.physics_total_marks,
+        g.chemistry_total_marks,
+        g.biology_total_marks,
+        g.test_total_marks,
+        mt2.student_no,
+        safe_numeric(mt2.maths_marks) AS maths_marks,
+        safe_numeric(mt2.physics_marks) AS physics_marks,
+        safe_numeric(mt2.chemistry_marks) AS chemistry_marks,
+        safe_numeric(mt2.biology_marks) AS biology_marks
+    FROM student_mock_groups g
+    JOIN mock_test_wide mt2
+        ON mt2.test_date = g.test_date
+       AND COALESCE(mt2.maths_unit_names, ARRAY[]::text[]) = g.maths_unit_names
+       AND COALESCE(mt2.physics_unit_names, ARRAY[]::text[]) = g.physics_unit_names
+       AND COALESCE(mt2.chemistry_unit_names, ARRAY[]::text[]) = g.chemistry_unit_names
+       AND COALESCE(mt2.biology_unit_names, ARRAY[]::text[]) = g.biology_unit_names
+       AND mt2.maths_total_marks IS NOT DISTINCT FROM g.maths_total_marks
+       AND mt2.physics_total_marks IS NOT DISTINCT FROM g.physics_total_marks
+       AND mt2.chemistry_total_marks IS NOT DISTINCT FROM g.chemistry_total_marks
+       AND mt2.biology_total_marks IS NOT DISTINCT FROM g.biology_total_marks
+       AND mt2.test_total_marks IS NOT DISTINCT FROM g.test_total_marks
+    JOIN student s2 ON s2.student_no = mt2.student_no
+    WHERE s2.batch_id = %s
+""")
+
+
 @app.get("/api/analysis/individual/{student_no}")
 async def get_individual_analysis(student_no: int, current_user: dict = Depends(get_current_user)):
     """
@@ -973,15 +1227,7 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
         cursor = conn.cursor()
 
         # 1. Get student info
-        cursor.execute("""
-            SELECT
-                s.student_no, s.student_id, s.student_name, s.course, s.board, s.grade,
-                s.photo_url, s.gender, s.email, s.student_mobile,
-                b.batch_name, b.batch_id, b.type, b.subjects
-            FROM student s
-            JOIN batch b ON s.batch_id = b.batch_id
-            WHERE s.student_no = %s
-        """, (student_no,))
+        INDIVIDUAL_STUDENT_INFO.execute(cursor, (student_no,))
 
         student_row = cursor.fetchone()
         if not student_row:
@@ -1018,44 +1264,13 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
         report_subject_keys = report_subject_keys[:4]
 
         # 2. Get unit test performance
-        cursor.execute("""
-            SELECT
-                dt.test_id, dt.subject, dt.unit_name, dt.total_marks, dt.test_date,
-                dt.grade, dt.board, dt.subject_total_marks, dt.test_total_marks
-            FROM daily_test dt
-            WHERE dt.student_no = %s
-            ORDER BY dt.test_date DESC, dt.subject
-        """, (student_no,))
+        INDIVIDUAL_DAILY_TESTS.execute(cursor, (student_no,))
 
         daily_tests_raw = cursor.fetchall()
         daily_tests = []
 
         # Fetch all required daily class stats in one query (avoids N+1)
-        cursor.execute(f"""
-            WITH student_tests AS (
-                SELECT DISTINCT
-                    dt.test_date,
-                    COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown') AS unit_name,
-                    {normalized_subject_sql('dt.subject')} AS normalized_subject
-                FROM daily_test dt
-                WHERE dt.student_no = %s
-            )
-            SELECT
-                st.test_date,
-                st.normalized_subject,
-                st.unit_name,
-                ROUND(AVG(safe_numeric(dt2.total_marks))::numeric, 1) AS class_avg,
-                MAX(safe_numeric(dt2.total_marks)) AS class_high,
-                MIN(safe_numeric(dt2.total_marks)) AS class_low
-            FROM student_tests st
-            JOIN daily_test dt2
-                ON dt2.test_date = st.test_date
-                AND COALESCE(NULLIF(TRIM(dt2.unit_name), ''), 'Unknown') = st.unit_name
-                AND {normalized_subject_sql('dt2.subject')} = st.normalized_subject
-            JOIN student s2 ON s2.student_no = dt2.student_no
-            WHERE s2.batch_id = %s
-            GROUP BY st.test_date, st.normalized_subject, st.unit_name
-        """, (student_no, batch_id))
+        INDIVIDUAL_DAILY_CLASS_STATS.execute(cursor, (student_no, batch_id))
 
         daily_stats_map = {}
         for row in cursor.fetchall():
@@ -1096,20 +1311,7 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
             })
 
         # 3. Get monthly test performance
-        cursor.execute("""
-            SELECT
-                mt.test_id, mt.test_date, mt.maths_marks, mt.physics_marks,
-                mt.chemistry_marks, mt.biology_marks, mt.total_marks,
-                mt.maths_unit_names, mt.physics_unit_names,
-                mt.chemistry_unit_names, mt.biology_unit_names,
-                mt.grade, mt.board,
-                mt.maths_total_marks, mt.physics_total_marks,
-                mt.chemistry_total_marks, mt.biology_total_marks,
-                mt.test_total_marks
-            FROM mock_test mt
-            WHERE mt.student_no = %s
-            ORDER BY mt.test_date DESC
-        """, (student_no,))
+        INDIVIDUAL_MOCK_TESTS.execute(cursor, (student_no,))
 
         mock_tests_raw = cursor.fetchall()
         mock_tests = []
@@ -1137,74 +1339,7 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
 
         # Fetch all required mock class stats in one query (avoids N+1)
         # Group by full monthly-test identity to avoid mixing different tests on the same date.
-        cursor.execute("""
-            WITH student_mock_groups AS (
-                SELECT DISTINCT
-                    mt.test_date,
-                    COALESCE(mt.maths_unit_names, ARRAY[]::text[]) AS maths_unit_names,
-                    COALESCE(mt.physics_unit_names, ARRAY[]::text[]) AS physics_unit_names,
-                    COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) AS chemistry_unit_names,
-                    COALESCE(mt.biology_unit_names, ARRAY[]::text[]) AS biology_unit_names,
-                    mt.maths_total_marks,
-                    mt.physics_total_marks,
-                    mt.chemistry_total_marks,
-                    mt.biology_total_marks,
-                    mt.test_total_marks
-                FROM mock_test mt
-                WHERE mt.student_no = %s
-            )
-            SELECT
-                g.test_date,
-                g.maths_unit_names,
-                g.physics_unit_names,
-                g.chemistry_unit_names,
-                g.biology_unit_names,
-                g.maths_total_marks,
-                g.physics_total_marks,
-                g.chemistry_total_marks,
-                g.biology_total_marks,
-                g.test_total_marks,
-                ROUND(AVG(safe_numeric(mt2.total_marks))::numeric, 1) AS class_avg_total,
-                MAX(safe_numeric(mt2.total_marks)) AS class_high_total,
-                MIN(safe_numeric(mt2.total_marks)) AS class_low_total,
-                ROUND(AVG(safe_numeric(mt2.maths_marks))::numeric, 1) AS class_avg_maths,
-                MAX(safe_numeric(mt2.maths_marks)) AS class_high_maths,
-                MIN(safe_numeric(mt2.maths_marks)) AS class_low_maths,
-                ROUND(AVG(safe_numeric(mt2.physics_marks))::numeric, 1) AS class_avg_physics,
-                MAX(safe_numeric(mt2.physics_marks)) AS class_high_physics,
-                MIN(safe_numeric(mt2.physics_marks)) AS class_low_physics,
-                ROUND(AVG(safe_numeric(mt2.chemistry_marks))::numeric, 1) AS class_avg_chemistry,
-                MAX(safe_numeric(mt2.chemistry_marks)) AS class_high_chemistry,
-                MIN(safe_numeric(mt2.chemistry_marks)) AS class_low_chemistry,
-                ROUND(AVG(safe_numeric(mt2.biology_marks))::numeric, 1) AS class_avg_biology,
-                MAX(safe_numeric(mt2.biology_marks)) AS class_high_biology,
-                MIN(safe_numeric(mt2.biology_marks)) AS class_low_biology
-            FROM student_mock_groups g
-            JOIN mock_test mt2
-                ON mt2.test_date = g.test_date
-               AND COALESCE(mt2.maths_unit_names, ARRAY[]::text[]) = g.maths_unit_names
-               AND COALESCE(mt2.physics_unit_names, ARRAY[]::text[]) = g.physics_unit_names
-               AND COALESCE(mt2.chemistry_unit_names, ARRAY[]::text[]) = g.chemistry_unit_names
-               AND COALESCE(mt2.biology_unit_names, ARRAY[]::text[]) = g.biology_unit_names
-               AND mt2.maths_total_marks IS NOT DISTINCT FROM g.maths_total_marks
-               AND mt2.physics_total_marks IS NOT DISTINCT FROM g.physics_total_marks
-               AND mt2.chemistry_total_marks IS NOT DISTINCT FROM g.chemistry_total_marks
-               AND mt2.biology_total_marks IS NOT DISTINCT FROM g.biology_total_marks
-               AND mt2.test_total_marks IS NOT DISTINCT FROM g.test_total_marks
-            JOIN student s2 ON s2.student_no = mt2.student_no
-            WHERE s2.batch_id = %s
-            GROUP BY
-                g.test_date,
-                g.maths_unit_names,
-                g.physics_unit_names,
-                g.chemistry_unit_names,
-                g.biology_unit_names,
-                g.maths_total_marks,
-                g.physics_total_marks,
-                g.chemistry_total_marks,
-                g.biology_total_marks,
-                g.test_total_marks
-        """, (student_no, batch_id))
+        INDIVIDUAL_MOCK_CLASS_STATS.execute(cursor, (student_no, batch_id))
 
         mock_stats_map = {}
         for row in cursor.fetchall():
@@ -1239,53 +1374,7 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
             }
 
         # Class band for report chart: sum of selected report-subject marks per student per test date
-        cursor.execute("""
-            WITH student_mock_groups AS (
-                SELECT DISTINCT
-                    mt.test_date,
-                    COALESCE(mt.maths_unit_names, ARRAY[]::text[]) AS maths_unit_names,
-                    COALESCE(mt.physics_unit_names, ARRAY[]::text[]) AS physics_unit_names,
-                    COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) AS chemistry_unit_names,
-                    COALESCE(mt.biology_unit_names, ARRAY[]::text[]) AS biology_unit_names,
-                    mt.maths_total_marks,
-                    mt.physics_total_marks,
-                    mt.chemistry_total_marks,
-                    mt.biology_total_marks,
-                    mt.test_total_marks
-                FROM mock_test mt
-                WHERE mt.student_no = %s
-            )
-            SELECT
-                g.test_date,
-                g.maths_unit_names,
-                g.physics_unit_names,
-                g.chemistry_unit_names,
-                g.biology_unit_names,
-                g.maths_total_marks,
-                g.physics_total_marks,
-                g.chemistry_total_marks,
-                g.biology_total_marks,
-                g.test_total_marks,
-                mt2.student_no,
-                safe_numeric(mt2.maths_marks) AS maths_marks,
-                safe_numeric(mt2.physics_marks) AS physics_marks,
-                safe_numeric(mt2.chemistry_marks) AS chemistry_marks,
-                safe_numeric(mt2.biology_marks) AS biology_marks
-            FROM student_mock_groups g
-            JOIN mock_test mt2
-                ON mt2.test_date = g.test_date
-               AND COALESCE(mt2.maths_unit_names, ARRAY[]::text[]) = g.maths_unit_names
-               AND COALESCE(mt2.physics_unit_names, ARRAY[]::text[]) = g.physics_unit_names
-               AND COALESCE(mt2.chemistry_unit_names, ARRAY[]::text[]) = g.chemistry_unit_names
-               AND COALESCE(mt2.biology_unit_names, ARRAY[]::text[]) = g.biology_unit_names
-               AND mt2.maths_total_marks IS NOT DISTINCT FROM g.maths_total_marks
-               AND mt2.physics_total_marks IS NOT DISTINCT FROM g.physics_total_marks
-               AND mt2.chemistry_total_marks IS NOT DISTINCT FROM g.chemistry_total_marks
-               AND mt2.biology_total_marks IS NOT DISTINCT FROM g.biology_total_marks
-               AND mt2.test_total_marks IS NOT DISTINCT FROM g.test_total_marks
-            JOIN student s2 ON s2.student_no = mt2.student_no
-            WHERE s2.batch_id = %s
-        """, (student_no, batch_id))
+        INDIVIDUAL_MOCK_REPORT_BAND.execute(cursor, (student_no, batch_id))
 
         report_total_class_stats_map = {}
         for row in cursor.fetchall():
@@ -1421,12 +1510,12 @@ async def get_individual_analysis(student_no: int, current_user: dict = Depends(
                 "created_at": fb[7].isoformat() if fb[7] else None
             })
 
-        return {
+        return FastJSONResponse({
             "student": student_info,
             "daily_tests": daily_tests,
             "mock_tests": mock_tests,
             "feedback": feedback_list
-        }
+        })
 
     except HTTPException:
         raise
@@ -1526,28 +1615,55 @@ async def create_feedback(feedback: FeedbackCreate, current_user: dict = Depends
             conn.close()
 
 
+FEEDBACK_LIST_FIELDS = [
+    "feedback_id", "feedback_date", "teacher_feedback", "suggestions",
+    "academic_director_signature", "student_signature", "parent_signature", "created_at",
+]
+
+
 @app.get("/api/analysis/feedback/{student_no}")
-async def get_student_feedback(student_no: int, current_user: dict = Depends(get_current_user)):
+async def get_student_feedback(
+    student_no: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Get all feedback entries for a student
+    Get feedback entries for a student, latest first.
+    Pass limit (and the returned next_cursor) to page, fields=a,b to trim the
+    response, include_total=true for the overall count.
     """
+    selected_fields = parse_fields(fields, FEEDBACK_LIST_FIELDS)
+    after = decode_cursor(cursor, (date.fromisoformat, int)) if cursor else None
+    limit = page_size(limit) if limit is not None else None
+
     conn = None
-    cursor = None
+    db_cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
 
-        cursor.execute("""
+        query = """
             SELECT
                 feedback_id, feedback_date, teacher_feedback, suggestions,
                 academic_director_signature, student_signature, parent_signature,
                 created_at
             FROM feedback
             WHERE student_no = %s
-            ORDER BY feedback_date DESC
-        """, (student_no,))
-
-        rows = cursor.fetchall()
+        """
+        params = [student_no]
+        if after:
+            query += " AND (feedback_date, feedback_id) < (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY feedback_date DESC, feedback_id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
+        db_cursor.execute(query, params)
+        rows, has_more = split_page(db_cursor.fetchall(), limit)
         feedback_list = []
         for fb in rows:
             feedback_list.append({
@@ -1561,20 +1677,29 @@ async def get_student_feedback(student_no: int, current_user: dict = Depends(get
                 "created_at": fb[7].isoformat() if fb[7] else None
             })
 
+        total = None
+        if include_total:
+            db_cursor.execute("SELECT COUNT(*) FROM feedback WHERE student_no = %s", (student_no,))
+            total = db_cursor.fetchone()[0]
+
         return {
             "student_no": student_no,
-            "feedback": feedback_list,
-            "count": len(feedback_list)
+            "feedback": project(feedback_list, selected_fields),
+            "count": len(feedback_list),
+            "next_cursor": encode_cursor((rows[-1][1], rows[-1][0])) if has_more else None,
+            "total": total
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch feedback: {str(e)}"
         )
     finally:
-        if cursor:
-            cursor.close()
+        if db_cursor:
+            db_cursor.close()
         if conn:
             conn.close()
 
@@ -1628,79 +1753,16 @@ async def get_batch_performance(
         cursor.execute("SELECT COUNT(*) FROM student WHERE batch_id = %s", (batch_id,))
         total_students = cursor.fetchone()[0]
 
-        # ── Date filter fragments ──
-        daily_date_filter = ""
-        mock_date_filter = ""
-        daily_date_params = []
-        mock_date_params = []
-
-        if date_from:
-            daily_date_filter += " AND dt.test_date >= %s"
-            daily_date_params.append(date_from)
-            mock_date_filter += " AND mt.test_date >= %s"
-            mock_date_params.append(date_from)
-        if date_to:
-            daily_date_filter += " AND dt.test_date <= %s"
-            daily_date_params.append(date_to)
-            mock_date_filter += " AND mt.test_date <= %s"
-            mock_date_params.append(date_to)
-
-        daily_subject_filter = ""
-        daily_subject_params = []
-        if subject:
-            daily_subject_filter = f" AND {normalized_subject_sql('dt.subject')} = %s"
-            daily_subject_params.append(normalize_subject_key(subject))
-
-        # Score normalization expressions (percentage-based when total columns are present)
-        daily_score_expr = """
-            CASE
-                WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                ELSE safe_numeric(dt.total_marks)
-            END
-        """
-
-        mock_total_score_expr = """
-            CASE
-                WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                ELSE safe_numeric(mt.total_marks)
-            END
-        """
-
-        mock_maths_score_expr = """
-            CASE
-                WHEN mt.maths_total_marks IS NOT NULL AND mt.maths_total_marks > 0 AND safe_numeric(mt.maths_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.maths_marks) * 100.0 / mt.maths_total_marks)
-                ELSE safe_numeric(mt.maths_marks)
-            END
-        """
-
-        mock_physics_score_expr = """
-            CASE
-                WHEN mt.physics_total_marks IS NOT NULL AND mt.physics_total_marks > 0 AND safe_numeric(mt.physics_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.physics_marks) * 100.0 / mt.physics_total_marks)
-                ELSE safe_numeric(mt.physics_marks)
-            END
-        """
-
-        mock_chemistry_score_expr = """
-            CASE
-                WHEN mt.chemistry_total_marks IS NOT NULL AND mt.chemistry_total_marks > 0 AND safe_numeric(mt.chemistry_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.chemistry_marks) * 100.0 / mt.chemistry_total_marks)
-                ELSE safe_numeric(mt.chemistry_marks)
-            END
-        """
+        # ── Filters and score expressions (percentage-based when total columns are present) ──
+        daily_filters = (
+            Filters("s.batch_id = %s", batch_id)
+            .date_range("dt.test_date", date_from, date_to)
+            .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        )
+        mock_filters = Filters("s.batch_id = %s", batch_id).date_range("mt.test_date", date_from, date_to)
 
-        mock_biology_score_expr = """
-            CASE
-                WHEN mt.biology_total_marks IS NOT NULL AND mt.biology_total_marks > 0 AND safe_numeric(mt.biology_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.biology_marks) * 100.0 / mt.biology_total_marks)
-                ELSE safe_numeric(mt.biology_marks)
-            END
-        """
+        daily_score_expr = daily_score_sql()
+        mock_total_score_expr = mock_total_score_sql()
 
         # ==================== UNIT TEST STATS ====================
         daily_stats = {
@@ -1722,8 +1784,8 @@ async def get_batch_performance(
                     COUNT(DISTINCT dt.student_no)
                 FROM daily_test dt
                 JOIN student s ON dt.student_no = s.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
-            """, [batch_id] + daily_date_params + daily_subject_params)
+                WHERE {daily_filters.sql}
+            """, daily_filters.params)
             row = cursor.fetchone()
             daily_stats = {
                 "avg_score": float(row[0]) if row[0] is not None else None,
@@ -1743,10 +1805,10 @@ async def get_batch_performance(
                     COUNT(DISTINCT dt.student_no) as students
                 FROM daily_test dt
                 JOIN student s ON dt.student_no = s.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
+                WHERE {daily_filters.sql}
                 GROUP BY dt.test_date
                 ORDER BY dt.test_date
-            """, [batch_id] + daily_date_params + daily_subject_params)
+            """, daily_filters.params)
             for r in cursor.fetchall():
                 daily_trend.append({
                     "date": r[0].isoformat() if r[0] else None,
@@ -1767,10 +1829,10 @@ async def get_batch_performance(
                     COUNT(DISTINCT dt.student_no)
                 FROM daily_test dt
                 JOIN student s ON dt.student_no = s.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
+                WHERE {daily_filters.sql}
                 GROUP BY dt.subject
                 ORDER BY dt.subject
-            """, [batch_id] + daily_date_params + daily_subject_params)
+            """, daily_filters.params)
             for r in cursor.fetchall():
                 daily_subject_breakdown.append({
                     "subject": normalize_subject_label(r[0]) if r[0] else r[0],
@@ -1790,10 +1852,10 @@ async def get_batch_performance(
                     COUNT(*) as test_count
                 FROM daily_test dt
                 JOIN student s ON dt.student_no = s.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
+                WHERE {daily_filters.sql}
                 GROUP BY s.student_id, s.student_name
                 ORDER BY avg_marks DESC NULLS LAST
-            """, [batch_id] + daily_date_params + daily_subject_params)
+            """, daily_filters.params)
             daily_student_avgs = [
                 {"student_id": r[0], "student_name": r[1], "avg": float(r[2]), "tests": r[3]}
                 for r in cursor.fetchall()
@@ -1820,8 +1882,8 @@ async def get_batch_performance(
                     COUNT(DISTINCT mt.student_no)
                 FROM mock_test mt
                 JOIN student s ON mt.student_no = s.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
-            """, [batch_id] + mock_date_params)
+                WHERE {mock_filters.sql}
+            """, mock_filters.params)
             row = cursor.fetchone()
             mock_stats = {
                 "avg_score": float(row[0]) if row[0] is not None else None,
@@ -1841,10 +1903,10 @@ async def get_batch_performance(
                     COUNT(DISTINCT mt.student_no)
                 FROM mock_test mt
                 JOIN student s ON mt.student_no = s.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
+                WHERE {mock_filters.sql}
                 GROUP BY mt.test_date
                 ORDER BY mt.test_date
-            """, [batch_id] + mock_date_params)
+            """, mock_filters.params)
             for r in cursor.fetchall():
                 mock_trend.append({
                     "date": r[0].isoformat() if r[0] else None,
@@ -1857,28 +1919,23 @@ async def get_batch_performance(
             # Monthly subject breakdown (per-subject averages)
             cursor.execute(f"""
                 SELECT
-                    ROUND(AVG({mock_maths_score_expr})::numeric, 1),
-                    ROUND(AVG({mock_physics_score_expr})::numeric, 1),
-                    ROUND(AVG({mock_chemistry_score_expr})::numeric, 1),
-                    ROUND(AVG({mock_biology_score_expr})::numeric, 1),
-                    MAX({mock_maths_score_expr}), MAX({mock_physics_score_expr}),
-                    MAX({mock_chemistry_score_expr}), MAX({mock_biology_score_expr})
+                    sm.subject_key,
+                    ROUND(AVG({mock_subject_score_sql()})::numeric, 1),
+                    MAX({mock_subject_score_sql()})
                 FROM mock_test mt
+                JOIN mock_test_subject_mark sm ON sm.test_id = mt.test_id
                 JOIN student s ON mt.student_no = s.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
-            """, [batch_id] + mock_date_params)
-            r = cursor.fetchone()
-            if r:
-                for i, subj in enumerate(["Maths", "Physics", "Chemistry", "Biology"]):
-                    avg_val = float(r[i]) if r[i] is not None else None
-                    top_val = float(r[i + 4]) if r[i + 4] is not None else None
-                    if avg_val is None and top_val is None:
-                        continue
-                    mock_subject_breakdown.append({
-                        "subject": subj,
-                        "avg": avg_val,
-                        "top": top_val
-                    })
+                WHERE {mock_filters.sql}
+                GROUP BY sm.subject_key
+            """, mock_filters.params)
+            for subject_key, avg_val, top_val in sorted(cursor.fetchall(), key=lambda r: mock_subject_order(r[0])):
+                if avg_val is None and top_val is None:
+                    continue
+                mock_subject_breakdown.append({
+                    "subject": subject_key.capitalize(),
+                    "avg": float(avg_val) if avg_val is not None else None,
+                    "top": float(top_val) if top_val is not None else None
+                })
 
             # Per-student mock average
             cursor.execute(f"""
@@ -1889,10 +1946,10 @@ async def get_batch_performance(
                     COUNT(*) as test_count
                 FROM mock_test mt
                 JOIN student s ON mt.student_no = s.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
+                WHERE {mock_filters.sql}
                 GROUP BY s.student_id, s.student_name
                 ORDER BY avg_marks DESC NULLS LAST
-            """, [batch_id] + mock_date_params)
+            """, mock_filters.params)
             mock_student_avgs = [
                 {"student_id": r[0], "student_name": r[1], "avg": float(r[2]), "tests": r[3]}
                 for r in cursor.fetchall()
@@ -2025,7 +2082,7 @@ async def get_batch_performance(
             "mock_rate": round(mock_stats["students_tested"] / total_students * 100, 1) if total_students > 0 else 0
         }
 
-        return {
+        return FastJSONResponse({
             "batch": batch_info,
             "daily_stats": daily_stats,
             "mock_stats": mock_stats,
@@ -2038,7 +2095,7 @@ async def get_batch_performance(
             "daily_distribution": daily_distribution,
             "mock_distribution": mock_distribution,
             "participation": participation
-        }
+        })
 
     except HTTPException:
         raise
@@ -2076,53 +2133,30 @@ async def get_student_metrics(
         batch_id = student_row[3]
         student_id = student_row[1]
 
-        daily_date_filter = ""
-        mock_date_filter = ""
-        daily_params = []
-        mock_params = []
-        if date_from:
-            daily_date_filter += " AND dt.test_date >= %s"
-            mock_date_filter += " AND mt.test_date >= %s"
-            daily_params.append(date_from)
-            mock_params.append(date_from)
-        if date_to:
-            daily_date_filter += " AND dt.test_date <= %s"
-            mock_date_filter += " AND mt.test_date <= %s"
-            daily_params.append(date_to)
-            mock_params.append(date_to)
-
-        daily_score_expr = """
-            CASE
-                WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                ELSE safe_numeric(dt.total_marks)
-            END
-        """
+        daily_dates = Filters().date_range("dt.test_date", date_from, date_to)
+        mock_dates = Filters().date_range("mt.test_date", date_from, date_to)
+        student_daily = Filters("dt.student_no = %s", student_no).extend(daily_dates)
+        student_mock = Filters("mt.student_no = %s", student_no).extend(mock_dates)
+        batch_daily = Filters("s.batch_id = %s", batch_id).extend(daily_dates)
+        batch_mock = Filters("s.batch_id = %s", batch_id).extend(mock_dates)
 
-        mock_total_score_expr = """
-            CASE
-                WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                ELSE safe_numeric(mt.total_marks)
-            END
-        """
+        daily_score_expr = daily_score_sql()
+        mock_total_score_expr = mock_total_score_sql()
 
         cursor.execute(f"""
             SELECT dt.test_date, {daily_score_expr} AS score, dt.subject
             FROM daily_test dt
-            WHERE dt.student_no = %s {daily_date_filter}
+            WHERE {student_daily.sql}
             ORDER BY dt.test_date
-        """, [student_no] + daily_params)
+        """, student_daily.params)
         daily_rows = cursor.fetchall()
 
         cursor.execute(f"""
             SELECT mt.test_date, {mock_total_score_expr} AS score
-            FROM mock_test mt
-            WHERE mt.student_no = %s {mock_date_filter}
+            FROM mock_test_wide mt
+            WHERE {student_mock.sql}
             ORDER BY mt.test_date
-        """, [student_no] + mock_params)
+        """, student_mock.params)
         mock_rows = cursor.fetchall()
 
         score_points = []
@@ -2159,8 +2193,8 @@ async def get_student_metrics(
             ))
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {daily_date_filter}
-        """, [batch_id] + daily_params)
+            WHERE {batch_daily.sql}
+        """, batch_daily.params)
         total_daily_conducted = cursor.fetchone()[0] or 0
 
         cursor.execute(f"""
@@ -2170,9 +2204,9 @@ async def get_student_metrics(
                 COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown')
             ))
             FROM daily_test dt
-            WHERE dt.student_no = %s {daily_date_filter}
+            WHERE {student_daily.sql}
               AND safe_numeric(dt.total_marks) IS NOT NULL
-        """, [student_no] + daily_params)
+        """, student_daily.params)
         student_daily_attempted = cursor.fetchone()[0] or 0
 
         cursor.execute(f"""
@@ -2188,10 +2222,10 @@ async def get_student_metrics(
                 mt.biology_total_marks,
                 mt.test_total_marks
             ))
-            FROM mock_test mt
+            FROM mock_test_wide mt
             JOIN student s ON s.student_no = mt.student_no
-            WHERE s.batch_id = %s {mock_date_filter}
-        """, [batch_id] + mock_params)
+            WHERE {batch_mock.sql}
+        """, batch_mock.params)
         total_mock_conducted = cursor.fetchone()[0] or 0
 
         cursor.execute(f"""
@@ -2207,8 +2241,8 @@ async def get_student_metrics(
                 mt.biology_total_marks,
                 mt.test_total_marks
             ))
-            FROM mock_test mt
-            WHERE mt.student_no = %s {mock_date_filter}
+            FROM mock_test_wide mt
+            WHERE {student_mock.sql}
                   AND (
                           safe_numeric(mt.total_marks) IS NOT NULL
                       OR safe_numeric(mt.maths_marks) IS NOT NULL
@@ -2216,7 +2250,7 @@ async def get_student_metrics(
                       OR safe_numeric(mt.chemistry_marks) IS NOT NULL
                       OR safe_numeric(mt.biology_marks) IS NOT NULL
                   )
-        """, [student_no] + mock_params)
+        """, student_mock.params)
         student_mock_attempted = cursor.fetchone()[0] or 0
 
         total_conducted = total_daily_conducted + total_mock_conducted
@@ -2229,8 +2263,8 @@ async def get_student_metrics(
                 COUNT(*) FILTER (WHERE dt.total_marks IS NOT NULL AND trim(dt.total_marks) <> ''),
                 COUNT(*) FILTER (WHERE dt.total_marks IS NOT NULL AND trim(dt.total_marks) <> '' AND safe_numeric(dt.total_marks) IS NULL)
             FROM daily_test dt
-            WHERE dt.student_no = %s {daily_date_filter}
-        """, [student_no] + daily_params)
+            WHERE {student_daily.sql}
+        """, student_daily.params)
         d_total, d_non_numeric = cursor.fetchone()
         d_total = d_total or 0
         d_non_numeric = d_non_numeric or 0
@@ -2239,9 +2273,9 @@ async def get_student_metrics(
             SELECT
                 COUNT(*) FILTER (WHERE mt.total_marks IS NOT NULL AND trim(mt.total_marks) <> ''),
                 COUNT(*) FILTER (WHERE mt.total_marks IS NOT NULL AND trim(mt.total_marks) <> '' AND safe_numeric(mt.total_marks) IS NULL)
-            FROM mock_test mt
-            WHERE mt.student_no = %s {mock_date_filter}
-        """, [student_no] + mock_params)
+            FROM mock_test_wide mt
+            WHERE {student_mock.sql}
+        """, student_mock.params)
         m_total, m_non_numeric = cursor.fetchone()
         m_total = m_total or 0
         m_non_numeric = m_non_numeric or 0
@@ -2255,12 +2289,17 @@ async def get_student_metrics(
             if not subj_scores:
                 continue
             student_subj_avg = round(sum(subj_scores) / len(subj_scores), 1)
+            subject_filters = (
+                Filters("s.batch_id = %s", batch_id)
+                .subject("dt.subject", normalize_subject_key(subj))
+                .extend(daily_dates)
+            )
             cursor.execute(f"""
                 SELECT ROUND(AVG({daily_score_expr})::numeric, 1)
                 FROM daily_test dt
                 JOIN student s ON s.student_no = dt.student_no
-                WHERE s.batch_id = %s AND {normalized_subject_sql('dt.subject')} = %s {daily_date_filter}
-            """, [batch_id, normalize_subject_key(subj)] + daily_params)
+                WHERE {subject_filters.sql}
+            """, subject_filters.params)
             batch_subj_avg_row = cursor.fetchone()
             batch_subj_avg = float(batch_subj_avg_row[0]) if batch_subj_avg_row and batch_subj_avg_row[0] is not None else 0
             subject_metrics.append({
@@ -2273,27 +2312,15 @@ async def get_student_metrics(
         # Percentile among batch students
         cursor.execute(f"""
             WITH all_scores AS (
-                SELECT s.student_no,
-                    CASE
-                        WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                            THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                        WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                            THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                        ELSE safe_numeric(dt.total_marks)
-                    END AS score
+                SELECT s.student_no, {daily_score_expr} AS score
                 FROM daily_test dt
                 JOIN student s ON s.student_no = dt.student_no
-                WHERE s.batch_id = %s {daily_date_filter}
+                WHERE {batch_daily.sql}
                 UNION ALL
-                SELECT s.student_no,
-                    CASE
-                        WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                            THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                        ELSE safe_numeric(mt.total_marks)
-                    END AS score
-                FROM mock_test mt
+                SELECT s.student_no, {mock_total_score_expr} AS score
+                FROM mock_test_wide mt
                 JOIN student s ON s.student_no = mt.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
+                WHERE {batch_mock.sql}
             ),
             student_avg AS (
                 SELECT student_no, AVG(score) AS avg_score
@@ -2306,7 +2333,7 @@ async def get_student_metrics(
                 FROM student_avg
             )
             SELECT pr FROM ranked WHERE student_no = %s
-        """, [batch_id] + daily_params + [batch_id] + mock_params + [student_no])
+        """, batch_daily.params + batch_mock.params + [student_no])
         pr_row = cursor.fetchone()
         percentile_overall = round(float(pr_row[0]) * 100, 1) if pr_row and pr_row[0] is not None else 0
 
@@ -2392,33 +2419,17 @@ async def get_student_weak_topics(
         weak_units = []
 
         if selected_type == "daily":
-            score_expr = """
-                CASE
-                    WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                        THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                    WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                        THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                    ELSE safe_numeric(dt.total_marks)
-                END
-            """
-
-            filters = ""
-            params = [student_no]
-            if subject:
-                filters += f" AND {normalized_subject_sql('dt.subject')} = %s"
-                params.append(normalize_subject_key(subject))
-            if date_from:
-                filters += " AND dt.test_date >= %s"
-                params.append(date_from)
-            if date_to:
-                filters += " AND dt.test_date <= %s"
-                params.append(date_to)
+            filters = (
+                Filters("dt.student_no = %s", student_no)
+                .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+                .date_range("dt.test_date", date_from, date_to)
+            )
 
             cursor.execute(f"""
                 SELECT
                     dt.subject,
                     COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown') AS unit_name,
-                    ROUND(AVG({score_expr})::numeric, 2) AS avg_pct,
+                    ROUND(AVG({daily_score_sql()})::numeric, 2) AS avg_pct,
                     COUNT(*) AS attempts,
                     MAX(dt.test_date) AS latest_test_date,
                     COUNT(*) FILTER (
@@ -2427,12 +2438,12 @@ async def get_student_weak_topics(
                           AND safe_numeric(dt.total_marks) IS NULL
                     ) AS non_numeric_attempts
                 FROM daily_test dt
-                WHERE dt.student_no = %s {filters}
+                WHERE {filters.sql}
                 GROUP BY dt.subject, COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown')
                 HAVING COUNT(*) > 0
                 ORDER BY avg_pct ASC NULLS LAST, attempts DESC
                 LIMIT %s
-            """, params + [normalized_limit])
+            """, filters.params + [normalized_limit])
 
             for row in cursor.fetchall():
                 avg_pct = float(row[2]) if row[2] is not None else 0.0
@@ -2457,14 +2468,7 @@ async def get_student_weak_topics(
                     "remediation_action": action
                 })
         else:
-            filters = ""
-            params = [student_no]
-            if date_from:
-                filters += " AND mt.test_date >= %s"
-                params.append(date_from)
-            if date_to:
-                filters += " AND mt.test_date <= %s"
-                params.append(date_to)
+            filters = Filters("mt.student_no = %s", student_no).date_range("mt.test_date", date_from, date_to)
 
             cursor.execute(f"""
                 SELECT
@@ -2481,10 +2485,10 @@ async def get_student_weak_topics(
                     mt.physics_total_marks,
                     mt.chemistry_total_marks,
                     mt.biology_total_marks
-                FROM mock_test mt
-                WHERE mt.student_no = %s {filters}
+                FROM mock_test_wide mt
+                WHERE {filters.sql}
                 ORDER BY mt.test_date DESC
-            """, params)
+            """, filters.params)
 
             subject_filter_key = normalize_subject_key(subject) if subject else None
             if subject_filter_key == "mathematics":
@@ -2802,7 +2806,7 @@ async def get_student_test_insights(
                     mt.physics_total_marks,
                     mt.chemistry_total_marks,
                     mt.biology_total_marks
-                FROM mock_test mt
+                FROM mock_test_wide mt
                 WHERE mt.student_no = %s
                 ORDER BY mt.test_date ASC, mt.test_id ASC
             """, (student_no,))
@@ -2822,7 +2826,7 @@ async def get_student_test_insights(
                     mt.physics_total_marks,
                     mt.chemistry_total_marks,
                     mt.biology_total_marks
-                FROM mock_test mt
+                FROM mock_test_wide mt
                 JOIN student s ON s.student_no = mt.student_no
                 WHERE s.batch_id = %s
                 ORDER BY mt.test_date ASC
@@ -3058,43 +3062,15 @@ async def get_batch_advanced_stats(
         if not cursor.fetchone():
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Batch {batch_id} not found")
 
-        daily_date_filter = ""
-        mock_date_filter = ""
-        daily_subject_filter = ""
-        daily_params = []
-        mock_params = []
-        daily_subject_params = []
-
-        if date_from:
-            daily_date_filter += " AND dt.test_date >= %s"
-            mock_date_filter += " AND mt.test_date >= %s"
-            daily_params.append(date_from)
-            mock_params.append(date_from)
-        if date_to:
-            daily_date_filter += " AND dt.test_date <= %s"
-            mock_date_filter += " AND mt.test_date <= %s"
-            daily_params.append(date_to)
-            mock_params.append(date_to)
-        if subject:
-            daily_subject_filter = f" AND {normalized_subject_sql('dt.subject')} = %s"
-            daily_subject_params.append(normalize_subject_key(subject))
-
-        daily_score_expr = """
-            CASE
-                WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                ELSE safe_numeric(dt.total_marks)
-            END
-        """
-        mock_total_score_expr = """
-            CASE
-                WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                ELSE safe_numeric(mt.total_marks)
-            END
-        """
+        daily_filters = (
+            Filters("s.batch_id = %s", batch_id)
+            .date_range("dt.test_date", date_from, date_to)
+            .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        )
+        mock_filters = Filters("s.batch_id = %s", batch_id).date_range("mt.test_date", date_from, date_to)
+
+        daily_score_expr = daily_score_sql()
+        mock_total_score_expr = mock_total_score_sql()
 
         daily_student_avgs = {}
         mock_student_avgs = {}
@@ -3104,20 +3080,20 @@ async def get_batch_advanced_stats(
                 SELECT s.student_id, s.student_name, ROUND(AVG({daily_score_expr})::numeric, 2)
                 FROM daily_test dt
                 JOIN student s ON s.student_no = dt.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
+                WHERE {daily_filters.sql}
                 GROUP BY s.student_id, s.student_name
-            """, [batch_id] + daily_params + daily_subject_params)
+            """, daily_filters.params)
             for sid, sname, avg_score in cursor.fetchall():
                 daily_student_avgs[sid] = {"student_id": sid, "student_name": sname, "avg": float(avg_score) if avg_score is not None else None}
 
         if test_type in ("mock", "both"):
             cursor.execute(f"""
                 SELECT s.student_id, s.student_name, ROUND(AVG({mock_total_score_expr})::numeric, 2)
-                FROM mock_test mt
+                FROM mock_test_wide mt
                 JOIN student s ON s.student_no = mt.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
+                WHERE {mock_filters.sql}
                 GROUP BY s.student_id, s.student_name
-            """, [batch_id] + mock_params)
+            """, mock_filters.params)
             for sid, sname, avg_score in cursor.fetchall():
                 mock_student_avgs[sid] = {"student_id": sid, "student_name": sname, "avg": float(avg_score) if avg_score is not None else None}
 
@@ -3176,9 +3152,9 @@ async def get_batch_advanced_stats(
                     COUNT(DISTINCT dt.student_no)
                 FROM daily_test dt
                 JOIN student s ON s.student_no = dt.student_no
-                WHERE s.batch_id = %s {daily_date_filter} {daily_subject_filter}
+                WHERE {daily_filters.sql}
                 GROUP BY dt.test_date, dt.subject, dt.unit_name
-            """, [batch_id] + daily_params + daily_subject_params)
+            """, daily_filters.params)
             for r in cursor.fetchall():
                 avg_score = float(r[3]) if r[3] is not None else None
                 difficulty_by_test.append({
@@ -3195,11 +3171,11 @@ async def get_batch_advanced_stats(
                     mt.test_date,
                     ROUND(AVG({mock_total_score_expr})::numeric, 2) AS avg_score,
                     COUNT(DISTINCT mt.student_no)
-                FROM mock_test mt
+                FROM mock_test_wide mt
                 JOIN student s ON s.student_no = mt.student_no
-                WHERE s.batch_id = %s {mock_date_filter}
+                WHERE {mock_filters.sql}
                 GROUP BY mt.test_date
-            """, [batch_id] + mock_params)
+            """, mock_filters.params)
             for r in cursor.fetchall():
                 avg_score = float(r[1]) if r[1] is not None else None
                 difficulty_by_test.append({
@@ -3266,20 +3242,8 @@ async def get_risk_dashboard(
         if not cursor.fetchone():
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Batch {batch_id} not found")
 
-        daily_date_filter = ""
-        mock_date_filter = ""
-        daily_params = []
-        mock_params = []
-        if date_from:
-            daily_date_filter += " AND dt.test_date >= %s"
-            mock_date_filter += " AND mt.test_date >= %s"
-            daily_params.append(date_from)
-            mock_params.append(date_from)
-        if date_to:
-            daily_date_filter += " AND dt.test_date <= %s"
-            mock_date_filter += " AND mt.test_date <= %s"
-            daily_params.append(date_to)
-            mock_params.append(date_to)
+        daily_filters = Filters("s.batch_id = %s", batch_id).date_range("dt.test_date", date_from, date_to)
+        mock_filters = Filters("s.batch_id = %s", batch_id).date_range("mt.test_date", date_from, date_to)
 
         # students in batch
         cursor.execute("SELECT student_no, student_id, student_name FROM student WHERE batch_id = %s", (batch_id,))
@@ -3291,16 +3255,16 @@ async def get_risk_dashboard(
             SELECT COUNT(DISTINCT (dt.test_date, dt.subject, dt.unit_name))
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {daily_date_filter}
-        """, [batch_id] + daily_params)
+            WHERE {daily_filters.sql}
+        """, daily_filters.params)
         total_daily_conducted = cursor.fetchone()[0] or 0
 
         cursor.execute(f"""
             SELECT COUNT(DISTINCT mt.test_date)
-            FROM mock_test mt
+            FROM mock_test_wide mt
             JOIN student s ON s.student_no = mt.student_no
-            WHERE s.batch_id = %s {mock_date_filter}
-        """, [batch_id] + mock_params)
+            WHERE {mock_filters.sql}
+        """, mock_filters.params)
         total_mock_conducted = cursor.fetchone()[0] or 0
 
         # fetch all scored rows for batch in one pass
@@ -3308,36 +3272,26 @@ async def get_risk_dashboard(
             SELECT
                 dt.student_no,
                 dt.test_date,
-                CASE
-                    WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                        THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                    WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                        THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                    ELSE safe_numeric(dt.total_marks)
-                END AS score,
+                {daily_score_sql()} AS score,
                 dt.total_marks,
                 dt.subject,
                 dt.unit_name
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {daily_date_filter}
-        """, [batch_id] + daily_params)
+            WHERE {daily_filters.sql}
+        """, daily_filters.params)
         daily_scores_rows = cursor.fetchall()
 
         cursor.execute(f"""
             SELECT
                 mt.student_no,
                 mt.test_date,
-                CASE
-                    WHEN mt.test_total_marks IS NOT NULL AND mt.test_total_marks > 0 AND safe_numeric(mt.total_marks) IS NOT NULL
-                        THEN (safe_numeric(mt.total_marks) * 100.0 / mt.test_total_marks)
-                    ELSE safe_numeric(mt.total_marks)
-                END AS score,
+                {mock_total_score_sql()} AS score,
                 mt.total_marks
-            FROM mock_test mt
+            FROM mock_test_wide mt
             JOIN student s ON s.student_no = mt.student_no
-            WHERE s.batch_id = %s {mock_date_filter}
-        """, [batch_id] + mock_params)
+            WHERE {mock_filters.sql}
+        """, mock_filters.params)
         mock_scores_rows = cursor.fetchall()
 
         by_student_points = defaultdict(list)
@@ -3450,34 +3404,19 @@ async def get_subject_diagnostics(
         if not cursor.fetchone():
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Batch {batch_id} not found")
 
-        date_filter = ""
-        params = [batch_id]
-        if date_from:
-            date_filter += " AND dt.test_date >= %s"
-            params.append(date_from)
-        if date_to:
-            date_filter += " AND dt.test_date <= %s"
-            params.append(date_to)
-        if subject:
-            date_filter += f" AND {normalized_subject_sql('dt.subject')} = %s"
-            params.append(normalize_subject_key(subject))
-
-        daily_score_expr = """
-            CASE
-                WHEN dt.subject_total_marks IS NOT NULL AND dt.subject_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.subject_total_marks)
-                WHEN dt.test_total_marks IS NOT NULL AND dt.test_total_marks > 0 AND safe_numeric(dt.total_marks) IS NOT NULL
-                    THEN (safe_numeric(dt.total_marks) * 100.0 / dt.test_total_marks)
-                ELSE safe_numeric(dt.total_marks)
-            END
-        """
+        filters = (
+            Filters("s.batch_id = %s", batch_id)
+            .date_range("dt.test_date", date_from, date_to)
+            .subject("dt.subject", normalize_subject_key(subject) if subject else None)
+        )
+        daily_score_expr = daily_score_sql()
 
         cursor.execute(f"""
             SELECT ROUND(AVG({daily_score_expr})::numeric, 2)
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {date_filter}
-        """, params)
+            WHERE {filters.sql}
+        """, filters.params)
         batch_avg_row = cursor.fetchone()
         subject_avg = float(batch_avg_row[0]) if batch_avg_row and batch_avg_row[0] is not None else None
 
@@ -3490,10 +3429,10 @@ async def get_subject_diagnostics(
                 COUNT(DISTINCT dt.student_no) AS students
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {date_filter}
+            WHERE {filters.sql}
             GROUP BY COALESCE(dt.unit_name, 'Unknown')
             ORDER BY avg_score ASC NULLS LAST
-        """, params)
+        """, filters.params)
         unit_breakdown = []
         for row in cursor.fetchall():
             avg_score = float(row[1]) if row[1] is not None else None
@@ -3513,10 +3452,10 @@ async def get_subject_diagnostics(
                 ROUND(AVG({daily_score_expr})::numeric, 2) AS avg_score
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {date_filter}
+            WHERE {filters.sql}
             GROUP BY s.student_id, s.student_name
             ORDER BY avg_score ASC NULLS LAST
-        """, params)
+        """, filters.params)
         student_avg_rows = cursor.fetchall()
 
         weak_students = []
@@ -3538,13 +3477,11 @@ async def get_subject_diagnostics(
             SELECT s.student_id, s.student_name, dt.test_date, {daily_score_expr} AS score
             FROM daily_test dt
             JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s {date_filter}
+            WHERE {filters.sql}
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id,
+                s.sort_key,
                 dt.test_date
-        """, params)
+        """, filters.params)
         points_by_student = defaultdict(list)
         names = {}
         for sid, sname, d, score in cursor.fetchall():
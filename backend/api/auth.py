@@ -8,14 +8,16 @@ from datetime import datetime
 import uuid
 from config import CORS_ORIGINS, APP_TITLE
 from db_pool import get_db_connection
+from metrics import BCRYPT_SECONDS
 from api.middleware import (
     create_access_token,
     create_refresh_token,
     decode_token,
     get_current_user,
 )
+from api.responses import FastJSONResponse
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -48,12 +50,14 @@ class RefreshRequest(BaseModel):
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with BCRYPT_SECONDS.labels("hash").time():
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 
 def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against a bcrypt hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    with BCRYPT_SECONDS.labels("verify").time():
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 
 # ── Routes ──
@@ -1,15 +1,18 @@
-from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi import FastAPI, HTTPException, status, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, validator
 from typing import List, Optional
 import psycopg2
-from psycopg2 import sql
-from datetime import datetime
-from config import CORS_ORIGINS, APP_TITLE
+from datetime import datetime, timedelta
+import os
+import time
+from config import CORS_ORIGINS, APP_TITLE, BATCH_DELETE_CHUNK_SIZE
 from api.middleware import get_current_user
 from db_pool import get_db_connection
+from metrics import JOB_DURATION
+from api.responses import FastJSONResponse
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 
 SUBJECT_CANONICAL = {
@@ -39,6 +42,19 @@ app.add_middleware(
 )
 
 
+# A running deletion job refreshes updated_at after every chunk; one that has
+# not moved for this long died with its worker and is replaced by a new job
+DELETION_JOB_STALE_AFTER = timedelta(minutes=5)
+
+DELETION_JOB_FIELDS = [
+    "job_id", "batch_id", "batch_name", "status", "students_total", "students_deleted",
+    "photos_removed", "error", "created_at", "updated_at", "finished_at",
+]
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AVATARS_DIR = os.path.realpath(os.path.join(BASE_DIR, "uploads", "avatars"))
+
+
 # Pydantic models
 class BatchCreate(BaseModel):
     batch_name: str
@@ -189,12 +205,17 @@ async def get_batches(current_user: dict = Depends(get_current_user)):
         
         cursor = conn.cursor()
         
-        # Fetch all batches
+        # Fetch all batches, except those being deleted in the background
         cursor.execute("""
             SELECT batch_id, batch_name, start_year, end_year, type, subjects, created_at
-            FROM batch
+            FROM batch b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM batch_deletion_job j
+                WHERE j.batch_id = b.batch_id AND j.status IN ('queued', 'running')
+                  AND j.updated_at > LOCALTIMESTAMP - %s
+            )
             ORDER BY created_at DESC;
-        """)
+        """, (DELETION_JOB_STALE_AFTER,))
         
         batches = cursor.fetchall()
         
@@ -228,14 +249,115 @@ async def get_batches(current_user: dict = Depends(get_current_user)):
         )
 
 
-@app.delete("/api/batch/{batch_id}", status_code=status.HTTP_200_OK)
-async def delete_batch(batch_id: int, current_user: dict = Depends(get_current_user)):
+def remove_avatar_files(photo_urls: List[str]) -> int:
+    """Best-effort removal of the uploaded avatar files behind photo_url values"""
+    removed = 0
+    for photo_url in photo_urls:
+        path = os.path.realpath(os.path.join(BASE_DIR, photo_url.lstrip("/")))
+        # Only touch files stored by the photo upload endpoints
+        if os.path.dirname(path) != AVATARS_DIR:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def run_batch_deletion(job_id: int, batch_id: int):
+    """
+    Background task: delete a batch's students BATCH_DELETE_CHUNK_SIZE at a
+    time, each chunk in its own short transaction, then the batch itself.
+    ON DELETE CASCADE removes each student's parent/10th/12th/entrance/
+    counselling details, feedback, achievements and marks, and the batch's
+    exams. Progress is recorded on the batch_deletion_job row.
     """
-    Delete a batch and ALL related data:
-    - Student-related: parent_info, tenth_mark, twelfth_mark, entrance_exams,
-      counselling_detail, feedback, daily_test, mock_test
-    - Batch-related: achievers
-    - Then students and the batch itself
+    started = time.perf_counter()
+    outcome = "error"
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE batch_deletion_job SET status = 'running', updated_at = LOCALTIMESTAMP WHERE job_id = %s",
+            (job_id,)
+        )
+        conn.commit()
+
+        while True:
+            cursor.execute("""
+                DELETE FROM student
+                WHERE student_no IN (
+                    SELECT student_no FROM student
+                    WHERE batch_id = %s
+                    ORDER BY student_no
+                    LIMIT %s
+                )
+                RETURNING photo_url
+            """, (batch_id, BATCH_DELETE_CHUNK_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.execute("""
+                UPDATE batch_deletion_job
+                SET students_deleted = students_deleted + %s, updated_at = LOCALTIMESTAMP
+                WHERE job_id = %s
+            """, (len(rows), job_id))
+            conn.commit()
+
+            # Files go only once the rows are gone for good
+            removed = remove_avatar_files([row[0] for row in rows if row[0]])
+            if removed:
+                cursor.execute(
+                    "UPDATE batch_deletion_job SET photos_removed = photos_removed + %s WHERE job_id = %s",
+                    (removed, job_id)
+                )
+                conn.commit()
+
+        # Achievements recorded against the batch without a student
+        cursor.execute("DELETE FROM achievers WHERE batch_id = %s", (batch_id,))
+        cursor.execute("DELETE FROM batch WHERE batch_id = %s", (batch_id,))
+        cursor.execute("""
+            UPDATE batch_deletion_job
+            SET status = 'completed', updated_at = LOCALTIMESTAMP, finished_at = LOCALTIMESTAMP
+            WHERE job_id = %s
+        """, (job_id,))
+        conn.commit()
+        cursor.close()
+        outcome = "ok"
+
+    except Exception as e:
+        if conn:
+            try:
+                conn.rollback()
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE batch_deletion_job
+                    SET status = 'failed', error = %s, updated_at = LOCALTIMESTAMP, finished_at = LOCALTIMESTAMP
+                    WHERE job_id = %s
+                """, (str(e), job_id))
+                conn.commit()
+            except psycopg2.Error:
+                pass
+    finally:
+        if conn:
+            conn.close()
+        JOB_DURATION.labels("batch_deletion", outcome).observe(time.perf_counter() - started)
+
+
+@app.delete("/api/batch/{batch_id}", status_code=status.HTTP_202_ACCEPTED)
+async def delete_batch(
+    batch_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Start deleting a batch and ALL related data (students with their details,
+    feedback, achievements and marks; the batch's exams) as a background job.
+
+    Returns the job; poll GET /api/batch/deletion-jobs/{job_id} for progress.
+    If the batch is already being deleted the running job is returned.
     """
     conn = None
     try:
@@ -248,8 +370,8 @@ async def delete_batch(batch_id: int, current_user: dict = Depends(get_current_u
 
         cursor = conn.cursor()
 
-        # 1. Verify batch exists
-        cursor.execute("SELECT batch_id, batch_name FROM batch WHERE batch_id = %s", (batch_id,))
+        # Lock the batch row so concurrent requests don't start two jobs
+        cursor.execute("SELECT batch_name FROM batch WHERE batch_id = %s FOR UPDATE", (batch_id,))
         batch_row = cursor.fetchone()
         if not batch_row:
             raise HTTPException(
@@ -257,60 +379,48 @@ async def delete_batch(batch_id: int, current_user: dict = Depends(get_current_u
                 detail=f"Batch with ID {batch_id} not found"
             )
 
-        batch_name = batch_row[1]
-
-        # 2. Get all student_nos in this batch
-        cursor.execute("SELECT student_no FROM student WHERE batch_id = %s", (batch_id,))
-        student_nos = [row[0] for row in cursor.fetchall()]
-
-        # 3. Delete all student-related records if students exist
-        if student_nos:
-            # Use ANY() with a postgres array for efficient bulk delete
-            student_no_tuple = tuple(student_nos)
-
-            # Child tables that reference student_no
-            student_child_tables = [
-                "feedback",
-                "student_feedback",
-                "entrance_exams",
-                "counselling_detail",
-                "twelfth_mark",
-                "tenth_mark",
-                "parent_info",
-                "daily_test",
-                "mock_test",
-            ]
-
-            for table in student_child_tables:
-                cursor.execute("SELECT to_regclass(%s)", (f"public.{table}",))
-                if not cursor.fetchone()[0]:
-                    continue
-                cursor.execute(
-                    sql.SQL("DELETE FROM {} WHERE student_no IN %s").format(
-                        sql.Identifier(table)
-                    ),
-                    (student_no_tuple,)
-                )
-
-        # 4. Delete achievers linked to this batch
-        cursor.execute("DELETE FROM achievers WHERE batch_id = %s", (batch_id,))
-
-        # 5. Delete all students in this batch
-        cursor.execute("DELETE FROM student WHERE batch_id = %s", (batch_id,))
-        deleted_students = cursor.rowcount
+        batch_name = batch_row[0]
+
+        cursor.execute(f"""
+            SELECT {', '.join(DELETION_JOB_FIELDS)}
+            FROM batch_deletion_job
+            WHERE batch_id = %s AND status IN ('queued', 'running')
+              AND updated_at > LOCALTIMESTAMP - %s
+            ORDER BY job_id DESC
+            LIMIT 1
+        """, (batch_id, DELETION_JOB_STALE_AFTER))
+        live_job = cursor.fetchone()
+        if live_job:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            return {
+                "message": f"Batch '{batch_name}' is already being deleted",
+                "job": dict(zip(DELETION_JOB_FIELDS, live_job))
+            }
 
-        # 6. Delete the batch itself
-        cursor.execute("DELETE FROM batch WHERE batch_id = %s", (batch_id,))
+        cursor.execute("""
+            UPDATE batch_deletion_job
+            SET status = 'failed', error = 'Interrupted', updated_at = LOCALTIMESTAMP, finished_at = LOCALTIMESTAMP
+            WHERE batch_id = %s AND status IN ('queued', 'running')
+        """, (batch_id,))
+
+        cursor.execute(f"""
+            INSERT INTO batch_deletion_job (batch_id, batch_name, students_total)
+            VALUES (%s, %s, (SELECT COUNT(*) FROM student WHERE batch_id = %s))
+            RETURNING {', '.join(DELETION_JOB_FIELDS)}
+        """, (batch_id, batch_name, batch_id))
+        job = dict(zip(DELETION_JOB_FIELDS, cursor.fetchone()))
 
         conn.commit()
         cursor.close()
         conn.close()
 
+        background_tasks.add_task(run_batch_deletion, job["job_id"], batch_id)
+
         return {
-            "message": f"Batch '{batch_name}' and all related data deleted successfully",
-            "batch_id": batch_id,
-            "batch_name": batch_name,
-            "students_deleted": deleted_students
+            "message": f"Deletion of batch '{batch_name}' started",
+            "job": job
         }
 
     except HTTPException:
@@ -338,6 +448,41 @@ async def delete_batch(batch_id: int, current_user: dict = Depends(get_current_u
         )
 
 
+@app.get("/api/batch/deletion-jobs/{job_id}")
+async def get_batch_deletion_job(job_id: int, current_user: dict = Depends(get_current_user)):
+    """Progress of a batch deletion job"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(DELETION_JOB_FIELDS)} FROM batch_deletion_job WHERE job_id = %s",
+            (job_id,)
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        conn.close()
+
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Deletion job {job_id} not found"
+            )
+
+        return dict(zip(DELETION_JOB_FIELDS, row))
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        if conn:
+            conn.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Server error: {str(e)}"
+        )
+
+
 @app.put("/api/batch/{batch_id}/rename", status_code=status.HTTP_200_OK)
 @app.patch("/api/batch/{batch_id}/rename", status_code=status.HTTP_200_OK)
 @app.post("/api/batch/{batch_id}/rename", status_code=status.HTTP_200_OK)
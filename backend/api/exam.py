@@ -5,6 +5,7 @@ from pydantic import BaseModel, validator, Field
 from typing import List, Optional
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 from datetime import datetime, date
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -14,8 +15,10 @@ from io import BytesIO
 from config import CORS_ORIGINS, APP_TITLE
 from api.middleware import get_current_user
 from db_pool import get_db_connection
+from metrics import timed_job
+from api.responses import FastJSONResponse
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 MOCK_SUBJECT_CONFIG = {
     "maths": {"aliases": {"maths", "mathematics", "math"}, "unit_field": "mathsUnitNames"},
@@ -81,6 +84,254 @@ def extract_grade_from_batch_name(batch_name: Optional[str]) -> Optional[int]:
 def normalized_subject_sql(column_name: str) -> str:
     return f"LOWER(TRIM({column_name}))"
 
+
+def fetch_batch_students(cursor, batch_id: int, student_ids) -> dict:
+    """Map admission numbers to (student_no, board) for one batch in a single query (latest record wins)"""
+    cursor.execute("""
+        SELECT DISTINCT ON (student_id) student_id, student_no, board
+        FROM student
+        WHERE batch_id = %s AND student_id = ANY(%s)
+        ORDER BY student_id, created_at DESC, student_no DESC
+    """, (batch_id, list(set(student_ids))))
+    return {r[0]: (r[1], r[2]) for r in cursor.fetchall()}
+
+
+def upsert_daily_test_rows(cursor, exam_id: int, rows) -> tuple:
+    """
+    Insert or overwrite daily_test rows of one exam in one statement, keyed on
+    (student_no, test_date, subject_key, unit_key) so re-uploads are safe to retry.
+
+    rows: (student_no, grade, board, test_date, subject, unit_name,
+           total_marks, subject_total_marks, test_total_marks) tuples with
+           at most one row per key.
+    Returns (inserted_count, updated_count).
+    """
+    if not rows:
+        return 0, 0
+    # New rows start at version 1 and the conflict branch bumps it, so
+    # version > 1 marks an overwrite (xmax is not readable on partitioned tables)
+    results = execute_values(cursor, """
+        INSERT INTO daily_test (
+            student_no, grade, board, test_date,
+            subject, unit_name, total_marks, subject_total_marks, test_total_marks, exam_id
+        )
+        VALUES %s
+        ON CONFLICT (student_no, test_date, subject_key, unit_key) DO UPDATE SET
+            exam_id = EXCLUDED.exam_id,
+            grade = EXCLUDED.grade,
+            board = EXCLUDED.board,
+            subject = EXCLUDED.subject,
+            unit_name = EXCLUDED.unit_name,
+            total_marks = EXCLUDED.total_marks,
+            subject_total_marks = EXCLUDED.subject_total_marks,
+            test_total_marks = EXCLUDED.test_total_marks,
+            version = daily_test.version + 1
+        RETURNING (version > 1)
+    """, [tuple(row) + (exam_id,) for row in rows], page_size=1000, fetch=True)
+    updated_count = sum(1 for r in results if r[0])
+    return len(results) - updated_count, updated_count
+
+
+MOCK_SUBJECTS = ["maths", "physics", "chemistry", "biology"]
+
+
+def mock_unit_key(unit_names_by_subject: dict) -> str:
+    """
+    Canonical text form of a mock test's unit names, e.g. 'chemistry:C1,C2;physics:P1'.
+    Subjects without units are left out. Must match the SQL backfill in
+    database/migrate_mock_subject_marks.py.
+    """
+    return ";".join(
+        f"{subject}:{','.join(units)}"
+        for subject, units in sorted(unit_names_by_subject.items())
+        if units
+    )
+
+
+def write_mock_subject_marks(cursor, subject_rows):
+    """
+    Replace the per-subject rows of the given mock tests.
+
+    subject_rows: (test_id, test_date, subject_key, marks, total_marks, unit_names) tuples.
+    Subjects with no mark, total or units are not stored.
+    """
+    test_ids = list({r[0] for r in subject_rows})
+    if not test_ids:
+        return
+    cursor.execute("DELETE FROM mock_test_subject_mark WHERE test_id = ANY(%s)", (test_ids,))
+    rows = [r for r in subject_rows if r[3] is not None or r[4] is not None or r[5]]
+    if rows:
+        execute_values(cursor, """
+            INSERT INTO mock_test_subject_mark (test_id, test_date, subject_key, marks, total_marks, unit_names)
+            VALUES %s
+        """, rows, page_size=1000)
+
+
+def mock_subject_rows(test_id, test_date, marks, unit_names, subject_totals):
+    """Unpivot the four legacy subject fields of one mock entry into mock_test_subject_mark rows"""
+    return [
+        (test_id, test_date, subject, marks[i], subject_totals[i], list(unit_names[i] or []))
+        for i, subject in enumerate(MOCK_SUBJECTS)
+    ]
+
+
+def upsert_mock_test_rows(cursor, exam_id: int, rows) -> tuple:
+    """
+    Insert or overwrite mock tests of one exam in one statement per table, keyed on
+    (student_no, test_date, unit_key) so re-uploads are safe to retry.
+
+    rows: (student_no, grade, board, test_date,
+           maths_marks, physics_marks, chemistry_marks, biology_marks,
+           maths_unit_names, physics_unit_names, chemistry_unit_names, biology_unit_names,
+           total_marks,
+           maths_total_marks, physics_total_marks, chemistry_total_marks, biology_total_marks,
+           test_total_marks) tuples with at most one row per key.
+    Returns (inserted_count, updated_count).
+    """
+    if not rows:
+        return 0, 0
+    entries = {}
+    for row in rows:
+        unit_key = mock_unit_key(dict(zip(MOCK_SUBJECTS, row[8:12])))
+        entries[(row[0], row[3], unit_key)] = row
+    results = execute_values(cursor, """
+        INSERT INTO mock_test (
+            student_no, grade, board, test_date, unit_key, total_marks, test_total_marks, exam_id
+        )
+        VALUES %s
+        ON CONFLICT (student_no, test_date, unit_key) DO UPDATE SET
+            exam_id = EXCLUDED.exam_id,
+            grade = EXCLUDED.grade,
+            board = EXCLUDED.board,
+            total_marks = EXCLUDED.total_marks,
+            test_total_marks = EXCLUDED.test_total_marks,
+            version = mock_test.version + 1
+        RETURNING test_id, student_no, test_date, unit_key, (version > 1)
+    """, [
+        (row[0], row[1], row[2], row[3], unit_key, row[12], row[17], exam_id)
+        for (_, _, unit_key), row in entries.items()
+    ], page_size=1000, fetch=True)
+
+    subject_rows = []
+    for test_id, student_no, test_date, unit_key, _ in results:
+        row = entries[(student_no, test_date, unit_key)]
+        subject_rows.extend(mock_subject_rows(test_id, test_date, row[4:8], row[8:12], row[13:17]))
+    write_mock_subject_marks(cursor, subject_rows)
+    updated_count = sum(1 for r in results if r[4])
+    return len(results) - updated_count, updated_count
+
+
+def upsert_exam(
+    cursor,
+    batch_id: int,
+    exam_type: str,
+    test_date,
+    exam_name: Optional[str] = None,
+    subject: Optional[str] = None,
+    unit_name: Optional[str] = None,
+    unit_key: str = "",
+    subject_total_marks: Optional[int] = None,
+    test_total_marks: Optional[int] = None,
+) -> int:
+    """
+    Create the exam header for one test of a batch, or refresh its name and totals, and return its exam_id.
+    Unit tests are keyed on (test_date, subject, unit_name); monthly tests on (test_date, unit_key).
+    Refreshing an existing header bumps its group version (the conflict branch holds the row lock).
+    """
+    cursor.execute("""
+        INSERT INTO exam (
+            batch_id, exam_type, exam_name, test_date,
+            subject, unit_name, unit_key, subject_total_marks, test_total_marks
+        )
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (batch_id, exam_type, test_date, subject_key, unit_key) DO UPDATE SET
+            exam_name = COALESCE(EXCLUDED.exam_name, exam.exam_name),
+            subject = EXCLUDED.subject,
+            unit_name = EXCLUDED.unit_name,
+            subject_total_marks = EXCLUDED.subject_total_marks,
+            test_total_marks = EXCLUDED.test_total_marks,
+            version = exam.version + 1
+        RETURNING exam_id
+    """, (
+        batch_id, exam_type, exam_name, test_date,
+        subject, unit_name, unit_key, subject_total_marks, test_total_marks
+    ))
+    return cursor.fetchone()[0]
+
+
+def write_exam_subjects(cursor, exam_id: int, subject_totals, unit_names):
+    """Replace the subject totals and units of a monthly test (aligned with MOCK_SUBJECTS)"""
+    cursor.execute("DELETE FROM exam_subject WHERE exam_id = %s", (exam_id,))
+    rows = [
+        (exam_id, subject, subject_totals[i], list(unit_names[i] or []))
+        for i, subject in enumerate(MOCK_SUBJECTS)
+        if subject_totals[i] is not None or unit_names[i]
+    ]
+    if rows:
+        execute_values(cursor, """
+            INSERT INTO exam_subject (exam_id, subject_key, total_marks, unit_names)
+            VALUES %s
+        """, rows)
+
+
+def find_daily_exam(cursor, batch_id: int, group_ref) -> Optional[int]:
+    """exam_id of the unit test a group payload refers to, by exam_id or by date, subject and unit"""
+    if group_ref.exam_id is not None:
+        cursor.execute("""
+            SELECT exam_id FROM exam
+            WHERE exam_id = %s AND batch_id = %s AND exam_type = 'daily'
+        """, (group_ref.exam_id, batch_id))
+    else:
+        cursor.execute("""
+            SELECT exam_id FROM exam
+            WHERE batch_id = %s AND exam_type = 'daily'
+              AND test_date = %s AND subject_key = %s AND unit_key = %s
+        """, (batch_id, group_ref.test_date, normalize_subject_key(group_ref.subject), group_ref.unit_name or ""))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def find_mock_exam(cursor, batch_id: int, group_ref) -> Optional[int]:
+    """exam_id of the monthly test a group payload refers to, by exam_id or by date and unit names"""
+    if group_ref.exam_id is not None:
+        cursor.execute("""
+            SELECT exam_id FROM exam
+            WHERE exam_id = %s AND batch_id = %s AND exam_type = 'mock'
+        """, (group_ref.exam_id, batch_id))
+    else:
+        unit_key = mock_unit_key(dict(zip(MOCK_SUBJECTS, [
+            group_ref.maths_unit_names,
+            group_ref.physics_unit_names,
+            group_ref.chemistry_unit_names,
+            group_ref.biology_unit_names,
+        ])))
+        cursor.execute("""
+            SELECT exam_id FROM exam
+            WHERE batch_id = %s AND exam_type = 'mock'
+              AND test_date = %s AND subject_key = '' AND unit_key = %s
+        """, (batch_id, group_ref.test_date, unit_key))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def lock_exam_version(cursor, exam_id: int, expected_version: Optional[int]) -> int:
+    """
+    Lock the exam header of one group, bump its version and return the new one.
+
+    Every write to the group goes through the header row, so a client holding an
+    older version gets 409 instead of overwriting newer marks.
+    expected_version=None skips the check.
+    """
+    cursor.execute("SELECT version FROM exam WHERE exam_id = %s FOR UPDATE", (exam_id,))
+    row = cursor.fetchone()
+    if row is None or (expected_version is not None and expected_version != row[0]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="These marks were changed by someone else after you opened them. Reload the exam and try again."
+        )
+    cursor.execute("UPDATE exam SET version = version + 1 WHERE exam_id = %s RETURNING version", (exam_id,))
+    return cursor.fetchone()[0]
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -187,6 +438,7 @@ class MockTestBulkCreate(BaseModel):
 
 
 class DailyTestGroupRef(BaseModel):
+    exam_id: Optional[int] = None
     test_date: date
     subject: str
     unit_name: str
@@ -200,15 +452,18 @@ class DailyTestMarkUpdate(BaseModel):
 
 
 class DailyTestGroupUpdate(BaseModel):
+    exam_id: Optional[int] = None
     test_date: date
     subject: str
     unit_name: str
     subject_total_marks: Optional[int] = None
     test_total_marks: Optional[int] = None
+    version: Optional[int] = None  # group version the client loaded; None skips the conflict check
     studentMarks: List[DailyTestMarkUpdate]
 
 
 class MockTestGroupRef(BaseModel):
+    exam_id: Optional[int] = None
     test_date: date
     maths_unit_names: List[str] = Field(default_factory=list)
     physics_unit_names: List[str] = Field(default_factory=list)
@@ -230,6 +485,7 @@ class MockTestMarkUpdate(BaseModel):
 
 
 class MockTestGroupUpdate(BaseModel):
+    exam_id: Optional[int] = None
     test_date: date
     maths_unit_names: List[str] = Field(default_factory=list)
     physics_unit_names: List[str] = Field(default_factory=list)
@@ -240,11 +496,7 @@ class MockTestGroupUpdate(BaseModel):
     chemistry_total_marks: Optional[int] = None
     biology_total_marks: Optional[int] = None
     test_total_marks: Optional[int] = None
-    original_maths_total_marks: Optional[int] = None
-    original_physics_total_marks: Optional[int] = None
-    original_chemistry_total_marks: Optional[int] = None
-    original_biology_total_marks: Optional[int] = None
-    original_test_total_marks: Optional[int] = None
+    version: Optional[int] = None  # group version the client loaded; None skips the conflict check
     studentMarks: List[MockTestMarkUpdate]
 
 
@@ -299,69 +551,68 @@ async def create_daily_test(exam_data: DailyTestCreate, current_user: dict = Dep
             if grade_match:
                 grade = int(grade_match.group())
         
-        # Get board from student (we'll fetch it for each student)
-        inserted_count = 0
         failed_students = []
         subject_total_marks = exam_data.subjectTotalMarks if exam_data.subjectTotalMarks is not None else exam_data.totalMarks
         test_total_marks = exam_data.testTotalMarks if exam_data.testTotalMarks is not None else subject_total_marks
         
+        # Resolve all students (and their boards) in one query
+        student_lookup = fetch_batch_students(
+            cursor, exam_data.batch_id, [m.id for m in exam_data.studentMarks]
+        )
+        
+        rows_by_student = {}
         for student_mark in exam_data.studentMarks:
-            try:
-                # Get student's board
-                cursor.execute("""
-                    SELECT student_no, board
-                    FROM student
-                    WHERE student_id = %s AND batch_id = %s
-                    ORDER BY created_at DESC, student_no DESC
-                    LIMIT 1
-                """, (student_mark.id, exam_data.batch_id))
-                
-                student_result = cursor.fetchone()
-                if not student_result:
-                    failed_students.append({
-                        "student_id": student_mark.id,
-                        "reason": "Student not found"
-                    })
-                    continue
-                
-                student_no = student_result[0]
-                board = student_result[1]
-                
-                # Store marks as-is (supports integers, 'A' for absent, '-' for N/A, negative marks)
-                marks = student_mark.marks.strip() if student_mark.marks and student_mark.marks.strip() else None
-                
-                # Insert unit test record
-                cursor.execute("""
-                    INSERT INTO daily_test (
-                        student_no, grade, board, test_date, 
-                        subject, unit_name, total_marks, subject_total_marks, test_total_marks
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    student_no,
-                    grade,
-                    board,
-                    exam_data.examDate,
-                    normalized_subject,
-                    exam_data.unitName,
-                    marks,
-                    subject_total_marks,
-                    test_total_marks
-                ))
-                
-                inserted_count += 1
-                
-            except psycopg2.Error as db_error:
+            if student_mark.id not in student_lookup:
                 failed_students.append({
                     "student_id": student_mark.id,
-                    "reason": f"Database error: {str(db_error)}"
+                    "reason": "Student not found"
                 })
+                continue
+            
+            student_no, board = student_lookup[student_mark.id]
+            
+            # Store marks as-is (supports integers, 'A' for absent, '-' for N/A, negative marks)
+            marks = student_mark.marks.strip() if student_mark.marks and student_mark.marks.strip() else None
+            
+            # Later entries for the same student win, as ON CONFLICT can't touch a row twice
+            rows_by_student[student_no] = (
+                student_no,
+                grade,
+                board,
+                exam_data.examDate,
+                normalized_subject,
+                exam_data.unitName,
+                marks,
+                subject_total_marks,
+                test_total_marks
+            )
+        
+        # Insert new marks and overwrite existing ones for the same test in one statement
+        exam_id = None
+        inserted_count, updated_count = 0, 0
+        if rows_by_student:
+            exam_id = upsert_exam(
+                cursor, exam_data.batch_id, "daily", exam_data.examDate,
+                exam_name=exam_data.examName,
+                subject=normalized_subject,
+                unit_name=exam_data.unitName,
+                unit_key=exam_data.unitName or "",
+                subject_total_marks=subject_total_marks,
+                test_total_marks=test_total_marks,
+            )
+            inserted_count, updated_count = upsert_daily_test_rows(cursor, exam_id, list(rows_by_student.values()))
         
         conn.commit()
         
-        message = "Unit test marks added successfully" if inserted_count > 0 else "No unit test marks were added — all students failed or were not found"
+        if updated_count > 0:
+            message = f"Unit test marks saved successfully — {updated_count} existing mark(s) overwritten"
+        elif inserted_count > 0:
+            message = "Unit test marks added successfully"
+        else:
+            message = "No unit test marks were added — all students failed or were not found"
         response = {
             "message": message,
+            "exam_id": exam_id,
             "exam_name": exam_data.examName,
             "exam_date": str(exam_data.examDate),
             "subject": normalized_subject,
@@ -370,6 +621,7 @@ async def create_daily_test(exam_data: DailyTestCreate, current_user: dict = Dep
             "subject_total_marks": subject_total_marks,
             "test_total_marks": test_total_marks,
             "inserted_count": inserted_count,
+            "updated_count": updated_count,
             "total_students": len(exam_data.studentMarks)
         }
         
@@ -444,98 +696,92 @@ async def create_mock_test(exam_data: MockTestCreate, current_user: dict = Depen
             total_parts = [v for v in [maths_total_marks, physics_total_marks, chemistry_total_marks, biology_total_marks] if isinstance(v, int)]
             test_total_marks = sum(total_parts) if total_parts else None
         
-        inserted_count = 0
         failed_students = []
         
-        for student_mark in exam_data.studentMarks:
+        # Resolve all students (and their boards) in one query
+        student_lookup = fetch_batch_students(
+            cursor, exam_data.batch_id, [m.id for m in exam_data.studentMarks]
+        )
+        
+        def safe_int(val):
             try:
-                # Get student's board
-                cursor.execute("""
-                    SELECT student_no, board
-                    FROM student
-                    WHERE student_id = %s AND batch_id = %s
-                    ORDER BY created_at DESC, student_no DESC
-                    LIMIT 1
-                """, (student_mark.id, exam_data.batch_id))
-                
-                student_result = cursor.fetchone()
-                if not student_result:
-                    failed_students.append({
-                        "student_id": student_mark.id,
-                        "reason": "Student not found"
-                    })
-                    continue
-                
-                student_no = student_result[0]
-                board = student_result[1]
-                
-                # Store marks as-is (supports integers, 'A' for absent, '-' for N/A, negative marks)
-                maths_marks = student_mark.mathsMarks.strip() if "maths" in active_subjects and student_mark.mathsMarks and student_mark.mathsMarks.strip() else None
-                physics_marks = student_mark.physicsMarks.strip() if "physics" in active_subjects and student_mark.physicsMarks and student_mark.physicsMarks.strip() else None
-                chemistry_marks = student_mark.chemistryMarks.strip() if "chemistry" in active_subjects and student_mark.chemistryMarks and student_mark.chemistryMarks.strip() else None
-                biology_marks = student_mark.biologyMarks.strip() if "biology" in active_subjects and student_mark.biologyMarks and student_mark.biologyMarks.strip() else None
-                
-                # Calculate total marks only from numeric values
-                def safe_int(val):
-                    try:
-                        return int(val)
-                    except (ValueError, TypeError):
-                        return None
-                
-                numeric_marks = [safe_int(m) for m in [maths_marks, physics_marks, chemistry_marks, biology_marks]]
-                valid_marks = [m for m in numeric_marks if m is not None]
-                total_marks = str(sum(valid_marks)) if valid_marks else None
-                
-                # Insert monthly test record
-                cursor.execute("""
-                    INSERT INTO mock_test (
-                        student_no, grade, board, test_date,
-                        maths_marks, physics_marks, chemistry_marks, biology_marks,
-                        maths_unit_names, physics_unit_names, chemistry_unit_names, biology_unit_names,
-                        total_marks,
-                        maths_total_marks, physics_total_marks, chemistry_total_marks, biology_total_marks,
-                        test_total_marks
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    student_no,
-                    grade,
-                    board,
-                    exam_data.examDate,
-                    maths_marks,
-                    physics_marks,
-                    chemistry_marks,
-                    biology_marks,
-                    maths_units,
-                    physics_units,
-                    chemistry_units,
-                    biology_units,
-                    total_marks,
-                    maths_total_marks,
-                    physics_total_marks,
-                    chemistry_total_marks,
-                    biology_total_marks,
-                    test_total_marks
-                ))
-                
-                inserted_count += 1
-                
-            except ValueError as ve:
-                failed_students.append({
-                    "student_id": student_mark.id,
-                    "reason": f"Invalid marks value"
-                })
-            except psycopg2.Error as db_error:
+                return int(val)
+            except (ValueError, TypeError):
+                return None
+        
+        rows_by_student = {}
+        for student_mark in exam_data.studentMarks:
+            if student_mark.id not in student_lookup:
                 failed_students.append({
                     "student_id": student_mark.id,
-                    "reason": f"Database error: {str(db_error)}"
+                    "reason": "Student not found"
                 })
+                continue
+            
+            student_no, board = student_lookup[student_mark.id]
+            
+            # Store marks as-is (supports integers, 'A' for absent, '-' for N/A, negative marks)
+            maths_marks = student_mark.mathsMarks.strip() if "maths" in active_subjects and student_mark.mathsMarks and student_mark.mathsMarks.strip() else None
+            physics_marks = student_mark.physicsMarks.strip() if "physics" in active_subjects and student_mark.physicsMarks and student_mark.physicsMarks.strip() else None
+            chemistry_marks = student_mark.chemistryMarks.strip() if "chemistry" in active_subjects and student_mark.chemistryMarks and student_mark.chemistryMarks.strip() else None
+            biology_marks = student_mark.biologyMarks.strip() if "biology" in active_subjects and student_mark.biologyMarks and student_mark.biologyMarks.strip() else None
+            
+            # Calculate total marks only from numeric values
+            numeric_marks = [safe_int(m) for m in [maths_marks, physics_marks, chemistry_marks, biology_marks]]
+            valid_marks = [m for m in numeric_marks if m is not None]
+            total_marks = str(sum(valid_marks)) if valid_marks else None
+            
+            # Later entries for the same student win, as ON CONFLICT can't touch a row twice
+            rows_by_student[student_no] = (
+                student_no,
+                grade,
+                board,
+                exam_data.examDate,
+                maths_marks,
+                physics_marks,
+                chemistry_marks,
+                biology_marks,
+                maths_units,
+                physics_units,
+                chemistry_units,
+                biology_units,
+                total_marks,
+                maths_total_marks,
+                physics_total_marks,
+                chemistry_total_marks,
+                biology_total_marks,
+                test_total_marks
+            )
+        
+        # Insert new marks and overwrite existing ones for the same test in one statement
+        exam_id = None
+        inserted_count, updated_count = 0, 0
+        if rows_by_student:
+            unit_names = [maths_units, physics_units, chemistry_units, biology_units]
+            exam_id = upsert_exam(
+                cursor, exam_data.batch_id, "mock", exam_data.examDate,
+                exam_name=exam_data.examName,
+                unit_key=mock_unit_key(dict(zip(MOCK_SUBJECTS, unit_names))),
+                test_total_marks=test_total_marks,
+            )
+            write_exam_subjects(
+                cursor, exam_id,
+                [maths_total_marks, physics_total_marks, chemistry_total_marks, biology_total_marks],
+                unit_names,
+            )
+            inserted_count, updated_count = upsert_mock_test_rows(cursor, exam_id, list(rows_by_student.values()))
         
         conn.commit()
         
-        message = "Monthly test marks added successfully" if inserted_count > 0 else "No monthly test marks were added — all students failed or were not found"
+        if updated_count > 0:
+            message = f"Monthly test marks saved successfully — {updated_count} existing mark(s) overwritten"
+        elif inserted_count > 0:
+            message = "Monthly test marks added successfully"
+        else:
+            message = "No monthly test marks were added — all students failed or were not found"
         response = {
             "message": message,
+            "exam_id": exam_id,
             "exam_name": exam_data.examName,
             "exam_date": str(exam_data.examDate),
             "active_subjects": list(active_subjects),
@@ -553,6 +799,7 @@ async def create_mock_test(exam_data: MockTestCreate, current_user: dict = Depen
             },
             "test_total_marks": test_total_marks,
             "inserted_count": inserted_count,
+            "updated_count": updated_count,
             "total_students": len(exam_data.studentMarks)
         }
         
@@ -585,6 +832,7 @@ async def create_daily_test_bulk(exam_data: DailyTestBulkCreate, current_user: d
     results = []
     failed_exams = []
     total_inserted = 0
+    total_updated = 0
 
     for index, exam in enumerate(exam_data.exams, start=1):
         single_payload = DailyTestCreate(
@@ -603,13 +851,16 @@ async def create_daily_test_bulk(exam_data: DailyTestBulkCreate, current_user: d
         try:
             result = await create_daily_test(single_payload, current_user)
             inserted_count = result.get("inserted_count", 0)
+            updated_count = result.get("updated_count", 0)
             total_inserted += inserted_count
+            total_updated += updated_count
             results.append({
                 "index": index,
                 "exam_name": exam.examName,
                 "exam_date": str(exam.examDate),
                 "status": "success",
                 "inserted_count": inserted_count,
+                "updated_count": updated_count,
                 "total_students": result.get("total_students", len(exam.studentMarks)),
                 "failed_students": result.get("failed_students", [])
             })
@@ -629,6 +880,7 @@ async def create_daily_test_bulk(exam_data: DailyTestBulkCreate, current_user: d
         "successful_exams": len(results),
         "failed_exams_count": len(failed_exams),
         "total_inserted_records": total_inserted,
+        "total_updated_records": total_updated,
         "results": results,
         "failed_exams": failed_exams
     }
@@ -642,6 +894,7 @@ async def create_mock_test_bulk(exam_data: MockTestBulkCreate, current_user: dic
     results = []
     failed_exams = []
     total_inserted = 0
+    total_updated = 0
 
     for index, exam in enumerate(exam_data.exams, start=1):
         single_payload = MockTestCreate(
@@ -664,13 +917,16 @@ async def create_mock_test_bulk(exam_data: MockTestBulkCreate, current_user: dic
         try:
             result = await create_mock_test(single_payload, current_user)
             inserted_count = result.get("inserted_count", 0)
+            updated_count = result.get("updated_count", 0)
             total_inserted += inserted_count
+            total_updated += updated_count
             results.append({
                 "index": index,
                 "exam_name": exam.examName,
                 "exam_date": str(exam.examDate),
                 "status": "success",
                 "inserted_count": inserted_count,
+                "updated_count": updated_count,
                 "total_students": result.get("total_students", len(exam.studentMarks)),
                 "failed_students": result.get("failed_students", [])
             })
@@ -690,6 +946,7 @@ async def create_mock_test_bulk(exam_data: MockTestBulkCreate, current_user: dic
         "successful_exams": len(results),
         "failed_exams_count": len(failed_exams),
         "total_inserted_records": total_inserted,
+        "total_updated_records": total_updated,
         "results": results,
         "failed_exams": failed_exams
     }
@@ -709,32 +966,45 @@ async def get_daily_test_groups(batch_id: int, current_user: dict = Depends(get_
 
         cursor.execute("""
             SELECT
-                dt.test_date,
-                dt.subject,
-                dt.unit_name,
-                dt.subject_total_marks,
-                dt.test_total_marks,
-                COUNT(*) AS entries_count,
-                COUNT(DISTINCT dt.student_no) AS student_count,
-                MIN(dt.created_at) AS created_at
-            FROM daily_test dt
-            JOIN student s ON s.student_no = dt.student_no
-            WHERE s.batch_id = %s
-            GROUP BY dt.test_date, dt.subject, dt.unit_name, dt.subject_total_marks, dt.test_total_marks
-            ORDER BY dt.test_date DESC, dt.subject, dt.unit_name
+                e.exam_id,
+                e.exam_name,
+                e.test_date,
+                e.subject,
+                e.unit_name,
+                e.subject_total_marks,
+                e.test_total_marks,
+                c.entries_count,
+                c.student_count,
+                e.created_at,
+                e.version
+            FROM exam e
+            CROSS JOIN LATERAL (
+                SELECT
+                    COUNT(*) AS entries_count,
+                    COUNT(DISTINCT dt.student_no) AS student_count
+                FROM daily_test dt
+                WHERE dt.exam_id = e.exam_id
+            ) c
+            WHERE e.batch_id = %s
+              AND e.exam_type = 'daily'
+              AND c.entries_count > 0
+            ORDER BY e.test_date DESC, e.subject, e.unit_name
         """, (batch_id,))
 
         groups = []
         for row in cursor.fetchall():
             groups.append({
-                "test_date": row[0].isoformat() if row[0] else None,
-                "subject": row[1],
-                "unit_name": row[2],
-                "subject_total_marks": row[3],
-                "test_total_marks": row[4],
-                "entries_count": row[5],
-                "student_count": row[6],
-                "created_at": row[7].isoformat() if row[7] else None,
+                "exam_id": row[0],
+                "exam_name": row[1],
+                "test_date": row[2].isoformat() if row[2] else None,
+                "subject": row[3],
+                "unit_name": row[4],
+                "subject_total_marks": row[5],
+                "test_total_marks": row[6],
+                "entries_count": row[7],
+                "student_count": row[8],
+                "created_at": row[9].isoformat() if row[9] else None,
+                "version": row[10],
             })
 
         return {"groups": groups, "total_groups": len(groups)}
@@ -764,8 +1034,8 @@ async def get_daily_test_group_records(
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        normalized_subject = normalize_subject_key(group_ref.subject)
-        cursor.execute(f"""
+        exam_id = find_daily_exam(cursor, batch_id, group_ref)
+        cursor.execute("""
             SELECT
                 s.student_id,
                 s.student_name,
@@ -773,16 +1043,12 @@ async def get_daily_test_group_records(
             FROM student s
             LEFT JOIN daily_test dt
                 ON dt.student_no = s.student_no
-                AND dt.test_date = %s
-                AND COALESCE(dt.unit_name, '') = COALESCE(%s, '')
-                AND {normalized_subject_sql('dt.subject')} = %s
+                AND dt.exam_id = %s
             WHERE s.batch_id = %s
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
+                s.sort_key,
                 s.student_name ASC
-        """, (group_ref.test_date, group_ref.unit_name, normalized_subject, batch_id))
+        """, (exam_id, batch_id))
 
         rows = cursor.fetchall()
         return {
@@ -827,7 +1093,6 @@ async def update_daily_test_group(
 
         batch_grade = extract_grade_from_batch_name(batch_row[0])
         normalized_subject_label = normalize_subject_label(payload.subject)
-        normalized_subject = normalize_subject_key(payload.subject)
 
         cursor.execute("""
             SELECT student_id, student_no, board, grade
@@ -836,61 +1101,96 @@ async def update_daily_test_group(
         """, (batch_id,))
         student_map = {r[0]: {"student_no": r[1], "board": r[2], "grade": r[3]} for r in cursor.fetchall()}
 
-        updated_count = 0
-        inserted_count = 0
-        deleted_count = 0
-        skipped_count = 0
+        meta_by_student = {meta["student_no"]: meta for meta in student_map.values()}
 
+        # Last entry wins when a student appears more than once
+        marks_by_student = {}
+        skipped_count = 0
         for student_mark in payload.studentMarks:
-            sid = student_mark.student_id
-            if sid not in student_map:
+            student_meta = student_map.get(student_mark.student_id)
+            if not student_meta:
                 skipped_count += 1
                 continue
-
             marks = (student_mark.marks or '').strip()
-            marks_value = marks if marks else None
+            marks_by_student[student_meta["student_no"]] = marks if marks else None
+
+        exam_id = find_daily_exam(cursor, batch_id, payload)
+        if exam_id is None:
+            exam_id = upsert_exam(
+                cursor, batch_id, "daily", payload.test_date,
+                subject=normalized_subject_label,
+                unit_name=payload.unit_name,
+                unit_key=payload.unit_name or "",
+                subject_total_marks=payload.subject_total_marks,
+                test_total_marks=payload.test_total_marks,
+            )
+
+        group_filter = "dt.exam_id = %s"
+        group_params = (exam_id,)
+        new_version = lock_exam_version(cursor, exam_id, payload.version)
+        cursor.execute("""
+            UPDATE exam SET subject_total_marks = %s, test_total_marks = %s WHERE exam_id = %s
+        """, (payload.subject_total_marks, payload.test_total_marks, exam_id))
+
+        updated_students = set()
+        if marks_by_student:
+            # execute_values takes a single placeholder, so bind the group values first
+            update_sql = cursor.mogrify(f"""
+                UPDATE daily_test dt
+                SET
+                    total_marks = v.total_marks,
+                    subject_total_marks = %s,
+                    test_total_marks = %s,
+                    version = dt.version + 1
+                FROM (VALUES %%s) AS v(student_no, total_marks)
+                WHERE dt.student_no = v.student_no
+                  AND {group_filter}
+                RETURNING dt.student_no
+            """, (payload.subject_total_marks, payload.test_total_marks) + group_params).decode()
+            updated_students = {r[0] for r in execute_values(
+                cursor, update_sql, list(marks_by_student.items()),
+                template="(%s::BIGINT, %s::VARCHAR)", page_size=1000, fetch=True
+            )}
+
+        new_rows = [
+            (
+                student_no,
+                meta_by_student[student_no]["grade"] if meta_by_student[student_no]["grade"] is not None else batch_grade,
+                meta_by_student[student_no]["board"],
+                payload.test_date,
+                normalized_subject_label,
+                payload.unit_name,
+                marks_value,
+                payload.subject_total_marks,
+                payload.test_total_marks,
+                exam_id,
+            )
+            for student_no, marks_value in marks_by_student.items()
+            if student_no not in updated_students
+        ]
+        inserted_count = 0
+        if new_rows:
+            inserted_count = len(execute_values(cursor, """
+                INSERT INTO daily_test (
+                    student_no, grade, board, test_date,
+                    subject, unit_name, total_marks, subject_total_marks, test_total_marks, exam_id
+                )
+                VALUES %s
+                ON CONFLICT (student_no, test_date, subject_key, unit_key) DO NOTHING
+                RETURNING student_no
+            """, new_rows, page_size=1000, fetch=True))
+        skipped_count += len(new_rows) - inserted_count
 
+        # Entries for batch students left out of the edited sheet are removed
+        deleted_count = 0
+        if marks_by_student:
             cursor.execute(f"""
-                SELECT test_id
-                FROM daily_test
-                                WHERE student_no = %s
-                  AND test_date = %s
-                  AND COALESCE(unit_name, '') = COALESCE(%s, '')
-                  AND {normalized_subject_sql('subject')} = %s
-                LIMIT 1
-                        """, (student_map[sid]["student_no"], payload.test_date, payload.unit_name, normalized_subject))
-            existing = cursor.fetchone()
-
-            if existing:
-                cursor.execute("""
-                    UPDATE daily_test
-                    SET
-                        total_marks = %s,
-                        subject_total_marks = %s,
-                        test_total_marks = %s
-                    WHERE test_id = %s
-                """, (marks_value, payload.subject_total_marks, payload.test_total_marks, existing[0]))
-                updated_count += 1
-            else:
-                student_meta = student_map[sid]
-                cursor.execute("""
-                    INSERT INTO daily_test (
-                        student_no, grade, board, test_date,
-                        subject, unit_name, total_marks, subject_total_marks, test_total_marks
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    student_meta["student_no"],
-                    student_meta["grade"] if student_meta["grade"] is not None else batch_grade,
-                    student_meta["board"],
-                    payload.test_date,
-                    normalized_subject_label,
-                    payload.unit_name,
-                    marks_value,
-                    payload.subject_total_marks,
-                    payload.test_total_marks
-                ))
-                inserted_count += 1
+                DELETE FROM daily_test dt
+                WHERE {group_filter}
+                  AND NOT (dt.student_no = ANY(%s))
+            """, group_params + (list(marks_by_student),))
+            deleted_count = cursor.rowcount
+        updated_count = len(updated_students)
 
         conn.commit()
 
@@ -899,7 +1199,8 @@ async def update_daily_test_group(
             "updated_count": updated_count,
             "inserted_count": inserted_count,
             "deleted_count": deleted_count,
-            "skipped_count": skipped_count
+            "skipped_count": skipped_count,
+            "version": new_version
         }
     except HTTPException:
         raise
@@ -929,17 +1230,14 @@ async def delete_daily_test_group(
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        normalized_subject = normalize_subject_key(payload.subject)
-        cursor.execute(f"""
-            DELETE FROM daily_test dt
-            USING student s
-                        WHERE dt.student_no = s.student_no
-              AND s.batch_id = %s
-              AND dt.test_date = %s
-              AND COALESCE(dt.unit_name, '') = COALESCE(%s, '')
-              AND {normalized_subject_sql('dt.subject')} = %s
-        """, (batch_id, payload.test_date, payload.unit_name, normalized_subject))
-        deleted_count = cursor.rowcount
+        # The header is kept (groups without marks are not listed) so its
+        # version keeps rising if the test is uploaded again
+        deleted_count = 0
+        exam_id = find_daily_exam(cursor, batch_id, payload)
+        if exam_id is not None:
+            lock_exam_version(cursor, exam_id, None)
+            cursor.execute("DELETE FROM daily_test WHERE exam_id = %s", (exam_id,))
+            deleted_count = cursor.rowcount
 
         conn.commit()
         return {
@@ -977,52 +1275,68 @@ async def get_mock_test_groups(batch_id: int, current_user: dict = Depends(get_c
 
         cursor.execute("""
             SELECT
-                mt.test_date,
-                COALESCE(mt.maths_unit_names, ARRAY[]::text[]) AS maths_unit_names,
-                COALESCE(mt.physics_unit_names, ARRAY[]::text[]) AS physics_unit_names,
-                COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) AS chemistry_unit_names,
-                COALESCE(mt.biology_unit_names, ARRAY[]::text[]) AS biology_unit_names,
-                mt.maths_total_marks,
-                mt.physics_total_marks,
-                mt.chemistry_total_marks,
-                mt.biology_total_marks,
-                mt.test_total_marks,
-                COUNT(*) AS entries_count,
-                COUNT(DISTINCT mt.student_no) AS student_count,
-                MIN(mt.created_at) AS created_at
-            FROM mock_test mt
-            JOIN student s ON s.student_no = mt.student_no
-            WHERE s.batch_id = %s
-            GROUP BY
-                mt.test_date,
-                mt.maths_unit_names,
-                mt.physics_unit_names,
-                mt.chemistry_unit_names,
-                mt.biology_unit_names,
-                mt.maths_total_marks,
-                mt.physics_total_marks,
-                mt.chemistry_total_marks,
-                mt.biology_total_marks,
-                mt.test_total_marks
-            ORDER BY mt.test_date DESC
+                e.exam_id,
+                e.exam_name,
+                e.test_date,
+                COALESCE(es.maths_unit_names, ARRAY[]::text[]),
+                COALESCE(es.physics_unit_names, ARRAY[]::text[]),
+                COALESCE(es.chemistry_unit_names, ARRAY[]::text[]),
+                COALESCE(es.biology_unit_names, ARRAY[]::text[]),
+                es.maths_total_marks,
+                es.physics_total_marks,
+                es.chemistry_total_marks,
+                es.biology_total_marks,
+                e.test_total_marks,
+                c.entries_count,
+                c.student_count,
+                e.created_at,
+                e.version
+            FROM exam e
+            CROSS JOIN LATERAL (
+                SELECT
+                    MAX(unit_names) FILTER (WHERE subject_key = 'maths') AS maths_unit_names,
+                    MAX(unit_names) FILTER (WHERE subject_key = 'physics') AS physics_unit_names,
+                    MAX(unit_names) FILTER (WHERE subject_key = 'chemistry') AS chemistry_unit_names,
+                    MAX(unit_names) FILTER (WHERE subject_key = 'biology') AS biology_unit_names,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'maths') AS maths_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'physics') AS physics_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'biology') AS biology_total_marks
+                FROM exam_subject
+                WHERE exam_id = e.exam_id
+            ) es
+            CROSS JOIN LATERAL (
+                SELECT
+                    COUNT(*) AS entries_count,
+                    COUNT(DISTINCT mt.student_no) AS student_count
+                FROM mock_test mt
+                WHERE mt.exam_id = e.exam_id
+            ) c
+            WHERE e.batch_id = %s
+              AND e.exam_type = 'mock'
+              AND c.entries_count > 0
+            ORDER BY e.test_date DESC
         """, (batch_id,))
 
         groups = []
         for row in cursor.fetchall():
             groups.append({
-                "test_date": row[0].isoformat() if row[0] else None,
-                "maths_unit_names": row[1] or [],
-                "physics_unit_names": row[2] or [],
-                "chemistry_unit_names": row[3] or [],
-                "biology_unit_names": row[4] or [],
-                "maths_total_marks": row[5],
-                "physics_total_marks": row[6],
-                "chemistry_total_marks": row[7],
-                "biology_total_marks": row[8],
-                "test_total_marks": row[9],
-                "entries_count": row[10],
-                "student_count": row[11],
-                "created_at": row[12].isoformat() if row[12] else None,
+                "exam_id": row[0],
+                "exam_name": row[1],
+                "test_date": row[2].isoformat() if row[2] else None,
+                "maths_unit_names": row[3] or [],
+                "physics_unit_names": row[4] or [],
+                "chemistry_unit_names": row[5] or [],
+                "biology_unit_names": row[6] or [],
+                "maths_total_marks": row[7],
+                "physics_total_marks": row[8],
+                "chemistry_total_marks": row[9],
+                "biology_total_marks": row[10],
+                "test_total_marks": row[11],
+                "entries_count": row[12],
+                "student_count": row[13],
+                "created_at": row[14].isoformat() if row[14] else None,
+                "version": row[15],
             })
 
         return {"groups": groups, "active_subjects": active_subjects, "total_groups": len(groups)}
@@ -1052,6 +1366,7 @@ async def get_mock_test_group_records(
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        exam_id = find_mock_exam(cursor, batch_id, group_ref)
         cursor.execute("""
             SELECT
                 s.student_id,
@@ -1061,37 +1376,14 @@ async def get_mock_test_group_records(
                 COALESCE(mt.chemistry_marks, '') AS chemistry_marks,
                 COALESCE(mt.biology_marks, '') AS biology_marks
             FROM student s
-            LEFT JOIN mock_test mt
+            LEFT JOIN mock_test_wide mt
                 ON mt.student_no = s.student_no
-                AND mt.test_date = %s
-                AND COALESCE(mt.maths_unit_names, ARRAY[]::text[]) = %s
-                AND COALESCE(mt.physics_unit_names, ARRAY[]::text[]) = %s
-                AND COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) = %s
-                AND COALESCE(mt.biology_unit_names, ARRAY[]::text[]) = %s
-                AND mt.maths_total_marks IS NOT DISTINCT FROM %s
-                AND mt.physics_total_marks IS NOT DISTINCT FROM %s
-                AND mt.chemistry_total_marks IS NOT DISTINCT FROM %s
-                AND mt.biology_total_marks IS NOT DISTINCT FROM %s
-                AND mt.test_total_marks IS NOT DISTINCT FROM %s
+                AND mt.exam_id = %s
             WHERE s.batch_id = %s
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
+                s.sort_key,
                 s.student_name ASC
-        """, (
-            group_ref.test_date,
-            group_ref.maths_unit_names,
-            group_ref.physics_unit_names,
-            group_ref.chemistry_unit_names,
-            group_ref.biology_unit_names,
-            group_ref.maths_total_marks,
-            group_ref.physics_total_marks,
-            group_ref.chemistry_total_marks,
-            group_ref.biology_total_marks,
-            group_ref.test_total_marks,
-            batch_id
-        ))
+        """, (exam_id, batch_id))
 
         rows = cursor.fetchall()
         return {
@@ -1146,6 +1438,7 @@ async def update_mock_test_group(
             WHERE batch_id = %s
         """, (batch_id,))
         student_map = {r[0]: {"student_no": r[1], "board": r[2], "grade": r[3]} for r in cursor.fetchall()}
+        meta_by_student = {meta["student_no"]: meta for meta in student_map.values()}
 
         def safe_int(val):
             try:
@@ -1153,20 +1446,12 @@ async def update_mock_test_group(
             except (TypeError, ValueError):
                 return None
 
-        updated_count = 0
-        inserted_count = 0
-        deleted_count = 0
+        # Last entry wins when a student appears more than once
+        marks_by_student = {}
         skipped_count = 0
-
-        match_maths_total = payload.original_maths_total_marks if payload.original_maths_total_marks is not None else payload.maths_total_marks
-        match_physics_total = payload.original_physics_total_marks if payload.original_physics_total_marks is not None else payload.physics_total_marks
-        match_chemistry_total = payload.original_chemistry_total_marks if payload.original_chemistry_total_marks is not None else payload.chemistry_total_marks
-        match_biology_total = payload.original_biology_total_marks if payload.original_biology_total_marks is not None else payload.biology_total_marks
-        match_test_total = payload.original_test_total_marks if payload.original_test_total_marks is not None else payload.test_total_marks
-
         for student_mark in payload.studentMarks:
-            sid = student_mark.student_id
-            if sid not in student_map:
+            student_meta = student_map.get(student_mark.student_id)
+            if not student_meta:
                 skipped_count += 1
                 continue
 
@@ -1175,107 +1460,107 @@ async def update_mock_test_group(
             chemistry_raw = (student_mark.chemistry_marks or '').strip() if 'chemistry' in active_subjects else ''
             biology_raw = (student_mark.biology_marks or '').strip() if 'biology' in active_subjects else ''
 
-            maths_marks = maths_raw if maths_raw else None
-            physics_marks = physics_raw if physics_raw else None
-            chemistry_marks = chemistry_raw if chemistry_raw else None
-            biology_marks = biology_raw if biology_raw else None
-
-            cursor.execute("""
-                SELECT test_id
-                FROM mock_test
-                                WHERE student_no = %s
-                  AND test_date = %s
-                  AND COALESCE(maths_unit_names, ARRAY[]::text[]) = %s
-                  AND COALESCE(physics_unit_names, ARRAY[]::text[]) = %s
-                  AND COALESCE(chemistry_unit_names, ARRAY[]::text[]) = %s
-                  AND COALESCE(biology_unit_names, ARRAY[]::text[]) = %s
-                  AND maths_total_marks IS NOT DISTINCT FROM %s
-                  AND physics_total_marks IS NOT DISTINCT FROM %s
-                  AND chemistry_total_marks IS NOT DISTINCT FROM %s
-                  AND biology_total_marks IS NOT DISTINCT FROM %s
-                  AND test_total_marks IS NOT DISTINCT FROM %s
-                LIMIT 1
-            """, (
-                student_map[sid]["student_no"],
-                payload.test_date,
-                payload.maths_unit_names,
-                payload.physics_unit_names,
-                payload.chemistry_unit_names,
-                payload.biology_unit_names,
-                                match_maths_total,
-                                match_physics_total,
-                                match_chemistry_total,
-                                match_biology_total,
-                                match_test_total,
-            ))
-            existing = cursor.fetchone()
-
-            numeric_marks = [safe_int(v) for v in [maths_marks, physics_marks, chemistry_marks, biology_marks]]
-            valid_marks = [m for m in numeric_marks if m is not None]
+            subject_marks = [m if m else None for m in [maths_raw, physics_raw, chemistry_raw, biology_raw]]
+            valid_marks = [m for m in (safe_int(v) for v in subject_marks) if m is not None]
             total_marks = str(sum(valid_marks)) if valid_marks else None
+            marks_by_student[student_meta["student_no"]] = tuple(subject_marks) + (total_marks,)
 
-            if existing:
-                cursor.execute("""
-                    UPDATE mock_test
-                    SET
-                        maths_marks = %s,
-                        physics_marks = %s,
-                        chemistry_marks = %s,
-                        biology_marks = %s,
-                        total_marks = %s,
-                        maths_total_marks = %s,
-                        physics_total_marks = %s,
-                        chemistry_total_marks = %s,
-                        biology_total_marks = %s,
-                        test_total_marks = %s
-                    WHERE test_id = %s
-                """, (
-                    maths_marks,
-                    physics_marks,
-                    chemistry_marks,
-                    biology_marks,
-                    total_marks,
-                    payload.maths_total_marks,
-                    payload.physics_total_marks,
-                    payload.chemistry_total_marks,
-                    payload.biology_total_marks,
-                    payload.test_total_marks,
-                    existing[0]
-                ))
-                updated_count += 1
-            else:
-                student_meta = student_map[sid]
-                cursor.execute("""
-                    INSERT INTO mock_test (
-                        student_no, grade, board, test_date,
-                        maths_marks, physics_marks, chemistry_marks, biology_marks,
-                        maths_unit_names, physics_unit_names, chemistry_unit_names, biology_unit_names,
-                        total_marks,
-                        maths_total_marks, physics_total_marks, chemistry_total_marks, biology_total_marks,
-                        test_total_marks
-                    )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    student_meta["student_no"],
-                    student_meta["grade"] if student_meta["grade"] is not None else batch_grade,
-                    student_meta["board"],
-                    payload.test_date,
-                    maths_marks,
-                    physics_marks,
-                    chemistry_marks,
-                    biology_marks,
-                    payload.maths_unit_names,
-                    payload.physics_unit_names,
-                    payload.chemistry_unit_names,
-                    payload.biology_unit_names,
-                    total_marks,
-                    payload.maths_total_marks,
-                    payload.physics_total_marks,
-                    payload.chemistry_total_marks,
-                    payload.biology_total_marks,
-                    payload.test_total_marks,
-                ))
-                inserted_count += 1
+        unit_names = [
+            payload.maths_unit_names,
+            payload.physics_unit_names,
+            payload.chemistry_unit_names,
+            payload.biology_unit_names,
+        ]
+        subject_totals = [
+            payload.maths_total_marks,
+            payload.physics_total_marks,
+            payload.chemistry_total_marks,
+            payload.biology_total_marks,
+        ]
+        unit_key = mock_unit_key(dict(zip(MOCK_SUBJECTS, unit_names)))
+
+        exam_id = find_mock_exam(cursor, batch_id, payload)
+        if exam_id is None:
+            exam_id = upsert_exam(
+                cursor, batch_id, "mock", payload.test_date,
+                unit_key=unit_key,
+                test_total_marks=payload.test_total_marks,
+            )
+        else:
+            cursor.execute("SELECT unit_key FROM exam WHERE exam_id = %s", (exam_id,))
+            unit_key = cursor.fetchone()[0]
+
+        group_filter = "mt.exam_id = %s"
+        group_params = (exam_id,)
+        new_version = lock_exam_version(cursor, exam_id, payload.version)
+        cursor.execute("UPDATE exam SET test_total_marks = %s WHERE exam_id = %s", (payload.test_total_marks, exam_id))
+        write_exam_subjects(cursor, exam_id, subject_totals, unit_names)
+
+        written_tests = {}
+        if marks_by_student:
+            # execute_values takes a single placeholder, so bind the group values first
+            update_sql = cursor.mogrify(f"""
+                UPDATE mock_test mt
+                SET
+                    total_marks = v.total_marks,
+                    test_total_marks = %s,
+                    version = mt.version + 1
+                FROM (VALUES %%s) AS v(student_no, total_marks)
+                WHERE mt.student_no = v.student_no
+                  AND {group_filter}
+                RETURNING mt.test_id, mt.student_no
+            """, (payload.test_total_marks,) + group_params).decode()
+            written_tests = {r[1]: r[0] for r in execute_values(
+                cursor, update_sql, [(student_no, marks[4]) for student_no, marks in marks_by_student.items()],
+                template="(%s::BIGINT, %s::VARCHAR)", page_size=1000, fetch=True
+            )}
+        updated_count = len(written_tests)
+
+        new_rows = [
+            (
+                student_no,
+                meta_by_student[student_no]["grade"] if meta_by_student[student_no]["grade"] is not None else batch_grade,
+                meta_by_student[student_no]["board"],
+                payload.test_date,
+                unit_key,
+                marks[4],
+                payload.test_total_marks,
+                exam_id,
+            )
+            for student_no, marks in marks_by_student.items()
+            if student_no not in written_tests
+        ]
+        inserted_count = 0
+        if new_rows:
+            # A student already holding marks for the same date and units
+            # (recorded under another batch) is skipped
+            inserted = execute_values(cursor, """
+                INSERT INTO mock_test (
+                    student_no, grade, board, test_date, unit_key, total_marks, test_total_marks, exam_id
+                )
+                VALUES %s
+                ON CONFLICT (student_no, test_date, unit_key) DO NOTHING
+                RETURNING test_id, student_no
+            """, new_rows, page_size=1000, fetch=True)
+            inserted_count = len(inserted)
+            written_tests.update({r[1]: r[0] for r in inserted})
+        skipped_count += len(new_rows) - inserted_count
+
+        subject_rows = []
+        for student_no, test_id in written_tests.items():
+            subject_rows.extend(mock_subject_rows(test_id, payload.test_date, marks_by_student[student_no][:4], unit_names, subject_totals))
+        write_mock_subject_marks(cursor, subject_rows)
+
+        # Entries for batch students left out of the edited sheet are removed
+        # (their subject rows go with them via ON DELETE CASCADE)
+        deleted_count = 0
+        if marks_by_student:
+            cursor.execute(f"""
+                DELETE FROM mock_test mt
+                WHERE {group_filter}
+                  AND NOT (mt.student_no = ANY(%s))
+            """, group_params + (list(marks_by_student),))
+            deleted_count = cursor.rowcount
 
         conn.commit()
         return {
@@ -1283,7 +1568,8 @@ async def update_mock_test_group(
             "updated_count": updated_count,
             "inserted_count": inserted_count,
             "deleted_count": deleted_count,
-            "skipped_count": skipped_count
+            "skipped_count": skipped_count,
+            "version": new_version
         }
     except HTTPException:
         raise
@@ -1313,35 +1599,14 @@ async def delete_mock_test_group(
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            DELETE FROM mock_test mt
-            USING student s
-                        WHERE mt.student_no = s.student_no
-              AND s.batch_id = %s
-              AND mt.test_date = %s
-              AND COALESCE(mt.maths_unit_names, ARRAY[]::text[]) = %s
-              AND COALESCE(mt.physics_unit_names, ARRAY[]::text[]) = %s
-              AND COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]) = %s
-              AND COALESCE(mt.biology_unit_names, ARRAY[]::text[]) = %s
-              AND mt.maths_total_marks IS NOT DISTINCT FROM %s
-              AND mt.physics_total_marks IS NOT DISTINCT FROM %s
-              AND mt.chemistry_total_marks IS NOT DISTINCT FROM %s
-              AND mt.biology_total_marks IS NOT DISTINCT FROM %s
-              AND mt.test_total_marks IS NOT DISTINCT FROM %s
-        """, (
-            batch_id,
-            payload.test_date,
-            payload.maths_unit_names,
-            payload.physics_unit_names,
-            payload.chemistry_unit_names,
-            payload.biology_unit_names,
-            payload.maths_total_marks,
-            payload.physics_total_marks,
-            payload.chemistry_total_marks,
-            payload.biology_total_marks,
-            payload.test_total_marks,
-        ))
-        deleted_count = cursor.rowcount
+        # The header is kept (groups without marks are not listed) so its
+        # version keeps rising if the test is uploaded again
+        deleted_count = 0
+        exam_id = find_mock_exam(cursor, batch_id, payload)
+        if exam_id is not None:
+            lock_exam_version(cursor, exam_id, None)
+            cursor.execute("DELETE FROM mock_test WHERE exam_id = %s", (exam_id,))
+            deleted_count = cursor.rowcount
 
         conn.commit()
         return {
@@ -1422,9 +1687,7 @@ async def get_daily_test_template(
             FROM student
             WHERE batch_id = %s
             ORDER BY
-                CASE WHEN student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN student_id ~ '^[0-9]+$' THEN student_id::BIGINT END,
-                student_id ASC, student_name ASC
+                sort_key, student_name ASC
         """, (batch_id,))
         students = cursor.fetchall()
 
@@ -1749,9 +2012,7 @@ async def get_mock_test_template(
             SELECT student_id, student_name
             FROM student WHERE batch_id = %s
             ORDER BY
-                CASE WHEN student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN student_id ~ '^[0-9]+$' THEN student_id::BIGINT END,
-                student_id ASC, student_name ASC
+                sort_key, student_name ASC
         """, (batch_id,))
         students = cursor.fetchall()
 
@@ -2083,7 +2344,7 @@ async def get_student_mock_tests(student_no: int, current_user: dict = Depends(g
                 biology_total_marks,
                 test_total_marks,
                 created_at
-            FROM mock_test
+            FROM mock_test_wide
             WHERE student_no = %s
             ORDER BY test_date DESC
         """, (student_no,))
@@ -2184,9 +2445,7 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
             FROM student s
             WHERE s.batch_id = %s
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
+                s.sort_key,
                 s.student_name ASC
         """, (batch_id,))
         student_rows = cursor.fetchall()
@@ -2196,14 +2455,10 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
         # 3. Per-student unit test counts
         daily_counts = {}
         if student_nos:
-            cursor.execute(f"""
+            cursor.execute("""
                 SELECT
                     dt.student_no,
-                    COUNT(DISTINCT (
-                        dt.test_date,
-                        {normalized_subject_sql('dt.subject')},
-                        COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown')
-                    )) as cnt
+                    COUNT(DISTINCT dt.exam_id) as cnt
                 FROM daily_test dt
                 WHERE dt.student_no = ANY(%s)
                 GROUP BY dt.student_no
@@ -2217,18 +2472,7 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
             cursor.execute("""
                 SELECT
                     mt.student_no,
-                    COUNT(DISTINCT (
-                        mt.test_date,
-                        COALESCE(mt.maths_unit_names, ARRAY[]::text[]),
-                        COALESCE(mt.physics_unit_names, ARRAY[]::text[]),
-                        COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]),
-                        COALESCE(mt.biology_unit_names, ARRAY[]::text[]),
-                        mt.maths_total_marks,
-                        mt.physics_total_marks,
-                        mt.chemistry_total_marks,
-                        mt.biology_total_marks,
-                        mt.test_total_marks
-                    )) as cnt
+                    COUNT(DISTINCT mt.exam_id) as cnt
                 FROM mock_test mt
                 WHERE mt.student_no = ANY(%s)
                 GROUP BY mt.student_no
@@ -2239,12 +2483,8 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
         # 5. Total distinct unit tests conducted for this batch
         total_daily_tests = 0
         if student_nos:
-            cursor.execute(f"""
-                SELECT COUNT(DISTINCT (
-                    dt.test_date,
-                    {normalized_subject_sql('dt.subject')},
-                    COALESCE(NULLIF(TRIM(dt.unit_name), ''), 'Unknown')
-                ))
+            cursor.execute("""
+                SELECT COUNT(DISTINCT dt.exam_id)
                 FROM daily_test dt
                 WHERE dt.student_no = ANY(%s)
             """, (student_nos,))
@@ -2254,18 +2494,7 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
         total_mock_tests = 0
         if student_nos:
             cursor.execute("""
-                SELECT COUNT(DISTINCT (
-                    mt.test_date,
-                    COALESCE(mt.maths_unit_names, ARRAY[]::text[]),
-                    COALESCE(mt.physics_unit_names, ARRAY[]::text[]),
-                    COALESCE(mt.chemistry_unit_names, ARRAY[]::text[]),
-                    COALESCE(mt.biology_unit_names, ARRAY[]::text[]),
-                    mt.maths_total_marks,
-                    mt.physics_total_marks,
-                    mt.chemistry_total_marks,
-                    mt.biology_total_marks,
-                    mt.test_total_marks
-                ))
+                SELECT COUNT(DISTINCT mt.exam_id)
                 FROM mock_test mt
                 WHERE mt.student_no = ANY(%s)
             """, (student_nos,))
@@ -2281,9 +2510,7 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
                 JOIN student s ON s.student_no = dt.student_no
                 WHERE dt.student_no = ANY(%s)
                 ORDER BY
-                    CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                    CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                    s.student_id ASC,
+                    s.sort_key,
                     s.student_name ASC,
                     dt.test_date,
                     dt.subject,
@@ -2310,13 +2537,11 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
                       mt.chemistry_marks, mt.biology_marks, mt.total_marks,
                       mt.maths_total_marks, mt.physics_total_marks,
                       mt.chemistry_total_marks, mt.biology_total_marks, mt.test_total_marks
-                FROM mock_test mt
+                FROM mock_test_wide mt
                 JOIN student s ON s.student_no = mt.student_no
                 WHERE mt.student_no = ANY(%s)
                 ORDER BY
-                    CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                    CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                    s.student_id ASC,
+                    s.sort_key,
                     s.student_name ASC,
                     mt.test_date
             """, (student_nos,))
@@ -2398,6 +2623,7 @@ async def get_batch_report(batch_id: int, current_user: dict = Depends(get_curre
 # ─────────────────────────────────────────────────────────────────────────────
 
 @app.post("/api/exam/daily-test/batch/{batch_id}/upload-excel", status_code=status.HTTP_201_CREATED)
+@timed_job("daily_test_upload")
 async def upload_daily_test_excel(
     batch_id: int,
     file: UploadFile = File(...),
@@ -2405,6 +2631,7 @@ async def upload_daily_test_excel(
 ):
     """
     Upload a filled bulk unit-test Excel template and insert all tests at once.
+    Re-uploading a corrected sheet overwrites the marks of the same tests.
 
     Reads the clean template format generated by GET /api/exam/template/daily-test/{batch_id}?multi_template=true:
       • META row  (col A = "TEST N"):  Date in D, Subject in E, Unit Name in F
@@ -2595,6 +2822,7 @@ async def upload_daily_test_excel(
 # ─────────────────────────────────────────────────────────────────────────────
 
 @app.post("/api/exam/mock-test/batch/{batch_id}/upload-excel", status_code=status.HTTP_201_CREATED)
+@timed_job("mock_test_upload")
 async def upload_mock_test_excel(
     batch_id: int,
     file: UploadFile = File(...),
@@ -2602,6 +2830,7 @@ async def upload_mock_test_excel(
 ):
     """
     Upload a filled bulk mock-test Excel template and insert all tests at once.
+    Re-uploading a corrected sheet overwrites the marks of the same tests.
 
     Reads the clean template format:
       • META row  (col A = "TEST N"):  Date in D, per-subject Unit+Total in their columns
@@ -0,0 +1,365 @@
+"""
+Bulk data export for offline analytics.
+
+GET /api/export/batch/{batch_id}?dataset=students|daily_tests|mock_tests&format=csv|parquet
+
+Rows are produced by Postgres with COPY (...) TO STDOUT and piped into the
+response as they arrive, so a whole academic year of marks never has to be
+held in memory. Parquet is written from the same CSV stream with pyarrow
+(optional dependency), one row group per block of CSV.
+"""
+
+import contextvars
+import queue
+import threading
+from datetime import date
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi.middleware.cors import CORSMiddleware
+from config import CORS_ORIGINS, APP_TITLE
+from api.middleware import get_current_user
+from db_pool import get_db_connection
+from api.responses import FastJSONResponse, ReleasingStreamingResponse
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is unavailable without pyarrow
+    pa = None
+
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
+
+# CORS configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Chunks buffered between the COPY thread and the response; bounds memory
+# when the client reads slower than Postgres writes
+EXPORT_QUEUE_CHUNKS = 64
+
+# One row per student with every related table flattened in
+STUDENTS_EXPORT_SQL = """
+    SELECT
+        s.student_no, s.student_id, s.student_name, s.dob, s.grade, s.gender, s.community,
+        s.enrollment_year, s.course, s.board, s.student_mobile, s.email, s.school_name,
+        b.batch_id, b.batch_name,
+        p.guardian_name, p.guardian_occupation, p.guardian_mobile, p.guardian_email,
+        p.father_name, p.father_occupation, p.father_mobile, p.father_email,
+        p.mother_name, p.mother_occupation, p.mother_mobile, p.mother_email,
+        p.sibling_name, p.sibling_grade, p.sibling_school, p.sibling_college,
+        t10.school_name AS tenth_school_name, t10.year_of_passing AS tenth_year_of_passing,
+        t10.board_of_study AS tenth_board_of_study, t10.english AS tenth_english,
+        t10.tamil AS tenth_tamil, t10.hindi AS tenth_hindi, t10.maths AS tenth_maths,
+        t10.science AS tenth_science, t10.social_science AS tenth_social_science,
+        t10.total_marks AS tenth_total_marks,
+        t12.school_name AS twelfth_school_name, t12.year_of_passing AS twelfth_year_of_passing,
+        t12.board_of_study AS twelfth_board_of_study, t12.english AS twelfth_english,
+        t12.physics AS twelfth_physics, t12.maths AS twelfth_maths, t12.chemistry AS twelfth_chemistry,
+        t12.biology AS twelfth_biology, t12.computer_science AS twelfth_computer_science,
+        t12.tamil AS twelfth_tamil, t12.total_marks AS twelfth_total_marks,
+        en.entrance_exam_1, en.entrance_exam_1_percentile, en.entrance_exam_1_mark,
+        en.entrance_exam_2, en.entrance_exam_2_percentile, en.entrance_exam_2_mark,
+        en.entrance_exam_3, en.entrance_exam_3_percentile, en.entrance_exam_3_mark,
+        co.counselling_forum_1, co.counselling_round_1, co.all_india_rank_1, co.community_rank_1, co.counselling_college_1,
+        co.counselling_forum_2, co.counselling_round_2, co.all_india_rank_2, co.community_rank_2, co.counselling_college_2,
+        co.counselling_forum_3, co.counselling_round_3, co.all_india_rank_3, co.community_rank_3, co.counselling_college_3
+    FROM student s
+    JOIN batch b ON b.batch_id = s.batch_id
+    LEFT JOIN parent_info p ON p.student_no = s.student_no
+    LEFT JOIN tenth_mark t10 ON t10.student_no = s.student_no
+    LEFT JOIN twelfth_mark t12 ON t12.student_no = s.student_no
+    LEFT JOIN LATERAL (
+        SELECT * FROM entrance_exams WHERE student_no = s.student_no ORDER BY exam_id LIMIT 1
+    ) en ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT * FROM counselling_detail WHERE student_no = s.student_no ORDER BY counselling_id LIMIT 1
+    ) co ON TRUE
+    WHERE s.batch_id = %(batch_id)s
+    ORDER BY s.sort_key
+"""
+
+# One row per student and unit test
+DAILY_TESTS_EXPORT_SQL = """
+    SELECT
+        s.student_no, s.student_id, s.student_name,
+        dt.exam_id, dt.test_date, dt.subject, dt.unit_name,
+        dt.total_marks AS marks, dt.subject_total_marks, dt.test_total_marks
+    FROM daily_test dt
+    JOIN student s ON s.student_no = dt.student_no
+    WHERE s.batch_id = %(batch_id)s
+      AND (%(from_date)s::DATE IS NULL OR dt.test_date >= %(from_date)s::DATE)
+      AND (%(to_date)s::DATE IS NULL OR dt.test_date <= %(to_date)s::DATE)
+    ORDER BY s.sort_key, dt.test_date, dt.subject
+"""
+
+# One row per student, monthly test and subject
+MOCK_TESTS_EXPORT_SQL = """
+    SELECT
+        s.student_no, s.student_id, s.student_name,
+        mt.exam_id, mt.test_date, sm.subject_key,
+        array_to_string(sm.unit_names, ';') AS unit_names,
+        sm.marks, sm.total_marks AS subject_total_marks,
+        mt.total_marks AS test_marks, mt.test_total_marks
+    FROM mock_test mt
+    JOIN mock_test_subject_mark sm ON sm.test_id = mt.test_id AND sm.test_date = mt.test_date
+    JOIN student s ON s.student_no = mt.student_no
+    WHERE s.batch_id = %(batch_id)s
+      AND (%(from_date)s::DATE IS NULL OR mt.test_date >= %(from_date)s::DATE)
+      AND (%(to_date)s::DATE IS NULL OR mt.test_date <= %(to_date)s::DATE)
+    ORDER BY s.sort_key, mt.test_date, sm.subject_key
+"""
+
+EXPORT_DATASETS = {
+    "students": STUDENTS_EXPORT_SQL,
+    "daily_tests": DAILY_TESTS_EXPORT_SQL,
+    "mock_tests": MOCK_TESTS_EXPORT_SQL,
+}
+
+# Postgres type OID -> Arrow type for the Parquet schema; anything else
+# (VARCHAR marks, TEXT, ...) is written as a string column
+ARROW_TYPES_BY_OID = {
+    16: "bool_",
+    20: "int64", 21: "int64", 23: "int64",
+    700: "float64", 701: "float64", 1700: "float64",
+    1082: "date32",
+}
+
+
+class _QueueWriter:
+    """File-like object handed to copy_expert; forwards each chunk to a bounded queue"""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        while True:
+            if self.cancelled.is_set():
+                # Raising here makes copy_expert abort the COPY
+                raise IOError("Export cancelled by client")
+            try:
+                self.chunks.put(data, timeout=1)
+                return len(data)
+            except queue.Full:
+                continue
+
+
+_DONE = object()
+
+
+class CopyStream:
+    """
+    COPY ... TO STDOUT running on a worker thread; iterating yields its output
+    chunks. The worker starts right away and returns the connection to the
+    pool when the COPY ends, fails or is cancelled with close(), so the
+    connection is released even if the stream is never read.
+    """
+
+    def __init__(self, conn, copy_sql: str):
+        self.chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+        self.cancelled = threading.Event()
+        # The copy's time counts towards the request's query stats
+        worker = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run, conn, copy_sql),
+            name="copy-export", daemon=True
+        )
+        worker.start()
+
+    def _run(self, conn, copy_sql):
+        try:
+            cursor = conn.cursor()
+            cursor.copy_expert(copy_sql, _QueueWriter(self.chunks, self.cancelled))
+            cursor.close()
+            result = _DONE
+        except Exception as e:
+            result = e
+        finally:
+            conn.close()
+        while not self.cancelled.is_set():
+            try:
+                self.chunks.put(result, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self.chunks.get()
+                if chunk is _DONE:
+                    return
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        self.cancelled.set()
+
+
+class _ChunkReader:
+    """Read-only file object over an iterator of byte chunks (input for pyarrow's CSV reader)"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        self.closed = False
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class _ChunkSink:
+    """Write-only file object collecting Parquet bytes until the stream takes them"""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_stream(csv_chunks, columns):
+    """Convert a CSV COPY stream to Parquet, yielding each row group as it is written"""
+    schema = pa.schema([
+        (name, getattr(pa, ARROW_TYPES_BY_OID.get(oid, "string"))()) for name, oid in columns
+    ])
+    reader = pa_csv.open_csv(
+        _ChunkReader(csv_chunks),
+        read_options=pa_csv.ReadOptions(column_names=schema.names, block_size=1 << 20),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=schema,
+            true_values=["t"],
+            false_values=["f"],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+@app.get("/api/export/batch/{batch_id}")
+async def export_batch(
+    batch_id: int,
+    dataset: str = "students",
+    format: str = "csv",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Stream a batch's students (with parent, 10th/12th, entrance and
+    counselling details), unit test marks or monthly test marks as CSV or
+    Parquet. from_date / to_date restrict the mark datasets to a date range,
+    e.g. one academic year.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"dataset must be one of: {', '.join(EXPORT_DATASETS)}"
+        )
+    if format not in ("csv", "parquet"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be 'csv' or 'parquet'")
+    if format == "parquet" and pa is None:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow to be installed on the server"
+        )
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT batch_name FROM batch WHERE batch_id = %s", (batch_id,))
+        batch_row = cursor.fetchone()
+        if not batch_row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Batch {batch_id} not found")
+
+        query = cursor.mogrify(
+            EXPORT_DATASETS[dataset],
+            {"batch_id": batch_id, "from_date": from_date, "to_date": to_date}
+        ).decode()
+        # Describe the result columns up front (the Parquet schema) and catch
+        # query errors before the response has started
+        cursor.execute(f"SELECT * FROM ({query}) q LIMIT 0")
+        columns = [(desc.name, desc.type_code) for desc in cursor.description]
+        cursor.close()
+    except HTTPException:
+        if conn:
+            conn.close()
+        raise
+    except Exception as e:
+        if conn:
+            conn.close()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export batch: {str(e)}"
+        )
+
+    copy_stream = CopyStream(conn, f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER {format == 'csv'})")
+    safe_name = batch_row[0].replace(' ', '_') if batch_row[0] else f'batch_{batch_id}'
+    if format == "csv":
+        body, media_type = iter(copy_stream), "text/csv"
+    else:
+        body, media_type = parquet_stream(iter(copy_stream), columns), "application/vnd.apache.parquet"
+
+    # Cancelling the COPY makes the worker return the connection, even if
+    # the client goes away before the first chunk
+    return ReleasingStreamingResponse(
+        body,
+        release=copy_stream.close,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={safe_name}_{dataset}.{format}"}
+    )
@@ -0,0 +1,112 @@
+"""
+Per-request database instrumentation for GRAAVITONS SMS Backend.
+
+QueryStatsMiddleware binds a QueryStats to each HTTP request, so every
+statement run through a pooled connection's cursor while the request is
+handled adds to its query count and DB time. When the response finishes,
+one JSON line goes to the "graavitons.requests" logger:
+
+    {"event": "request", "method": "GET", "path": "/api/batch", "status": 200,
+     "queries": 3, "db_ms": 4.1, "duration_ms": 9.8}
+
+With expose_header (DEBUG=true) the response also carries
+
+    Server-Timing: db;dur=4.1;desc="3 queries"
+
+which browser dev tools show next to the request timing. The header is
+written when the response starts, so for streaming responses it only
+covers the statements run before the first chunk; the log line covers all
+of them.
+
+The same numbers feed the Prometheus histograms in metrics.py, labelled
+by route template ("/api/batch/{batch_id}") rather than the raw path so
+the label set stays bounded; paths that match no route count as
+"unmatched".
+"""
+
+import json
+import logging
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db_pool import QueryStats, bind_query_stats, unbind_query_stats
+from metrics import (
+    HTTP_REQUEST_DB_SECONDS, HTTP_REQUEST_DURATION, HTTP_REQUEST_QUERIES, HTTP_REQUESTS_IN_FLIGHT,
+)
+
+logger = logging.getLogger("graavitons.requests")
+
+# Route endpoint (or mounted app) -> path template, per application
+_route_templates = {}
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled the request, from the endpoint the router matched."""
+    app = scope.get("app")
+    templates = _route_templates.get(id(app))
+    if templates is None:
+        templates = _route_templates[id(app)] = {}
+        for route in getattr(app, "routes", []):
+            endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+            if endpoint is not None:
+                templates.setdefault(endpoint, route.path)
+    return templates.get(scope.get("endpoint"), "unmatched")
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app: ASGIApp, expose_header: bool = False) -> None:
+        self.app = app
+        self.expose_header = expose_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(f"{scope['method']} {scope['path']}")
+        started = time.perf_counter()
+        status_code = 500
+        logged = False
+
+        def log_request():
+            nonlocal logged
+            logged = True
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            duration = time.perf_counter() - started
+            route = route_template(scope)
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(duration)
+            HTTP_REQUEST_DB_SECONDS.labels(scope["method"], route).observe(stats.seconds)
+            HTTP_REQUEST_QUERIES.labels(scope["method"], route).observe(stats.count)
+            logger.info(json.dumps({
+                "event": "request",
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "queries": stats.count,
+                "db_ms": stats.milliseconds,
+                "duration_ms": round(duration * 1000, 2),
+            }))
+
+        async def send_with_stats(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.expose_header:
+                    headers = MutableHeaders(scope=message)
+                    queries = "query" if stats.count == 1 else "queries"
+                    headers.append("Server-Timing", f'db;dur={stats.milliseconds};desc="{stats.count} {queries}"')
+            await send(message)
+            # Background tasks run after the last chunk; they are not part of the request
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not logged:
+                log_request()
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        token = bind_query_stats(stats)
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            unbind_query_stats(token)
+            if not logged:
+                log_request()
@@ -0,0 +1,74 @@
+"""
+Keyset (cursor) pagination helpers for the listing endpoints.
+
+A client asks for a page with ?limit=N. The response carries next_cursor, an
+opaque token holding the sort key of the last row returned; passing it back
+as ?cursor= continues after that row. Unlike OFFSET, each page costs the same
+however far the client has paged. Without a limit the endpoints keep
+returning the full list.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: Iterable) -> str:
+    """Pack the sort key of the last row of a page into an opaque URL-safe token."""
+    payload = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_types: Sequence[Callable]) -> list:
+    """
+    Unpack a token produced by encode_cursor, converting each part of the sort
+    key with the matching entry of key_types (e.g. datetime.fromisoformat, int).
+    400 when it was tampered with or is from another listing.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(key_types):
+            raise ValueError("wrong cursor length")
+        return [convert(value) for convert, value in zip(key_types, values)]
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Comma-separated ?fields= projection; None means every field. 400 on unknown names."""
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in set(allowed)]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return requested
+
+
+def project(items: List[dict], fields: Optional[List[str]]) -> List[dict]:
+    if fields is None:
+        return items
+    return [{key: item[key] for key in fields} for item in items]
+
+
+def split_page(rows: list, limit: Optional[int]):
+    """
+    Rows are fetched with LIMIT limit + 1; the extra row only tells whether
+    another page exists. Returns (page_rows, has_more).
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, False
+    return rows[:limit], True
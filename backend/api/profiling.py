@@ -0,0 +1,173 @@
+"""
+On-demand request profiling for GRAAVITONS SMS Backend.
+
+With PROFILING_ENABLED=true, an Admin can send a request with the header
+
+    X-Profile: 1
+
+and the handler runs under a profiler. The response is the normal one plus
+an X-Profile-Id header. Two files are saved in PROFILE_DIR under that id:
+
+    <id>.speedscope.json   pyinstrument sampling profile; open it at
+                           https://www.speedscope.app for a flamegraph
+                           (<id>.prof from cProfile when pyinstrument is
+                           not installed; open with snakeviz or flameprof)
+    <id>.queries.json      every SQL statement the request ran, with its
+                           duration, row count and parameter types
+
+Admins fetch them with GET /api/profiles and GET /api/profiles/{filename}.
+
+Only one request is profiled at a time; the header is ignored for anyone
+who is not an Admin and while another profile is running. With
+PROFILING_ENABLED=false the middleware and routes are not installed at all.
+
+Handlers declared with plain `def` run in the threadpool, outside the
+event loop thread the profiler samples; their time shows up as an await.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import re
+import secrets
+import time
+from datetime import datetime
+
+from fastapi import FastAPI, HTTPException, status, Depends
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import APP_TITLE, PROFILE_DIR
+from db_pool import current_query_stats
+from api.middleware import decode_token, require_role
+from api.responses import FastJSONResponse
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # pyinstrument is optional; cProfile is always available
+    Profiler = None
+
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
+
+logger = logging.getLogger("graavitons.profiling")
+
+# Oldest profiles are removed once there are more than this many
+MAX_STORED_PROFILES = 100
+
+PROFILE_FILE_RE = re.compile(r"^[0-9T]+-[0-9a-f]+\.(speedscope\.json|prof|queries\.json)$")
+
+
+def is_admin(headers: Headers) -> bool:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        return False
+    return payload.get("type") == "access" and payload.get("role") == "Admin"
+
+
+def prune_profiles():
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if PROFILE_FILE_RE.match(name))
+    profile_ids = sorted({name.split(".", 1)[0] for name in names})
+    stale = set(profile_ids[:-MAX_STORED_PROFILES])
+    for name in names:
+        if name.split(".", 1)[0] in stale:
+            os.remove(os.path.join(PROFILE_DIR, name))
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.busy = False
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.busy:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if "x-profile" not in headers or not is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}"
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        # The statements go into the QueryStats bound by QueryStatsMiddleware
+        stats = current_query_stats()
+        if stats is not None:
+            stats.statements = []
+
+        self.busy = True
+        profiler = Profiler(async_mode="enabled") if Profiler else cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            if Profiler:
+                profiler.start()
+            else:
+                profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                if Profiler:
+                    profiler.stop()
+                else:
+                    profiler.disable()
+        finally:
+            self.busy = False
+            duration = time.perf_counter() - started
+            try:
+                self.save(profile_id, profiler, scope, status_code, duration, stats)
+            except OSError as e:
+                logger.warning(f"Could not save profile {profile_id}: {e}")
+
+    def save(self, profile_id, profiler, scope, status_code, duration, stats):
+        base = os.path.join(PROFILE_DIR, profile_id)
+        if Profiler:
+            with open(f"{base}.speedscope.json", "w") as f:
+                f.write(profiler.output(renderer=SpeedscopeRenderer()))
+        else:
+            profiler.dump_stats(f"{base}.prof")
+        with open(f"{base}.queries.json", "w") as f:
+            json.dump({
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode(errors="replace"),
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "queries": stats.count if stats else None,
+                "db_ms": stats.milliseconds if stats else None,
+                "statements": stats.statements if stats else None,
+            }, f, indent=2, default=str)
+        prune_profiles()
+
+
+@app.get("/api/profiles")
+async def list_profiles(current_user: dict = Depends(require_role("Admin"))):
+    """Saved request profiles, newest first"""
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if PROFILE_FILE_RE.match(name)), reverse=True)
+    return {"profiles": names}
+
+
+@app.get("/api/profiles/{filename}")
+async def get_profile(filename: str, current_user: dict = Depends(require_role("Admin"))):
+    """Download a saved profile or query log"""
+    path = os.path.join(PROFILE_DIR, filename)
+    if not PROFILE_FILE_RE.match(filename) or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {filename} not found"
+        )
+    return FileResponse(path, filename=filename)
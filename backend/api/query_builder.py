@@ -0,0 +1,111 @@
+"""
+Shared SQL fragments and a small WHERE-clause builder for the analytics endpoints.
+
+The score expressions turn a VARCHAR mark into a percentage of the subject or
+test total, or keep the raw mark when no total is recorded. safe_numeric()
+maps absent marks ('A', '-', ...) to NULL so aggregates skip them.
+
+Filters collects AND-ed conditions together with their parameters in
+placeholder order. The SQL it renders depends only on which filters are set,
+never on their values, so a dashboard query always comes out as the same
+statement text and can be prepared once and executed with new parameters.
+
+Usage:
+    daily = (
+        Filters("s.batch_id = %s", batch_id)
+        .date_range("dt.test_date", date_from, date_to)
+        .subject("dt.subject", subject_key)
+    )
+    cursor.execute(f"SELECT AVG({daily_score_sql()}) ... WHERE {daily.sql}", daily.params)
+"""
+
+from typing import Optional
+
+
+def daily_score_sql(alias: str = "dt") -> str:
+    """Score of one daily_test row, against the subject total first and the test total second."""
+    return f"""
+        CASE
+            WHEN {alias}.subject_total_marks IS NOT NULL AND {alias}.subject_total_marks > 0 AND safe_numeric({alias}.total_marks) IS NOT NULL
+                THEN (safe_numeric({alias}.total_marks) * 100.0 / {alias}.subject_total_marks)
+            WHEN {alias}.test_total_marks IS NOT NULL AND {alias}.test_total_marks > 0 AND safe_numeric({alias}.total_marks) IS NOT NULL
+                THEN (safe_numeric({alias}.total_marks) * 100.0 / {alias}.test_total_marks)
+            ELSE safe_numeric({alias}.total_marks)
+        END
+    """
+
+
+def mock_total_score_sql(alias: str = "mt") -> str:
+    """Score of one mock test's overall total (mock_test or mock_test_wide row)."""
+    return f"""
+        CASE
+            WHEN {alias}.test_total_marks IS NOT NULL AND {alias}.test_total_marks > 0 AND safe_numeric({alias}.total_marks) IS NOT NULL
+                THEN (safe_numeric({alias}.total_marks) * 100.0 / {alias}.test_total_marks)
+            ELSE safe_numeric({alias}.total_marks)
+        END
+    """
+
+
+def mock_subject_score_sql(alias: str = "sm") -> str:
+    """Score of one mock_test_subject_mark row, as a percentage when the subject total is known."""
+    return f"""
+        CASE
+            WHEN {alias}.total_marks IS NOT NULL AND {alias}.total_marks > 0 AND safe_numeric({alias}.marks) IS NOT NULL
+                THEN (safe_numeric({alias}.marks) * 100.0 / {alias}.total_marks)
+            ELSE safe_numeric({alias}.marks)
+        END
+    """
+
+
+def normalized_subject_sql(column: str) -> str:
+    """Lower-cased, trimmed subject name with 'maths' folded into 'mathematics'."""
+    return f"CASE WHEN LOWER(TRIM({column})) IN ('maths', 'mathematics') THEN 'mathematics' ELSE LOWER(TRIM({column})) END"
+
+
+class Filters:
+    """AND-ed SQL conditions and their parameters, kept in placeholder order."""
+
+    def __init__(self, condition: Optional[str] = None, *params):
+        self.conditions = []
+        self.params = []
+        if condition:
+            self.where(condition, *params)
+
+    def where(self, condition: str, *params) -> "Filters":
+        self.conditions.append(condition)
+        self.params.extend(params)
+        return self
+
+    def roster(self, grade=None, admission_number=None, batch_id=None, alias: str = "s") -> "Filters":
+        """Scope a student table by grade, partial admission number and batch; unset arguments add nothing."""
+        if grade:
+            self.where(f"{alias}.grade = %s", grade)
+        if admission_number:
+            self.where(f"{alias}.student_id ILIKE %s", f"%{admission_number}%")
+        if batch_id:
+            self.where(f"{alias}.batch_id = %s", batch_id)
+        return self
+
+    def date_range(self, column: str, date_from=None, date_to=None) -> "Filters":
+        """Inclusive bounds on a date column; a missing bound adds nothing."""
+        if date_from:
+            self.where(f"{column} >= %s", date_from)
+        if date_to:
+            self.where(f"{column} <= %s", date_to)
+        return self
+
+    def subject(self, column: str, subject_key: Optional[str]) -> "Filters":
+        """Match a subject key (as produced by normalize_subject_key) against a free-text subject column."""
+        if subject_key:
+            self.where(f"{normalized_subject_sql(column)} = %s", subject_key)
+        return self
+
+    def extend(self, other: "Filters") -> "Filters":
+        """Append another set of filters, e.g. shared date bounds after a batch or student scope."""
+        self.conditions.extend(other.conditions)
+        self.params.extend(other.params)
+        return self
+
+    @property
+    def sql(self) -> str:
+        return " AND ".join(self.conditions) if self.conditions else "TRUE"
@@ -0,0 +1,64 @@
+"""
+orjson-backed JSON response class for GRAAVITONS SMS Backend.
+
+Every sub-app uses FastJSONResponse as its default_response_class. orjson
+serializes date/datetime natively (ISO 8601) and numpy scalars, and
+Decimal values from NUMERIC columns are emitted as floats.
+
+FastAPI still runs jsonable_encoder over a plain dict returned from an
+endpoint; endpoints with large payloads (the analytics views) return
+FastJSONResponse(payload) directly so only orjson walks the data.
+
+ReleasingStreamingResponse is the StreamingResponse for bodies that read
+from a pooled connection while they stream.
+"""
+
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that calls `release` (e.g. conn.close) once the response
+    is over: streamed to the end, failed, or abandoned by the client. A body
+    generator's own finally does not run if the client goes away before the
+    first chunk, so the release is tied to the response instead. `release`
+    must be safe to call twice; it runs in the threadpool.
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await run_in_threadpool(self.release)
@@ -8,46 +8,22 @@ from psycopg2 import sql
 from datetime import datetime, date
 import pandas as pd
 import io
+import csv
 from config import CORS_ORIGINS, APP_TITLE
 import numpy as np
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from api.middleware import get_current_user
 from db_pool import get_db_connection
+from metrics import timed_job
+from api.pagination import decode_cursor, encode_cursor, page_size, parse_fields, project, split_page
+from api.responses import FastJSONResponse
 import os
 import shutil
 
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, default_response_class=FastJSONResponse)
 
 
-def safe_float(value):
-    if value is None or str(value).strip() == '':
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
-
-def safe_int(value):
-    """Safely convert any value (including numpy floats) to Python int"""
-    if value is None:
-        return None
-    try:
-        return int(float(str(value)))
-    except (ValueError, TypeError):
-        return None
-
-
-def safe_str(value):
-    """Safely convert any value to a clean Python string"""
-    if value is None:
-        return None
-    s = str(value)
-    # Remove trailing .0 from numeric strings (e.g. "9876543210.0" -> "9876543210")
-    if s.endswith('.0') and s[:-2].replace('-', '', 1).isdigit():
-        s = s[:-2]
-    return s
-
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -461,6 +437,7 @@ async def create_student(student: StudentCreate, current_user: dict = Depends(ge
 
 
 @app.post("/api/student/upload", status_code=status.HTTP_201_CREATED)
+@timed_job("student_upload")
 async def upload_students_excel(
     file: UploadFile = File(...),
     batch_id: int = Form(...),
@@ -484,10 +461,7 @@ async def upload_students_excel(
         
         # Read Excel file
         contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
-        
-        # Replace NaN with None
-        df = df.where(pd.notna(df), None)
+        df = pd.read_excel(io.BytesIO(contents), dtype=str)
         
         # Validate required columns
         if 'student_id' not in df.columns or 'student_name' not in df.columns:
@@ -513,155 +487,32 @@ async def upload_students_excel(
                 detail=f"Batch with ID {batch_id} not found"
             )
         
-        success_count = 0
-        error_count = 0
-        errors = []
+        # Validate and coerce the whole sheet column by column
+        validated, validation_errors = validate_student_frame(df, STUDENT_IMPORT_FIELD_MAP)
+        rejected_rows = validation_errors.loc[validation_errors["fatal"], "row"].unique()
+        staged = validated[~validated["row_num"].isin(rejected_rows)].reindex(
+            columns=["row_num"] + list(STUDENT_IMPORT_FIELD_MAP.keys())
+        )
         
-        # Process each row
-        for index, row in df.iterrows():
-            try:
-                # Create SAVEPOINT at the start so it exists for rollback on ANY error
-                cursor.execute("SAVEPOINT student_row")
-                
-                # Helper to safely get a value from the row
-                def get_val(col):
-                    """Return value if column exists and is not NaN/None, else None"""
-                    if col in row and pd.notna(row[col]):
-                        return row[col]
-                    return None
-                
-                # Convert date string to date object if present
-                dob_value = None
-                if get_val('dob') is not None:
-                    try:
-                        dob_value = pd.to_datetime(row['dob']).date()
-                    except:
-                        dob_value = None
-                
-
-                
-                # Create student object with safe type conversions
-                student_data = StudentCreate(
-                    student_id=safe_str(row['student_id']),
-                    batch_id=batch_id,
-                    student_name=safe_str(row['student_name']),
-                    dob=dob_value,
-                    grade=safe_str(get_val('grade')),
-                    community=safe_str(get_val('community')),
-                    enrollment_year=safe_int(get_val('enrollment_year')),
-                    course=safe_str(get_val('course')),
-                    board=safe_str(get_val('board')),
-                    gender=safe_str(get_val('gender')),
-                    student_mobile=safe_str(get_val('student_mobile')),
-                    aadhar_no=safe_str(get_val('aadhar_no')),
-                    apaar_id=safe_str(get_val('apaar_id')),
-                    email=safe_str(get_val('email')),
-                    school_name=safe_str(get_val('school_name')),
-                    
-                    # Parent info
-                    guardian_name=safe_str(get_val('guardian_name')),
-                    guardian_occupation=safe_str(get_val('guardian_occupation')),
-                    guardian_mobile=safe_str(get_val('guardian_mobile')),
-                    guardian_email=safe_str(get_val('guardian_email')),
-                    father_name=safe_str(get_val('father_name')),
-                    father_occupation=safe_str(get_val('father_occupation')),
-                    father_mobile=safe_str(get_val('father_mobile')),
-                    father_email=safe_str(get_val('father_email')),
-                    mother_name=safe_str(get_val('mother_name')),
-                    mother_occupation=safe_str(get_val('mother_occupation')),
-                    mother_mobile=safe_str(get_val('mother_mobile')),
-                    mother_email=safe_str(get_val('mother_email')),
-                    sibling_name=safe_str(get_val('sibling_name')),
-                    sibling_grade=safe_str(get_val('sibling_grade')),
-                    sibling_school=safe_str(get_val('sibling_school')),
-                    sibling_college=safe_str(get_val('sibling_college')),
-                    
-                    # 10th marks
-                    tenth_school_name=safe_str(get_val('tenth_school_name')),
-                    tenth_year_of_passing=safe_int(get_val('tenth_year_of_passing')),
-                    tenth_board_of_study=safe_str(get_val('tenth_board_of_study')),
-                    tenth_english=safe_int(get_val('tenth_english')),
-                    tenth_tamil=safe_int(get_val('tenth_tamil')),
-                    tenth_hindi=safe_int(get_val('tenth_hindi')),
-                    tenth_maths=safe_int(get_val('tenth_maths')),
-                    tenth_science=safe_int(get_val('tenth_science')),
-                    tenth_social_science=safe_int(get_val('tenth_social_science')),
-                    tenth_total_marks=safe_int(get_val('tenth_total_marks')),
-                    
-                    # 12th marks
-                    twelfth_school_name=safe_str(get_val('twelfth_school_name')),
-                    twelfth_year_of_passing=safe_int(get_val('twelfth_year_of_passing')),
-                    twelfth_board_of_study=safe_str(get_val('twelfth_board_of_study')),
-                    twelfth_english=safe_int(get_val('twelfth_english')),
-                    twelfth_tamil=safe_int(get_val('twelfth_tamil')),
-                    twelfth_physics=safe_int(get_val('twelfth_physics')),
-                    twelfth_chemistry=safe_int(get_val('twelfth_chemistry')),
-                    twelfth_maths=safe_int(get_val('twelfth_maths')),
-                    twelfth_biology=safe_int(get_val('twelfth_biology')),
-                    twelfth_computer_science=safe_int(get_val('twelfth_computer_science')),
-                    twelfth_total_marks=safe_int(get_val('twelfth_total_marks')),
-                    
-                    # Entrance exams
-                    entrance_exam_1=safe_str(get_val('entrance_exam_1')),
-                    entrance_exam_1_percentile=safe_float(get_val('entrance_exam_1_percentile')),
-                    entrance_exam_1_mark=safe_int(get_val('entrance_exam_1_mark')),
-                    entrance_exam_2=safe_str(get_val('entrance_exam_2')),
-                    entrance_exam_2_percentile=safe_float(get_val('entrance_exam_2_percentile')),
-                    entrance_exam_2_mark=safe_int(get_val('entrance_exam_2_mark')),
-                    entrance_exam_3=safe_str(get_val('entrance_exam_3')),
-                    entrance_exam_3_percentile=safe_float(get_val('entrance_exam_3_percentile')),
-                    entrance_exam_3_mark=safe_int(get_val('entrance_exam_3_mark')),
-                    
-                    # Counselling
-                    counselling_forum_1=safe_str(get_val('counselling_forum_1')),
-                    counselling_round_1=safe_int(get_val('counselling_round_1')),
-                    all_india_rank_1=safe_int(get_val('all_india_rank_1')),
-                    community_rank_1=safe_int(get_val('community_rank_1')),
-                    counselling_college_1=safe_str(get_val('counselling_college_1')),
-                    counselling_forum_2=safe_str(get_val('counselling_forum_2')),
-                    counselling_round_2=safe_int(get_val('counselling_round_2')),
-                    all_india_rank_2=safe_int(get_val('all_india_rank_2')),
-                    community_rank_2=safe_int(get_val('community_rank_2')),
-                    counselling_college_2=safe_str(get_val('counselling_college_2')),
-                    counselling_forum_3=safe_str(get_val('counselling_forum_3')),
-                    counselling_round_3=safe_int(get_val('counselling_round_3')),
-                    all_india_rank_3=safe_int(get_val('all_india_rank_3')),
-                    community_rank_3=safe_int(get_val('community_rank_3')),
-                    counselling_college_3=safe_str(get_val('counselling_college_3'))
-                )
-                
-                # Use SAVEPOINT so a single row failure doesn't abort the whole transaction
-                insert_student_data(student_data, conn)
-                cursor.execute("RELEASE SAVEPOINT student_row")
-                success_count += 1
-                
-            except Exception as e:
-                # Rollback only this row's changes, keep the transaction alive
-                import traceback
-                traceback.print_exc()
-                cursor.execute("ROLLBACK TO SAVEPOINT student_row")
-                error_count += 1
-                error_msg = str(e)
-                if (
-                    "student_pkey" in error_msg
-                    or "student_student_id_key" in error_msg
-                    or "unique constraint" in error_msg.lower()
-                    or "already exists" in error_msg.lower()
-                ):
-                    error_msg = f"Student {row.get('student_id', 'N/A')} already exists in the database"
-                errors.append({
-                    'row': int(index) + 2,  # +2 because Excel is 1-indexed and has header
-                    'student_id': safe_str(row.get('student_id', 'N/A')),
-                    'error': error_msg
-                })
+        # Stage, check and insert the remaining rows set-based
+        success_count, staging_error_count, staging_errors = bulk_insert_students(
+            cursor, batch_id, frame_to_rows(staged)
+        )
+        error_count = len(rejected_rows) + staging_error_count
+        # Rows kept with unreadable cells left blank are reported as warnings
+        warning_rows = validation_errors.loc[~validation_errors["fatal"], "row"]
+        warning_count = int(warning_rows[~warning_rows.isin(rejected_rows)].nunique())
+        errors = sorted(error_records(validation_errors) + staging_errors, key=lambda e: e["row"])[:50]
         
         # Commit all successful insertions
         conn.commit()
         cursor.close()
         conn.close()
         
-        if success_count > 0 and error_count == 0:
+        if success_count > 0 and error_count == 0 and warning_count == 0:
             message = "All students uploaded successfully"
+        elif success_count > 0 and error_count == 0:
+            message = f"All students uploaded — {warning_count} row(s) had values that were left blank"
         elif success_count > 0:
             message = f"Upload partially completed — {error_count} student(s) failed"
         else:
@@ -671,7 +522,8 @@ async def upload_students_excel(
             "message": message,
             "success_count": success_count,
             "error_count": error_count,
-            "errors": errors[:50] if errors else []
+            "warning_count": warning_count,
+            "errors": errors
         }
         
     except HTTPException:
@@ -686,11 +538,30 @@ async def upload_students_excel(
         )
 
 
+STUDENT_LIST_FIELDS = [
+    "student_no", "student_id", "student_name", "gender", "dob", "community", "grade",
+    "enrollment_year", "course", "board", "student_mobile", "email", "created_at",
+]
+
+
 @app.get("/api/student/batch/{batch_id}")
-async def get_students_by_batch(batch_id: int, current_user: dict = Depends(get_current_user)):
+async def get_students_by_batch(
+    batch_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Get all students in a specific batch with their basic information
+    Get all students in a specific batch with their basic information.
+    Pass limit (and the returned next_cursor) to page through large batches,
+    fields=a,b to return only some fields, include_total=true for the batch size.
     """
+    selected_fields = parse_fields(fields, STUDENT_LIST_FIELDS)
+    after = decode_cursor(cursor, (str, int)) if cursor else None
+    limit = page_size(limit) if limit is not None else None
+
     conn = None
     try:
         conn = get_db_connection()
@@ -700,9 +571,9 @@ async def get_students_by_batch(batch_id: int, current_user: dict = Depends(get_
                 detail="Database connection failed"
             )
         
-        cursor = conn.cursor()
+        db_cursor = conn.cursor()
         
-        # Fetch students with basic info
+        # Fetch students with basic info, in roster order (keyset on sort_key, student_no)
         query = """
             SELECT 
                 s.student_no,
@@ -717,18 +588,22 @@ async def get_students_by_batch(batch_id: int, current_user: dict = Depends(get_
                 s.board,
                 s.student_mobile,
                 s.email,
-                s.created_at
+                s.created_at,
+                s.sort_key
             FROM student s
             WHERE s.batch_id = %s
-            ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
-                s.student_name ASC
         """
-        
-        cursor.execute(query, (batch_id,))
-        rows = cursor.fetchall()
+        params = [batch_id]
+        if after:
+            query += " AND (s.sort_key, s.student_no) > (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY s.sort_key, s.student_no"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+        
+        db_cursor.execute(query, params)
+        rows, has_more = split_page(db_cursor.fetchall(), limit)
         
         students = []
         for row in rows:
@@ -748,14 +623,21 @@ async def get_students_by_batch(batch_id: int, current_user: dict = Depends(get_
                 "created_at": row[12].isoformat() if row[12] else None
             }
             students.append(student)
+
+        total = None
+        if include_total:
+            db_cursor.execute("SELECT COUNT(*) FROM student WHERE batch_id = %s", (batch_id,))
+            total = db_cursor.fetchone()[0]
         
-        cursor.close()
+        db_cursor.close()
         conn.close()
         
         return {
             "batch_id": batch_id,
             "count": len(students),
-            "students": students
+            "students": project(students, selected_fields),
+            "next_cursor": encode_cursor((rows[-1][13], rows[-1][0])) if has_more else None,
+            "total": total
         }
         
     except HTTPException:
@@ -769,6 +651,241 @@ async def get_students_by_batch(batch_id: int, current_user: dict = Depends(get_
         )
 
 
+def like_pattern(text: str) -> str:
+    """Substring ILIKE pattern for text, with LIKE wildcards in it matched literally"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_students(cursor, query_text: str, limit: int = 20, batch_id: Optional[int] = None, include_names: bool = True):
+    """
+    Find students by admission number and (optionally) name, best match first.
+
+    Substring matches and fuzzy name matches (pg_trgm word similarity) are both
+    served by the trigram GIN indexes on student_id / student_name. An exact
+    admission number ranks first, then higher trigram similarity.
+    Returns a list of dicts.
+    """
+    conditions = ["s.student_id ILIKE %(pattern)s"]
+    if include_names:
+        conditions += ["s.student_name ILIKE %(pattern)s", "%(q)s <%% s.student_name"]
+    where = "(" + " OR ".join(conditions) + ")"
+    if batch_id is not None:
+        where += " AND s.batch_id = %(batch_id)s"
+    name_score = "word_similarity(%(q)s, s.student_name)" if include_names else "0"
+
+    cursor.execute(f"""
+        SELECT
+            s.student_no,
+            s.student_id,
+            s.student_name,
+            s.grade,
+            s.course,
+            s.board,
+            s.photo_url,
+            s.batch_id,
+            b.batch_name,
+            b.start_year,
+            b.end_year,
+            GREATEST(similarity(s.student_id, %(q)s), {name_score}) AS score
+        FROM student s
+        LEFT JOIN batch b ON b.batch_id = s.batch_id
+        WHERE {where}
+        ORDER BY
+            LOWER(s.student_id) = LOWER(%(q)s) DESC,
+            score DESC,
+            s.sort_key,
+            s.student_name ASC
+        LIMIT %(limit)s
+    """, {"q": query_text, "pattern": like_pattern(query_text), "batch_id": batch_id, "limit": limit})
+
+    return [
+        {
+            "student_no": row[0],
+            "student_id": row[1],
+            "student_name": row[2],
+            "grade": row[3],
+            "course": row[4],
+            "board": row[5],
+            "photo_url": row[6],
+            "batch_id": row[7],
+            "batch_name": row[8],
+            "academic_year": f"{row[9]}-{row[10]}" if row[9] and row[10] else "",
+            "score": round(float(row[11]), 3),
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+@app.get("/api/student/search")
+async def search_students_endpoint(
+    q: str,
+    batch_id: Optional[int] = None,
+    limit: int = 20,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Search students by admission number or name, ranked by similarity.
+    Tolerates typos in names (e.g. 'Ramesh Kumr').
+    """
+    conn = None
+    try:
+        query_text = (q or "").strip()
+        if not query_text:
+            return {"students": [], "total": 0}
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        students = search_students(cursor, query_text, max(1, min(limit, 50)), batch_id=batch_id)
+        cursor.close()
+
+        return {"students": students, "total": len(students)}
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error searching students: {str(e)}"
+        )
+    finally:
+        if conn:
+            conn.close()
+
+
+# Full profile of each student in one round-trip: every related table is
+# folded into a JSON object by a lateral subquery (NULL when the row is missing)
+STUDENT_DETAILS_QUERY = """
+    SELECT
+        json_build_object(
+            'student_no', s.student_no, 'student_id', s.student_id, 'batch_id', s.batch_id,
+            'student_name', s.student_name, 'dob', s.dob, 'grade', s.grade,
+            'community', s.community, 'enrollment_year', s.enrollment_year, 'course', s.course,
+            'board', s.board, 'gender', s.gender, 'student_mobile', s.student_mobile,
+            'aadhar_no', s.aadhar_no, 'apaar_id', s.apaar_id, 'email', s.email,
+            'school_name', s.school_name, 'created_at', s.created_at, 'photo_url', s.photo_url
+        ),
+        p.data, t10.data, t12.data, en.data, co.data
+    FROM student s
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'guardian_name', guardian_name, 'guardian_occupation', guardian_occupation,
+            'guardian_mobile', guardian_mobile, 'guardian_email', guardian_email,
+            'father_name', father_name, 'father_occupation', father_occupation,
+            'father_mobile', father_mobile, 'father_email', father_email,
+            'mother_name', mother_name, 'mother_occupation', mother_occupation,
+            'mother_mobile', mother_mobile, 'mother_email', mother_email,
+            'sibling_name', sibling_name, 'sibling_grade', sibling_grade,
+            'sibling_school', sibling_school, 'sibling_college', sibling_college
+        ) AS data
+        FROM parent_info WHERE student_no = s.student_no
+    ) p ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'tenth_school_name', school_name, 'tenth_year_of_passing', year_of_passing,
+            'tenth_board_of_study', board_of_study, 'tenth_english', english,
+            'tenth_tamil', tamil, 'tenth_hindi', hindi, 'tenth_maths', maths,
+            'tenth_science', science, 'tenth_social_science', social_science,
+            'tenth_total_marks', total_marks
+        ) AS data
+        FROM tenth_mark WHERE student_no = s.student_no
+    ) t10 ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'twelfth_school_name', school_name, 'twelfth_year_of_passing', year_of_passing,
+            'twelfth_board_of_study', board_of_study, 'twelfth_english', english,
+            'twelfth_physics', physics, 'twelfth_maths', maths, 'twelfth_chemistry', chemistry,
+            'twelfth_biology', biology, 'twelfth_computer_science', computer_science,
+            'twelfth_tamil', tamil, 'twelfth_total_marks', total_marks
+        ) AS data
+        FROM twelfth_mark WHERE student_no = s.student_no
+    ) t12 ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'entrance_exam_1', entrance_exam_1, 'entrance_exam_1_percentile', entrance_exam_1_percentile,
+            'entrance_exam_1_mark', entrance_exam_1_mark,
+            'entrance_exam_2', entrance_exam_2, 'entrance_exam_2_percentile', entrance_exam_2_percentile,
+            'entrance_exam_2_mark', entrance_exam_2_mark,
+            'entrance_exam_3', entrance_exam_3, 'entrance_exam_3_percentile', entrance_exam_3_percentile,
+            'entrance_exam_3_mark', entrance_exam_3_mark
+        ) AS data
+        FROM entrance_exams WHERE student_no = s.student_no
+        ORDER BY exam_id
+        LIMIT 1
+    ) en ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'counselling_forum_1', counselling_forum_1, 'counselling_round_1', counselling_round_1,
+            'all_india_rank_1', all_india_rank_1, 'community_rank_1', community_rank_1,
+            'counselling_college_1', counselling_college_1,
+            'counselling_forum_2', counselling_forum_2, 'counselling_round_2', counselling_round_2,
+            'all_india_rank_2', all_india_rank_2, 'community_rank_2', community_rank_2,
+            'counselling_college_2', counselling_college_2,
+            'counselling_forum_3', counselling_forum_3, 'counselling_round_3', counselling_round_3,
+            'all_india_rank_3', all_india_rank_3, 'community_rank_3', community_rank_3,
+            'counselling_college_3', counselling_college_3
+        ) AS data
+        FROM counselling_detail WHERE student_no = s.student_no
+        ORDER BY counselling_id
+        LIMIT 1
+    ) co ON TRUE
+    WHERE s.student_no = ANY(%s)
+"""
+
+MAX_DETAIL_BATCH = 500
+
+
+def fetch_student_details(cursor, student_nos: List[int]) -> List[dict]:
+    """
+    Complete details (student, parent, 10th/12th marks, entrance exams,
+    counselling) of the given students, in the order requested. Unknown
+    student_nos are skipped.
+    """
+    cursor.execute(STUDENT_DETAILS_QUERY, (list(student_nos),))
+    details = {}
+    for student, *related in cursor.fetchall():
+        for part in related:
+            if part:
+                student.update(part)
+        details[student["student_no"]] = student
+    return [details[no] for no in dict.fromkeys(student_nos) if no in details]
+
+
+class StudentDetailsRequest(BaseModel):
+    student_nos: List[int]
+
+
+@app.post("/api/student/details")
+async def get_students_details(request: StudentDetailsRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Complete details of several students in one round-trip (same shape as
+    GET /api/student/{student_no}), in the order requested.
+    """
+    if len(request.student_nos) > MAX_DETAIL_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_DETAIL_BATCH} students per request"
+        )
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        students = fetch_student_details(cursor, request.student_nos)
+        cursor.close()
+
+        return {"students": students, "count": len(students)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error fetching student details: {str(e)}"
+        )
+    finally:
+        if conn:
+            conn.close()
+
+
 @app.get("/api/student/{student_no}")
 async def get_student_details(student_no: int, current_user: dict = Depends(get_current_user)):
     """
@@ -784,174 +901,17 @@ async def get_student_details(student_no: int, current_user: dict = Depends(get_
             )
         
         cursor = conn.cursor()
-        
-        # Fetch student basic info
-        cursor.execute("""
-            SELECT student_no, student_id, batch_id, student_name, dob, grade, community, 
-                   enrollment_year, course, board, gender, student_mobile, 
-                   aadhar_no, apaar_id, email, school_name, created_at, photo_url
-            FROM student WHERE student_no = %s
-        """, (student_no,))
-        
-        student_row = cursor.fetchone()
-        if not student_row:
-            cursor.close()
-            conn.close()
+        students = fetch_student_details(cursor, [student_no])
+        cursor.close()
+        conn.close()
+
+        if not students:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Student {student_no} not found"
             )
         
-        student_data = {
-            "student_no": student_row[0],
-            "student_id": student_row[1],
-            "batch_id": student_row[2],
-            "student_name": student_row[3],
-            "dob": student_row[4].isoformat() if student_row[4] else None,
-            "grade": student_row[5],
-            "community": student_row[6],
-            "enrollment_year": student_row[7],
-            "course": student_row[8],
-            "board": student_row[9],
-            "gender": student_row[10],
-            "student_mobile": student_row[11],
-            "aadhar_no": student_row[12],
-            "apaar_id": student_row[13],
-            "email": student_row[14],
-            "school_name": student_row[15],
-            "created_at": student_row[16].isoformat() if student_row[16] else None,
-            "photo_url": student_row[17]
-        }
-        
-        # Fetch parent info
-        cursor.execute("""
-            SELECT guardian_name, guardian_occupation, guardian_mobile, guardian_email,
-                   father_name, father_occupation, father_mobile, father_email,
-                   mother_name, mother_occupation, mother_mobile, mother_email,
-                   sibling_name, sibling_grade, sibling_school, sibling_college
-            FROM parent_info WHERE student_no = %s
-        """, (student_no,))
-        
-        parent_row = cursor.fetchone()
-        if parent_row:
-            student_data.update({
-                "guardian_name": parent_row[0],
-                "guardian_occupation": parent_row[1],
-                "guardian_mobile": parent_row[2],
-                "guardian_email": parent_row[3],
-                "father_name": parent_row[4],
-                "father_occupation": parent_row[5],
-                "father_mobile": parent_row[6],
-                "father_email": parent_row[7],
-                "mother_name": parent_row[8],
-                "mother_occupation": parent_row[9],
-                "mother_mobile": parent_row[10],
-                "mother_email": parent_row[11],
-                "sibling_name": parent_row[12],
-                "sibling_grade": parent_row[13],
-                "sibling_school": parent_row[14],
-                "sibling_college": parent_row[15]
-            })
-        
-        # Fetch 10th marks
-        cursor.execute("""
-            SELECT school_name, year_of_passing, board_of_study, english, tamil, hindi,
-                   maths, science, social_science, total_marks
-            FROM tenth_mark WHERE student_no = %s
-        """, (student_no,))
-        
-        tenth_row = cursor.fetchone()
-        if tenth_row:
-            student_data.update({
-                "tenth_school_name": tenth_row[0],
-                "tenth_year_of_passing": tenth_row[1],
-                "tenth_board_of_study": tenth_row[2],
-                "tenth_english": tenth_row[3],
-                "tenth_tamil": tenth_row[4],
-                "tenth_hindi": tenth_row[5],
-                "tenth_maths": tenth_row[6],
-                "tenth_science": tenth_row[7],
-                "tenth_social_science": tenth_row[8],
-                "tenth_total_marks": tenth_row[9]
-            })
-        
-        # Fetch 12th marks
-        cursor.execute("""
-            SELECT school_name, year_of_passing, board_of_study, english, physics,
-                   maths, chemistry, biology, computer_science, tamil, total_marks
-            FROM twelfth_mark WHERE student_no = %s
-        """, (student_no,))
-        
-        twelfth_row = cursor.fetchone()
-        if twelfth_row:
-            student_data.update({
-                "twelfth_school_name": twelfth_row[0],
-                "twelfth_year_of_passing": twelfth_row[1],
-                "twelfth_board_of_study": twelfth_row[2],
-                "twelfth_english": twelfth_row[3],
-                "twelfth_physics": twelfth_row[4],
-                "twelfth_maths": twelfth_row[5],
-                "twelfth_chemistry": twelfth_row[6],
-                "twelfth_biology": twelfth_row[7],
-                "twelfth_computer_science": twelfth_row[8],
-                "twelfth_tamil": twelfth_row[9],
-                "twelfth_total_marks": twelfth_row[10]
-            })
-        
-        # Fetch entrance exams
-        cursor.execute("""
-            SELECT entrance_exam_1, entrance_exam_1_percentile, entrance_exam_1_mark,
-                   entrance_exam_2, entrance_exam_2_percentile, entrance_exam_2_mark,
-                   entrance_exam_3, entrance_exam_3_percentile, entrance_exam_3_mark
-            FROM entrance_exams WHERE student_no = %s
-        """, (student_no,))
-        
-        entrance_row = cursor.fetchone()
-        if entrance_row:
-            student_data.update({
-                "entrance_exam_1": entrance_row[0],
-                "entrance_exam_1_percentile": float(entrance_row[1]) if entrance_row[1] is not None else None,
-                "entrance_exam_1_mark": entrance_row[2],
-                "entrance_exam_2": entrance_row[3],
-                "entrance_exam_2_percentile": float(entrance_row[4]) if entrance_row[4] is not None else None,
-                "entrance_exam_2_mark": entrance_row[5],
-                "entrance_exam_3": entrance_row[6],
-                "entrance_exam_3_percentile": float(entrance_row[7]) if entrance_row[7] is not None else None,
-                "entrance_exam_3_mark": entrance_row[8]
-            })
-        
-        # Fetch counselling details
-        cursor.execute("""
-            SELECT counselling_forum_1, counselling_round_1, all_india_rank_1, community_rank_1, counselling_college_1,
-                   counselling_forum_2, counselling_round_2, all_india_rank_2, community_rank_2, counselling_college_2,
-                   counselling_forum_3, counselling_round_3, all_india_rank_3, community_rank_3, counselling_college_3
-            FROM counselling_detail WHERE student_no = %s
-        """, (student_no,))
-        
-        counselling_row = cursor.fetchone()
-        if counselling_row:
-            student_data.update({
-                "counselling_forum_1": counselling_row[0],
-                "counselling_round_1": counselling_row[1],
-                "all_india_rank_1": counselling_row[2],
-                "community_rank_1": counselling_row[3],
-                "counselling_college_1": counselling_row[4],
-                "counselling_forum_2": counselling_row[5],
-                "counselling_round_2": counselling_row[6],
-                "all_india_rank_2": counselling_row[7],
-                "community_rank_2": counselling_row[8],
-                "counselling_college_2": counselling_row[9],
-                "counselling_forum_3": counselling_row[10],
-                "counselling_round_3": counselling_row[11],
-                "all_india_rank_3": counselling_row[12],
-                "community_rank_3": counselling_row[13],
-                "counselling_college_3": counselling_row[14]
-            })
-        
-        cursor.close()
-        conn.close()
-        
-        return student_data
+        return students[0]
         
     except HTTPException:
         raise
@@ -1320,6 +1280,361 @@ ALL_EDIT_COLUMNS = [
 ]
 
 
+def copy_rows(cursor, table: str, columns: List[str], rows):
+    """Bulk-load `rows` into `table` with COPY. None values are loaded as NULL."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def copy_rows_to_temp_table(cursor, temp_table: str, source_table: str, columns: List[str], rows):
+    """
+    Create a temp table with the same column types as `source_table` and
+    bulk-load `rows` into it. The temp table is dropped when the transaction
+    commits.
+    """
+    column_list = ", ".join(columns)
+    cursor.execute(f"DROP TABLE IF EXISTS {temp_table}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {temp_table} ON COMMIT DROP AS
+        SELECT {column_list} FROM {source_table} WITH NO DATA
+    """)
+    copy_rows(cursor, temp_table, columns, rows)
+
+
+def apply_bulk_table_updates(cursor, table: str, columns: List[str], rows):
+    """
+    Apply bulk-edit rows of [student_no, *columns] to `table` in one pass.
+    NULL cells keep the existing value. Related tables get an INSERT for
+    students that don't have a row yet (UPSERT semantics).
+    """
+    temp_table = f"bulk_edit_{table}"
+    copy_rows_to_temp_table(cursor, temp_table, table, ["student_no"] + columns, rows)
+
+    set_clause = ", ".join([f"{col} = COALESCE(src.{col}, t.{col})" for col in columns])
+    cursor.execute(f"""
+        UPDATE {table} AS t
+        SET {set_clause}
+        FROM {temp_table} AS src
+        WHERE t.student_no = src.student_no
+    """)
+
+    if table != "student":
+        column_list = ", ".join(columns)
+        cursor.execute(f"""
+            INSERT INTO {table} (student_no, {column_list})
+            SELECT src.student_no, {column_list}
+            FROM {temp_table} AS src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table} AS t WHERE t.student_no = src.student_no
+            )
+        """)
+
+
+# ==================== VECTORIZED SHEET VALIDATION ====================
+
+# Contact-number style columns: spaces, dashes, dots and brackets are stripped
+PHONE_LIKE_COLUMNS = {"student_mobile", "guardian_mobile", "father_mobile", "mother_mobile", "aadhar_no"}
+
+# Accepted date layouts, tried in order (Excel date cells read as text use the last one)
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S")
+
+VALUE_TYPE_ERRORS = {
+    "int": "expected a number",
+    "float": "expected a decimal number",
+    "date": "invalid date",
+}
+
+
+def coerce_student_column(series: pd.Series, col: str, col_type: str):
+    """
+    Clean and type-convert one sheet column in a single pass.
+
+    Returns (values, invalid, out_of_range) where `values` holds the converted
+    cells (NA for blank, unparseable or out-of-range ones), `invalid` marks
+    non-blank cells that could not be converted and `out_of_range` marks whole
+    numbers beyond the INTEGER range (no student column is wider), which would
+    otherwise overflow the Int64 cast.
+    """
+    text = series.astype("string").str.strip()
+    # Remove trailing .0 from numbers read as floats (e.g. "9876543210.0" -> "9876543210")
+    text = text.str.replace(r"^(-?\d+)\.0$", r"\1", regex=True)
+    if col in PHONE_LIKE_COLUMNS:
+        text = text.str.replace(r"[\s\-().]", "", regex=True)
+    text = text.mask(text == "")
+    blank = text.isna()
+
+    if col_type in ("int", "float"):
+        numbers = pd.to_numeric(text, errors="coerce")
+        numbers = numbers.where(np.isfinite(numbers))
+        invalid = ~blank & numbers.isna()
+        if col_type == "int":
+            numbers = np.trunc(numbers)
+            out_of_range = (numbers.abs() > INTEGER_COLUMN_LIMITS["integer"]).fillna(False)
+            values = numbers.mask(out_of_range).astype("Int64")
+        else:
+            out_of_range = pd.Series(False, index=text.index)
+            values = numbers
+    elif col_type == "date":
+        parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+        for fmt in DATE_FORMATS:
+            pending = parsed.isna() & ~blank
+            if not pending.any():
+                break
+            parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors="coerce")
+        values = parsed.dt.date.where(parsed.notna(), None)
+        invalid = ~blank & parsed.isna()
+        out_of_range = pd.Series(False, index=text.index)
+    else:
+        values = text
+        invalid = pd.Series(False, index=text.index)
+        out_of_range = invalid
+
+    return values, invalid, out_of_range
+
+
+def validate_student_frame(df: pd.DataFrame, field_map: dict, required_columns=("student_id", "student_name")):
+    """
+    Column-wise validation and coercion of an uploaded student sheet.
+
+    Every column of `df` that appears in `field_map` is converted with
+    coerce_student_column. Returns (validated, errors):
+      - validated: row_num plus one typed column per mapped column present,
+        with unparseable cells set to NA (the row itself is kept)
+      - errors: one row per problem with columns row, student_id, error and
+        fatal (True when a required column is blank, so the row is rejected)
+    """
+    validated = pd.DataFrame({"row_num": df.index.to_numpy() + 2}, index=df.index)  # Excel is 1-indexed + header
+    error_frames = []
+
+    for col in [c for c in df.columns if c in field_map]:
+        col_type = field_map[col][2]
+        values, invalid, out_of_range = coerce_student_column(df[col], col, col_type)
+        validated[col] = values
+        if invalid.any():
+            raw = df.loc[invalid, col].astype("string").str.strip()
+            error_frames.append(pd.DataFrame({
+                "row_num": validated.loc[invalid, "row_num"],
+                "error": f"{col}: {VALUE_TYPE_ERRORS[col_type]}, got '" + raw + "'",
+                "fatal": False,
+            }))
+        if out_of_range.any():
+            raw = df.loc[out_of_range, col].astype("string").str.strip()
+            error_frames.append(pd.DataFrame({
+                "row_num": validated.loc[out_of_range, "row_num"],
+                "error": f"{col}: number is out of range, got '" + raw + "'",
+                "fatal": False,
+            }))
+
+    for col in required_columns:
+        missing = validated[col].isna()
+        if missing.any():
+            error_frames.append(pd.DataFrame({
+                "row_num": validated.loc[missing, "row_num"],
+                "error": f"{col} is empty (mandatory)",
+                "fatal": True,
+            }))
+
+    if error_frames:
+        errors = pd.concat(error_frames).sort_values("row_num", kind="stable")
+        errors["student_id"] = validated.loc[errors.index, "student_id"].fillna("N/A").to_numpy()
+    else:
+        errors = pd.DataFrame(columns=["row_num", "error", "fatal", "student_id"])
+    errors = errors.rename(columns={"row_num": "row"})[["row", "student_id", "error", "fatal"]]
+
+    return validated, errors
+
+
+def frame_to_rows(frame: pd.DataFrame):
+    """Convert a validated frame to plain row lists with None for missing values"""
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+
+def error_records(errors: pd.DataFrame):
+    """Convert a validation error frame to the {'row', 'student_id', 'error'} dicts returned by the API"""
+    return [
+        {"row": int(row), "student_id": str(student_id), "error": error}
+        for row, student_id, error in errors[["row", "student_id", "error"]].itertuples(index=False)
+    ]
+
+# ==================== STAGED EXCEL IMPORT ====================
+
+# Bulk-edit value type -> column type used in the import staging table.
+# Staging types are deliberately looser than the target columns so that
+# overflowing values are reported per row instead of failing the COPY.
+IMPORT_STAGING_TYPES = {"str": "TEXT", "int": "BIGINT", "float": "NUMERIC", "date": "DATE"}
+
+# Excel header -> (table, db_column, type) for every column accepted by the upload
+STUDENT_IMPORT_FIELD_MAP = {"student_id": ("student", "student_id", "str"), **BULK_EDIT_FIELD_MAP}
+
+# Related rows are only created when at least one of these columns is filled in.
+# parent_info is always created, matching single-student creation.
+IMPORT_RELATED_TABLE_TRIGGERS = {
+    "parent_info": [],
+    "tenth_mark": ["tenth_school_name", "tenth_year_of_passing"],
+    "twelfth_mark": ["twelfth_school_name", "twelfth_year_of_passing"],
+    "entrance_exams": ["entrance_exam_1", "entrance_exam_2", "entrance_exam_3"],
+    "counselling_detail": [
+        "counselling_forum_1", "counselling_college_1",
+        "counselling_forum_2", "counselling_college_2",
+        "counselling_forum_3", "counselling_college_3",
+    ],
+}
+
+INTEGER_COLUMN_LIMITS = {"smallint": 32767, "integer": 2147483647}
+
+
+def import_column_checks(cursor):
+    """
+    Build (sql_condition, error_message) pairs that flag staged values which
+    would not fit their target column (VARCHAR length, integer range, NUMERIC
+    precision), using the live column definitions from information_schema.
+    """
+    cursor.execute("""
+        SELECT table_name, column_name, data_type, character_maximum_length,
+               numeric_precision, numeric_scale
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = ANY(%s)
+    """, (list(dict.fromkeys(table for table, _, _ in STUDENT_IMPORT_FIELD_MAP.values())),))
+    column_defs = {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+
+    checks = []
+    for excel_col, (table, db_col, _) in STUDENT_IMPORT_FIELD_MAP.items():
+        if (table, db_col) not in column_defs:
+            continue
+        data_type, max_length, precision, scale = column_defs[(table, db_col)]
+        if max_length:
+            checks.append((
+                f"length({excel_col}) > {int(max_length)}",
+                f"{excel_col}: value is longer than {int(max_length)} characters",
+            ))
+        elif data_type in INTEGER_COLUMN_LIMITS:
+            limit = INTEGER_COLUMN_LIMITS[data_type]
+            checks.append((
+                f"abs({excel_col}) > {limit}",
+                f"{excel_col}: number is out of range",
+            ))
+        elif data_type == "numeric" and precision:
+            checks.append((
+                f"abs({excel_col}) >= 1e{int(precision) - int(scale or 0)}",
+                f"{excel_col}: number is out of range",
+            ))
+    return checks
+
+
+def bulk_insert_students(cursor, batch_id: int, rows):
+    """
+    Insert parsed upload rows through a staging table.
+
+    `rows` are [row_num, *values] lists in STUDENT_IMPORT_FIELD_MAP order.
+    Rows are COPY'd into a temp table, oversized values and duplicate
+    admission numbers are flagged with set-based UPDATEs, and the remaining
+    rows are inserted into student and its related tables with one
+    INSERT ... SELECT per table.
+
+    Returns (success_count, error_count, errors) where errors is the first 50
+    {'row', 'student_id', 'error'} dicts in sheet order.
+    """
+    import_columns = list(STUDENT_IMPORT_FIELD_MAP.keys())
+    column_ddl = ",\n".join(
+        f"{col} {IMPORT_STAGING_TYPES[col_type]}"
+        for col, (_, _, col_type) in STUDENT_IMPORT_FIELD_MAP.items()
+    )
+    cursor.execute("DROP TABLE IF EXISTS student_import")
+    cursor.execute(f"""
+        CREATE TEMP TABLE student_import (
+            row_num INT PRIMARY KEY,
+            student_no BIGINT,
+            error TEXT,
+            {column_ddl}
+        ) ON COMMIT DROP
+    """)
+    copy_rows(cursor, "student_import", ["row_num"] + import_columns, rows)
+
+    # 1. Values that don't fit their target columns
+    checks = import_column_checks(cursor)
+    if checks:
+        case_clause = "\n".join(f"WHEN {condition} THEN %s" for condition, _ in checks)
+        cursor.execute(
+            f"UPDATE student_import SET error = CASE {case_clause} END",
+            [message for _, message in checks]
+        )
+
+    # 2. Admission numbers already in the database, or repeated earlier in the sheet
+    cursor.execute("""
+        UPDATE student_import si
+        SET error = 'Student ' || si.student_id || ' already exists in the database'
+        WHERE si.error IS NULL
+          AND (
+            EXISTS (SELECT 1 FROM student s WHERE s.student_id = si.student_id)
+            OR EXISTS (
+                SELECT 1 FROM student_import prev
+                WHERE prev.student_id = si.student_id
+                  AND prev.row_num < si.row_num
+                  AND prev.error IS NULL
+            )
+          )
+    """)
+
+    # 3. Insert students and remember the generated student_no per staged row
+    student_columns = [
+        (excel_col, db_col)
+        for excel_col, (table, db_col, _) in STUDENT_IMPORT_FIELD_MAP.items()
+        if table == "student"
+    ]
+    cursor.execute(f"""
+        WITH inserted AS (
+            INSERT INTO student (batch_id, {', '.join(db_col for _, db_col in student_columns)})
+            SELECT %s, {', '.join(excel_col for excel_col, _ in student_columns)}
+            FROM student_import
+            WHERE error IS NULL
+            ORDER BY row_num
+            RETURNING student_no, student_id
+        )
+        UPDATE student_import si
+        SET student_no = inserted.student_no
+        FROM inserted
+        WHERE si.student_id = inserted.student_id AND si.error IS NULL
+    """, (batch_id,))
+    success_count = cursor.rowcount
+
+    # 4. Related tables, one INSERT ... SELECT each
+    for table, trigger_columns in IMPORT_RELATED_TABLE_TRIGGERS.items():
+        table_columns = [
+            (excel_col, db_col)
+            for excel_col, (col_table, db_col, _) in STUDENT_IMPORT_FIELD_MAP.items()
+            if col_table == table
+        ]
+        trigger_clause = ""
+        if trigger_columns:
+            trigger_clause = "AND (" + " OR ".join(
+                f"COALESCE({col}::TEXT, '') <> ''" for col in trigger_columns
+            ) + ")"
+        cursor.execute(f"""
+            INSERT INTO {table} (student_no, {', '.join(db_col for _, db_col in table_columns)})
+            SELECT student_no, {', '.join(excel_col for excel_col, _ in table_columns)}
+            FROM student_import
+            WHERE student_no IS NOT NULL {trigger_clause}
+        """)
+
+    cursor.execute("""
+        SELECT row_num, student_id, error, COUNT(*) OVER ()
+        FROM student_import
+        WHERE error IS NOT NULL
+        ORDER BY row_num
+        LIMIT 50
+    """)
+    error_rows = cursor.fetchall()
+    error_count = error_rows[0][3] if error_rows else 0
+    errors = [
+        {"row": row[0], "student_id": row[1] if row[1] is not None else "N/A", "error": row[2]}
+        for row in error_rows
+    ]
+    return success_count, error_count, errors
+
+
 @app.get("/api/student/edit-template/{batch_id}")
 async def download_edit_template(batch_id: int, current_user: dict = Depends(get_current_user)):
     """
@@ -1346,9 +1661,7 @@ async def download_edit_template(batch_id: int, current_user: dict = Depends(get
             FROM student s
             WHERE s.batch_id = %s
             ORDER BY
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN 0 ELSE 1 END,
-                CASE WHEN s.student_id ~ '^[0-9]+$' THEN s.student_id::BIGINT END,
-                s.student_id ASC,
+                s.sort_key,
                 s.student_name ASC
         """, (batch_id,))
         student_rows = cursor.fetchall()
@@ -1356,116 +1669,8 @@ async def download_edit_template(batch_id: int, current_user: dict = Depends(get
         if not student_rows:
             raise HTTPException(status_code=404, detail="No students found in this batch")
 
-        # For each student, pull complete data (reuse the single-student query pattern)
-        rows_data = []
-        for student_no, sid in student_rows:
-            row = {}
-            # student table
-            cursor.execute("""
-                SELECT student_id, student_name, dob, grade, community,
-                       enrollment_year, course, board, gender, student_mobile,
-                       aadhar_no, apaar_id, email, school_name
-                FROM student WHERE student_no = %s
-            """, (student_no,))
-            s = cursor.fetchone()
-            if s:
-                row["student_id"] = s[0]
-                row["student_name"] = s[1]
-                row["dob"] = s[2].isoformat() if s[2] else None
-                row["grade"] = s[3]
-                row["community"] = s[4]
-                row["enrollment_year"] = s[5]
-                row["course"] = s[6]
-                row["board"] = s[7]
-                row["gender"] = s[8]
-                row["student_mobile"] = s[9]
-                row["aadhar_no"] = s[10]
-                row["apaar_id"] = s[11]
-                row["email"] = s[12]
-                row["school_name"] = s[13]
-
-            # parent_info
-            cursor.execute("""
-                SELECT guardian_name, guardian_occupation, guardian_mobile, guardian_email,
-                       father_name, father_occupation, father_mobile, father_email,
-                       mother_name, mother_occupation, mother_mobile, mother_email,
-                       sibling_name, sibling_grade, sibling_school, sibling_college
-                FROM parent_info WHERE student_no = %s
-            """, (student_no,))
-            p = cursor.fetchone()
-            if p:
-                for i, key in enumerate([
-                    "guardian_name", "guardian_occupation", "guardian_mobile", "guardian_email",
-                    "father_name", "father_occupation", "father_mobile", "father_email",
-                    "mother_name", "mother_occupation", "mother_mobile", "mother_email",
-                    "sibling_name", "sibling_grade", "sibling_school", "sibling_college"
-                ]):
-                    row[key] = p[i]
-
-            # tenth_mark
-            cursor.execute("""
-                SELECT school_name, year_of_passing, board_of_study,
-                       english, tamil, hindi, maths, science, social_science, total_marks
-                FROM tenth_mark WHERE student_no = %s
-            """, (student_no,))
-            t10 = cursor.fetchone()
-            if t10:
-                for i, key in enumerate([
-                    "tenth_school_name", "tenth_year_of_passing", "tenth_board_of_study",
-                    "tenth_english", "tenth_tamil", "tenth_hindi", "tenth_maths",
-                    "tenth_science", "tenth_social_science", "tenth_total_marks"
-                ]):
-                    row[key] = t10[i]
-
-            # twelfth_mark
-            cursor.execute("""
-                SELECT school_name, year_of_passing, board_of_study,
-                       english, tamil, physics, chemistry, maths, biology,
-                       computer_science, total_marks
-                FROM twelfth_mark WHERE student_no = %s
-            """, (student_no,))
-            t12 = cursor.fetchone()
-            if t12:
-                for i, key in enumerate([
-                    "twelfth_school_name", "twelfth_year_of_passing", "twelfth_board_of_study",
-                    "twelfth_english", "twelfth_tamil", "twelfth_physics", "twelfth_chemistry",
-                    "twelfth_maths", "twelfth_biology", "twelfth_computer_science", "twelfth_total_marks"
-                ]):
-                    row[key] = t12[i]
-
-            # entrance_exams
-            cursor.execute("""
-                SELECT entrance_exam_1, entrance_exam_1_percentile, entrance_exam_1_mark,
-                       entrance_exam_2, entrance_exam_2_percentile, entrance_exam_2_mark,
-                       entrance_exam_3, entrance_exam_3_percentile, entrance_exam_3_mark
-                FROM entrance_exams WHERE student_no = %s
-            """, (student_no,))
-            en = cursor.fetchone()
-            if en:
-                for i, key in enumerate([
-                    "entrance_exam_1", "entrance_exam_1_percentile", "entrance_exam_1_mark",
-                    "entrance_exam_2", "entrance_exam_2_percentile", "entrance_exam_2_mark",
-                    "entrance_exam_3", "entrance_exam_3_percentile", "entrance_exam_3_mark"
-                ]):
-                    row[key] = en[i]
-
-            # counselling_detail
-            cursor.execute("""
-                SELECT counselling_forum_1, counselling_round_1, all_india_rank_1, community_rank_1, counselling_college_1,
-                       counselling_forum_2, counselling_round_2, all_india_rank_2, community_rank_2, counselling_college_2,
-                       counselling_forum_3, counselling_round_3, all_india_rank_3, community_rank_3, counselling_college_3
-                FROM counselling_detail WHERE student_no = %s
-            """, (student_no,))
-            co = cursor.fetchone()
-            if co:
-                for i, key in enumerate([
-                    "counselling_forum_1", "counselling_round_1", "all_india_rank_1", "community_rank_1", "counselling_college_1",
-                    "counselling_forum_2", "counselling_round_2", "all_india_rank_2", "community_rank_2", "counselling_college_2",
-                    "counselling_forum_3", "counselling_round_3", "all_india_rank_3", "community_rank_3", "counselling_college_3"
-                ]):
-                    row[key] = co[i]
-
-            rows_data.append(row)
+        # Complete data of every student in one query
+        rows_data = fetch_student_details(cursor, [student_no for student_no, _ in student_rows])
 
         # Build Excel workbook
         wb = openpyxl.Workbook()
@@ -1589,8 +1794,12 @@ async def bulk_update_students(
         if "student_name" not in df.columns:
             raise HTTPException(status_code=400, detail="Missing mandatory column: 'student_name'")
 
-        # Replace NaN with None
-        df = df.replace({np.nan: None})
+        # Skip completely empty rows
+        blank_id = df["student_id"].fillna("").astype(str).str.strip() == ""
+        skipped_count = int(blank_id.sum())
+
+        # Validate and coerce the whole sheet column by column
+        validated, validation_errors = validate_student_frame(df[~blank_id], STUDENT_IMPORT_FIELD_MAP)
 
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -1600,138 +1809,52 @@ async def bulk_update_students(
         if not cursor.fetchone():
             raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
 
-        # Figure out which editable columns are present in the uploaded file
-        present_fields = {}
-        for col in df.columns:
-            if col in BULK_EDIT_FIELD_MAP:
-                present_fields[col] = BULK_EDIT_FIELD_MAP[col]
-
-        success_count = 0
-        skipped_count = 0
-        error_count = 0
-        errors = []
-
-        for idx, excel_row in df.iterrows():
-            row_num = idx + 2  # Excel row (1-based header + 1)
-            sid = excel_row.get("student_id")
-            sname = excel_row.get("student_name")
-
-            # Skip completely empty rows
-            if not sid or str(sid).strip() == "":
-                skipped_count += 1
-                continue
-
-            sid = str(sid).strip()
-            # Remove trailing .0 from IDs read as floats
-            if sid.endswith('.0') and sid[:-2].replace('-', '', 1).isdigit():
-                sid = sid[:-2]
+        # Resolve every admission number in the sheet to its student_no in one query
+        cursor.execute(
+            """
+            SELECT DISTINCT ON (student_id) student_id, student_no
+            FROM student
+            WHERE batch_id = %s AND student_id = ANY(%s)
+            ORDER BY student_id, created_at DESC, student_no DESC
+            """,
+            (batch_id, validated["student_id"].dropna().unique().tolist())
+        )
+        validated["student_no"] = validated["student_id"].map(dict(cursor.fetchall()))
+
+        rejected = validated["row_num"].isin(validation_errors.loc[validation_errors["fatal"], "row"])
+        not_found = ~rejected & validated["student_no"].isna()
+        updatable = validated[~rejected & ~not_found].astype({"student_no": "int64"})
+
+        success_count = len(updatable)
+        error_count = int(rejected.sum() + not_found.sum())
+        # Rows updated with unreadable cells skipped are reported as warnings
+        warning_rows = validation_errors.loc[~validation_errors["fatal"], "row"]
+        warning_count = int(warning_rows[warning_rows.isin(updatable["row_num"])].nunique())
+        errors = error_records(validation_errors) + [
+            {"row": int(row_num), "student_id": sid, "error": "Student not found in this batch"}
+            for row_num, sid in validated.loc[not_found, ["row_num", "student_id"]].itertuples(index=False)
+        ]
+        errors.sort(key=lambda e: e["row"])
 
-            # Validate student_name is present
-            if not sname or str(sname).strip() == "":
-                errors.append({"row": row_num, "student_id": sid, "error": "student_name is empty (mandatory)"})
-                error_count += 1
+        # Apply one set-based statement per target table
+        present_columns = [col for col in validated.columns if col in BULK_EDIT_FIELD_MAP]
+        for table in dict.fromkeys(table for table, _, _ in BULK_EDIT_FIELD_MAP.values()):
+            excel_cols = [col for col in present_columns if BULK_EDIT_FIELD_MAP[col][0] == table]
+            if not excel_cols:
                 continue
 
-            # Check student exists and belongs to this batch
-            cursor.execute(
-                """
-                SELECT student_no
-                FROM student
-                WHERE student_id = %s AND batch_id = %s
-                ORDER BY created_at DESC, student_no DESC
-                LIMIT 1
-                """,
-                (sid, batch_id)
+            # Blank cells are NA; later rows win per cell, as if the sheet were applied top to bottom
+            table_frame = (
+                updatable[["student_no"] + excel_cols]
+                .groupby("student_no", sort=False)
+                .last()
+                .dropna(how="all")
             )
-            student_row = cursor.fetchone()
-            if not student_row:
-                errors.append({"row": row_num, "student_id": sid, "error": "Student not found in this batch"})
-                error_count += 1
+            if table_frame.empty:
                 continue
-            student_no = student_row[0]
 
-            try:
-                # Group updates by table
-                table_updates = {}  # table_name -> {db_col: value}
-                for excel_col, (table, db_col, col_type) in present_fields.items():
-                    raw = excel_row.get(excel_col)
-                    if raw is None or str(raw).strip() == "":
-                        continue  # skip blank cells
-
-                    val = str(raw).strip()
-                    # Remove trailing .0 from numeric strings
-                    if val.endswith('.0') and val[:-2].replace('-', '', 1).isdigit():
-                        val = val[:-2]
-
-                    # Type coercion
-                    if col_type == "int":
-                        try:
-                            val = int(float(val))
-                        except (ValueError, TypeError):
-                            errors.append({"row": row_num, "student_id": sid, "error": f"{excel_col}: expected a number, got '{val}'"})
-                            continue
-                    elif col_type == "float":
-                        try:
-                            val = float(val)
-                        except (ValueError, TypeError):
-                            errors.append({"row": row_num, "student_id": sid, "error": f"{excel_col}: expected a decimal number, got '{val}'"})
-                            continue
-                    elif col_type == "date":
-                        try:
-                            # Try multiple date formats
-                            for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%m/%d/%Y"):
-                                try:
-                                    val = datetime.strptime(val, fmt).date()
-                                    break
-                                except ValueError:
-                                    continue
-                            else:
-                                raise ValueError(f"Unrecognized date: {val}")
-                        except Exception:
-                            errors.append({"row": row_num, "student_id": sid, "error": f"{excel_col}: invalid date '{raw}'"})
-                            continue
-
-                    if table not in table_updates:
-                        table_updates[table] = {}
-                    table_updates[table][db_col] = val
-
-                # Also update student_name in student table (it's mandatory and always present)
-                name_val = str(sname).strip()
-                if "student" not in table_updates:
-                    table_updates["student"] = {}
-                table_updates["student"]["student_name"] = name_val
-
-                # Apply updates per table
-                for table, fields in table_updates.items():
-                    if not fields:
-                        continue
-
-                    if table == "student":
-                        set_clause = ", ".join([f"{k} = %s" for k in fields.keys()])
-                        query = f"UPDATE student SET {set_clause} WHERE student_no = %s"
-                        cursor.execute(query, list(fields.values()) + [student_no])
-                    else:
-                        # For related tables use UPSERT: update if exists, insert if not
-                        cursor.execute(
-                            f"SELECT student_no FROM {table} WHERE student_no = %s", (student_no,)
-                        )
-                        exists = cursor.fetchone()
-
-                        if exists:
-                            set_clause = ", ".join([f"{k} = %s" for k in fields.keys()])
-                            query = f"UPDATE {table} SET {set_clause} WHERE student_no = %s"
-                            cursor.execute(query, list(fields.values()) + [student_no])
-                        else:
-                            columns = ["student_no"] + list(fields.keys())
-                            placeholders = ", ".join(["%s"] * len(columns))
-                            query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
-                            cursor.execute(query, [student_no] + list(fields.values()))
-
-                success_count += 1
-
-            except Exception as row_err:
-                errors.append({"row": row_num, "student_id": sid, "error": str(row_err)})
-                error_count += 1
+            columns = [BULK_EDIT_FIELD_MAP[col][1] for col in excel_cols]
+            apply_bulk_table_updates(cursor, table, columns, frame_to_rows(table_frame.reset_index()))
 
         conn.commit()
 
@@ -1740,6 +1863,7 @@ async def bulk_update_students(
             "success_count": success_count,
             "skipped_count": skipped_count,
             "error_count": error_count,
+            "warning_count": warning_count,
             "errors": errors[:50]  # limit to first 50 errors
         }
 
@@ -0,0 +1,114 @@
+"""
+Benchmark: serialization time of the subjectwise analysis payload for a
+500-student batch, stdlib JSON (jsonable_encoder + json.dumps, FastAPI's
+default path) vs FastJSONResponse (orjson), and size / parse time of the
+nested vs ?format=columnar payload.
+
+Run from the backend directory against a NON-production database
+(everything is rolled back):
+
+    python -m benchmarks.analytics_serialization
+    python -m benchmarks.analytics_serialization --students 1000 --tests 40 --runs 20
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from db_pool import get_db_connection
+from api.analysis import subjectwise_payload
+from api.responses import FastJSONResponse
+
+SUBJECTS = ["Maths", "Physics", "Chemistry", "Biology"]
+
+
+def seed_batch(cursor, students: int, tests_per_subject: int) -> int:
+    cursor.execute("""
+        INSERT INTO batch (batch_name, start_year, end_year, type)
+        VALUES ('Serialization benchmark', 2024, 2026, 'benchmark')
+        RETURNING batch_id
+    """)
+    batch_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO student (student_id, batch_id, student_name, grade)
+        SELECT 'SB2024' || LPAD(n::TEXT, 5, '0'), %s, 'Student ' || n, '12'
+        FROM generate_series(1, %s) AS n
+    """, (batch_id, students))
+    cursor.execute("""
+        INSERT INTO exam (batch_id, exam_type, test_date, subject, unit_name, unit_key,
+                          subject_total_marks, test_total_marks)
+        SELECT %s, 'daily', DATE '2024-06-03' + t * 7, subj, 'Unit ' || t, 'Unit ' || t, 100, 100
+        FROM generate_series(1, %s) AS t, unnest(%s::TEXT[]) AS subj
+    """, (batch_id, tests_per_subject, SUBJECTS))
+    cursor.execute("""
+        INSERT INTO daily_test (student_no, exam_id, grade, test_date, subject, unit_name,
+                                total_marks, subject_total_marks, test_total_marks)
+        SELECT s.student_no, e.exam_id, 12, e.test_date, e.subject, e.unit_name,
+               (30 + (s.student_no * 7 + e.exam_id * 13) %% 70)::TEXT, 100, 100
+        FROM student s
+        CROSS JOIN exam e
+        WHERE s.batch_id = %s AND e.batch_id = %s
+    """, (batch_id, batch_id))
+    cursor.execute("ANALYZE student")
+    cursor.execute("ANALYZE daily_test")
+    return batch_id
+
+
+def median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure subjectwise payload serialization time")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tests", type=int, default=25, help="Unit tests per subject")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        print(f"Seeding {args.students} students x {args.tests * len(SUBJECTS)} unit tests...")
+        batch_id = seed_batch(cursor, args.students, args.tests)
+
+        started = time.perf_counter()
+        payload = subjectwise_payload(cursor, batch_id=batch_id)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        stdlib_ms = median_ms(lambda: JSONResponse(jsonable_encoder(payload)), args.runs)
+        orjson_ms = median_ms(lambda: FastJSONResponse(payload), args.runs)
+        size_kb = len(FastJSONResponse(payload).body) / 1024
+
+        print(f"\nPayload: {payload['total_students']} students, {size_kb:,.0f} KB "
+              f"(query + build {build_ms:.0f} ms)")
+        print(f"Median of {args.runs} runs (ms)")
+        print(f"{'jsonable_encoder + json':<26}{stdlib_ms:>10.1f}")
+        print(f"{'orjson':<26}{orjson_ms:>10.1f}")
+        print(f"{'speed-up':<26}{stdlib_ms / orjson_ms:>9.1f}x")
+
+        columnar = subjectwise_payload(cursor, batch_id=batch_id, columnar=True)
+        nested_body = FastJSONResponse(payload).body
+        columnar_body = FastJSONResponse(columnar).body
+        # json.loads stands in for the client's JSON.parse
+        nested_parse_ms = median_ms(lambda: json.loads(nested_body), args.runs)
+        columnar_parse_ms = median_ms(lambda: json.loads(columnar_body), args.runs)
+
+        print(f"\n{'format':<26}{'KB':>10}{'parse ms':>10}")
+        print(f"{'nested':<26}{len(nested_body) / 1024:>10,.0f}{nested_parse_ms:>10.1f}")
+        print(f"{'columnar':<26}{len(columnar_body) / 1024:>10,.0f}{columnar_parse_ms:>10.1f}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: planning time and round-trip latency of the individual analysis
+statements run as plain queries vs server-side prepared statements.
+
+Seeds a 500-student batch (unit tests and monthly tests), then for one
+student compares the Planning Time reported by EXPLAIN ANALYZE for the
+plain statement and for EXECUTE of the prepared one, after enough
+executions for Postgres to settle on a generic or custom plan.
+Run from the backend directory against a NON-production database
+(everything is rolled back):
+
+    python -m benchmarks.prepared_statements
+    python -m benchmarks.prepared_statements --students 1000 --tests 40 --runs 50
+"""
+
+import argparse
+import statistics
+import time
+
+from db_pool import get_db_connection, prepared_statement_stats
+from api.analysis import (
+    INDIVIDUAL_DAILY_CLASS_STATS,
+    INDIVIDUAL_DAILY_TESTS,
+    INDIVIDUAL_MOCK_CLASS_STATS,
+    INDIVIDUAL_MOCK_REPORT_BAND,
+    INDIVIDUAL_MOCK_TESTS,
+    INDIVIDUAL_STUDENT_INFO,
+)
+from benchmarks.analytics_serialization import median_ms, seed_batch
+
+# Postgres plans the first five executions of a prepared statement with
+# custom plans before it considers switching to a generic one
+WARMUP_EXECUTIONS = 6
+
+MOCK_SUBJECTS = ["maths", "physics", "chemistry", "biology"]
+
+
+def seed_mock_tests(cursor, batch_id: int, tests: int):
+    cursor.execute("""
+        INSERT INTO mock_test (student_no, grade, test_date, test_total_marks, total_marks)
+        SELECT s.student_no, 12, DATE '2024-06-08' + t * 14, 400,
+               (150 + (s.student_no * 11 + t * 17) %% 250)::TEXT
+        FROM student s, generate_series(1, %s) AS t
+        WHERE s.batch_id = %s
+    """, (tests, batch_id))
+    cursor.execute("""
+        INSERT INTO mock_test_subject_mark (test_id, test_date, subject_key, marks, total_marks, unit_names)
+        SELECT mt.test_id, mt.test_date, subj, (30 + (mt.test_id * 7) %% 70)::TEXT, 100, ARRAY['Unit 1']
+        FROM mock_test mt
+        JOIN student s ON s.student_no = mt.student_no
+        CROSS JOIN unnest(%s::TEXT[]) AS subj
+        WHERE s.batch_id = %s
+    """, (MOCK_SUBJECTS, batch_id))
+    cursor.execute("ANALYZE mock_test")
+    cursor.execute("ANALYZE mock_test_subject_mark")
+
+
+def planning_ms(cursor, sql: str, params, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        cursor.execute("EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) " + sql, params)
+        timings.append(cursor.fetchone()[0][0]["Planning Time"])
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure planning time saved by prepared statements")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tests", type=int, default=25, help="Unit tests per subject and monthly tests")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        print(f"Seeding {args.students} students x {args.tests} tests...")
+        batch_id = seed_batch(cursor, args.students, args.tests)
+        seed_mock_tests(cursor, batch_id, args.tests)
+        cursor.execute("SELECT MIN(student_no) FROM student WHERE batch_id = %s", (batch_id,))
+        student_no = cursor.fetchone()[0]
+
+        statements = [
+            (INDIVIDUAL_STUDENT_INFO, (student_no,)),
+            (INDIVIDUAL_DAILY_TESTS, (student_no,)),
+            (INDIVIDUAL_DAILY_CLASS_STATS, (student_no, batch_id)),
+            (INDIVIDUAL_MOCK_TESTS, (student_no,)),
+            (INDIVIDUAL_MOCK_CLASS_STATS, (student_no, batch_id)),
+            (INDIVIDUAL_MOCK_REPORT_BAND, (student_no, batch_id)),
+        ]
+
+        print(f"\nMedian of {args.runs} runs (ms)")
+        print(f"{'statement':<30}{'plan':>8}{'plan prep':>11}{'query':>8}{'query prep':>12}")
+        totals = [0.0, 0.0, 0.0, 0.0]
+        for statement, params in statements:
+            for _ in range(WARMUP_EXECUTIONS):
+                statement.execute(cursor, params)
+                cursor.fetchall()
+
+            def plain():
+                cursor.execute(statement.sql, params)
+                cursor.fetchall()
+
+            def prepared():
+                statement.execute(cursor, params)
+                cursor.fetchall()
+
+            row = [
+                planning_ms(cursor, statement.sql, params, args.runs),
+                planning_ms(cursor, statement.execute_sql, params, args.runs),
+                median_ms(plain, args.runs),
+                median_ms(prepared, args.runs),
+            ]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f"{statement.name:<30}{row[0]:>8.2f}{row[1]:>11.2f}{row[2]:>8.2f}{row[3]:>12.2f}")
+        print(f"{'total':<30}{totals[0]:>8.2f}{totals[1]:>11.2f}{totals[2]:>8.2f}{totals[3]:>12.2f}")
+
+        print(f"\n{'statement':<30}{'prepares':>10}{'executions':>12}{'hits':>8}")
+        for stats in prepared_statement_stats():
+            if stats["executions"]:
+                print(f"{stats['name']:<30}{stats['prepares']:>10}{stats['executions']:>12}{stats['hits']:>8}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: response size and latency of representative JSON payloads with
+no compression, gzip and brotli (when the brotli module is installed).
+
+Seeds a 500-student batch (unit tests + one achievement per student),
+requests each endpoint through the full app and removes the batch again.
+Run from the backend directory against a NON-production database:
+
+    python -m benchmarks.response_compression
+    python -m benchmarks.response_compression --mbps 5 --runs 20
+
+Latency is the in-process response time plus the transfer time of the
+response body at --mbps, which approximates a client on a slow link.
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+from db_pool import get_db_connection
+from api.compression import brotli
+from api.middleware import create_access_token
+from benchmarks.analytics_serialization import seed_batch
+from server import app
+
+ENDPOINTS = [
+    "/api/analysis/subjectwise?batch_id={batch_id}",
+    "/api/exam/batch-report/{batch_id}",
+    "/api/achiever",
+]
+
+
+def seed(students: int, tests_per_subject: int) -> int:
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        batch_id = seed_batch(cursor, students, tests_per_subject)
+        cursor.execute("""
+            INSERT INTO achievers (student_no, batch_id, achievement, achievement_details, rank, score)
+            SELECT student_no, batch_id, 'NEET qualified', 'Cleared NEET with a state rank', 'State ' || student_no, 650
+            FROM student WHERE batch_id = %s
+        """, (batch_id,))
+        conn.commit()
+        return batch_id
+    finally:
+        conn.close()
+
+
+def remove(batch_id: int):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM student WHERE batch_id = %s", (batch_id,))
+        cursor.execute("DELETE FROM batch WHERE batch_id = %s", (batch_id,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def measure(client, url: str, encoding: str, runs: int):
+    """Median response time (ms) and wire size (bytes) for one Accept-Encoding"""
+    timings = []
+    size = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(url, headers={"Accept-Encoding": encoding})
+        timings.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        size = len(response.content) if encoding == "identity" else int(response.headers.get("content-length", 0))
+    return statistics.median(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure response compression savings")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--tests", type=int, default=25, help="Unit tests per subject")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--mbps", type=float, default=10.0, help="Client link speed for the latency estimate")
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+    token = create_access_token({"sub": "benchmark", "username": "benchmark", "role": "Admin"})
+    # The test client transparently decodes bodies, so the wire size is taken
+    # from Content-Length, which the middleware sets on compressed responses
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    print(f"Seeding {args.students} students x {args.tests * 4} unit tests...")
+    batch_id = seed(args.students, args.tests)
+    try:
+        print(f"\nMedian of {args.runs} runs; latency includes transfer at {args.mbps:g} Mbit/s")
+        print(f"{'endpoint':<40}{'encoding':>10}{'bytes':>12}{'server ms':>11}{'total ms':>10}")
+        for template in ENDPOINTS:
+            url = template.format(batch_id=batch_id)
+            for encoding in encodings:
+                server_ms, size = measure(client, url, encoding, args.runs)
+                transfer_ms = size * 8 / (args.mbps * 1000)
+                print(f"{template.split('?')[0]:<40}{encoding:>10}{size:>12,}{server_ms:>11.1f}{server_ms + transfer_ms:>10.1f}")
+        if brotli is None:
+            print("\n(brotli module not installed; only gzip was measured)")
+    finally:
+        remove(batch_id)
+
+
+if __name__ == "__main__":
+    main()
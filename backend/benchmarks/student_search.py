@@ -0,0 +1,91 @@
+"""
+Benchmark: student search latency on 100k students, with and without the
+trigram indexes.
+
+Run from the backend directory against a NON-production database
+(the student table is locked while it runs; everything is rolled back):
+
+    python -m benchmarks.student_search
+    python -m benchmarks.student_search --students 200000 --runs 20
+"""
+
+import argparse
+import statistics
+import time
+
+from db_pool import get_db_connection
+from api.student import search_students
+
+FIRST_NAMES = ["Aarav", "Vihaan", "Arjun", "Sai", "Reyansh", "Ishaan", "Krishna", "Ananya",
+               "Diya", "Saanvi", "Kavya", "Meera", "Priya", "Lakshmi", "Harini", "Divya"]
+LAST_NAMES = ["Kumar", "Sharma", "Reddy", "Iyer", "Nair", "Pillai", "Menon", "Raman",
+              "Krishnan", "Subramanian", "Venkatesh", "Balaji", "Murugan", "Sundaram"]
+
+# (label, query, include_names)
+QUERIES = [
+    ("admission no substring", "4821", False),
+    ("exact admission no", "GR2024050000", False),
+    ("name substring", "Subraman", True),
+    ("misspelt name", "Lakshmi Krishnen", True),
+]
+
+
+def seed_students(cursor, count: int) -> int:
+    cursor.execute("""
+        INSERT INTO batch (batch_name, start_year, end_year, type)
+        VALUES ('Search benchmark', 2024, 2026, 'benchmark')
+        RETURNING batch_id
+    """)
+    batch_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO student (student_id, batch_id, student_name)
+        SELECT
+            'GR2024' || LPAD(n::TEXT, 6, '0'),
+            %s,
+            (%s::TEXT[])[1 + n %% array_length(%s::TEXT[], 1)] || ' ' ||
+            (%s::TEXT[])[1 + (n / 7) %% array_length(%s::TEXT[], 1)] || ' ' || n
+        FROM generate_series(1, %s) AS n
+    """, (batch_id, FIRST_NAMES, FIRST_NAMES, LAST_NAMES, LAST_NAMES, count))
+    cursor.execute("ANALYZE student")
+    return batch_id
+
+
+def time_queries(cursor, runs: int) -> dict:
+    results = {}
+    for label, query_text, include_names in QUERIES:
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            search_students(cursor, query_text, 20, include_names=include_names)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure student search latency")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        print(f"Seeding {args.students} students...")
+        seed_students(cursor, args.students)
+
+        indexed = time_queries(cursor, args.runs)
+        cursor.execute("DROP INDEX IF EXISTS idx_student_id_trgm, idx_student_name_trgm")
+        unindexed = time_queries(cursor, args.runs)
+
+        print(f"\nMedian of {args.runs} runs, {args.students} students (ms)")
+        print(f"{'query':<26}{'trigram index':>15}{'no index':>12}")
+        for label, _, _ in QUERIES:
+            print(f"{label:<26}{indexed[label]:>15.1f}{unindexed[label]:>12.1f}")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
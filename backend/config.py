@@ -47,6 +47,27 @@ else:
 # ── Database Connection Pool ──
 DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
 DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Run registered hot queries as server-side prepared statements; turn off
+# behind a transaction-pooling proxy that cannot keep them per session
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "true").lower() in ("true", "1", "yes")
+
+# ── Query Instrumentation ──
+# Statements slower than SLOW_QUERY_MS are logged with their parameter types;
+# SLOW_QUERY_EXPLAIN=true also logs EXPLAIN (ANALYZE, BUFFERS) of slow SELECTs,
+# which runs them a second time
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() in ("true", "1", "yes")
+
+# ── Metrics ──
+# Prometheus text format at GET /metrics; under gunicorn also set
+# PROMETHEUS_MULTIPROC_DIR so the endpoint reports every worker
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+
+# ── Request Profiling ──
+# Admin requests with an X-Profile header are profiled and saved to
+# PROFILE_DIR (see api/profiling.py); nothing is installed when disabled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("true", "1", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(Path(__file__).resolve().parent / "profiles"))
 
 # ── Server Configuration ──
 SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
@@ -67,6 +88,16 @@ def _normalize_origin(origin: str) -> str:
 
 CORS_ORIGINS = [_normalize_origin(origin) for origin in _cors_origins.split(",") if origin.strip()]
 
+# ── Response Compression ──
+# Responses smaller than COMPRESSION_MIN_SIZE bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# ── Batch Deletion ──
+# Students deleted per transaction by the background batch deletion job
+BATCH_DELETE_CHUNK_SIZE = int(os.getenv("BATCH_DELETE_CHUNK_SIZE", "200"))
+
 # ── JWT Configuration ──
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -76,3 +107,4 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 # ── App Configuration ──
 APP_TITLE = os.getenv("APP_TITLE", "GRAAVITONS SMS API")
 DEBUG = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
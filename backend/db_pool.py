@@ -10,23 +10,245 @@ Usage in API modules:
         ...
     finally:
         conn.close()   # returns the connection to the pool (not actually closed)
+
+Hot statements with expensive plans can be registered once at import time
+and run as server-side prepared statements:
+
+    CLASS_STATS = prepared_statement("class_stats", "SELECT ... WHERE s.batch_id = %s")
+    CLASS_STATS.execute(cursor, (batch_id,))
+
+Cursors handed out by PooledConnection time every statement. The time and
+count add up in the QueryStats bound to the current request (see
+api/instrumentation.py), and statements slower than SLOW_QUERY_MS are
+logged to the "graavitons.db" logger.
+
+Pool utilisation (checked-out connections, checkout time, exhaustion,
+connections opened, failed health checks) is exported through metrics.py.
 """
 
 import atexit
+import contextvars
+import json
+import logging
+import re
+import threading
+import time
+import weakref
+from typing import Optional
+
 import psycopg2
-from psycopg2.pool import ThreadedConnectionPool
+import psycopg2.extensions
+from psycopg2.sql import Composable
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from fastapi import HTTPException, status
-from config import DB_CONFIG, DB_POOL_MIN, DB_POOL_MAX
+from config import (
+    DB_CONFIG, DB_POOL_MIN, DB_POOL_MAX, DB_PREPARED_STATEMENTS,
+    SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN,
+)
+from metrics import (
+    DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_CONNECTIONS_CREATED,
+    DB_POOL_EXHAUSTED, DB_POOL_HEALTH_CHECK_FAILURES, DB_POOL_MAX_CONNECTIONS,
+    PREPARED_STATEMENT_EXECUTIONS, PREPARED_STATEMENT_PREPARES,
+)
+
+logger = logging.getLogger("graavitons.db")
+
+class CountingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that counts the physical connections it opens."""
+
+    def _connect(self, key=None):
+        conn = super()._connect(key)
+        DB_POOL_CONNECTIONS_CREATED.inc()
+        return conn
+
 
 # ── Initialise the pool at module load time ──
 try:
-    pool = ThreadedConnectionPool(
+    pool = CountingConnectionPool(
         minconn=DB_POOL_MIN,
         maxconn=DB_POOL_MAX,
         **DB_CONFIG,
     )
 except Exception as e:
     raise RuntimeError(f"Failed to create database connection pool: {e}")
+DB_POOL_MAX_CONNECTIONS.set(DB_POOL_MAX)
+
+
+# What DISCARD ALL (psycopg2's connection.reset()) does, minus DEALLOCATE ALL
+# and DISCARD PLANS, so prepared statements outlive a trip through the pool
+SESSION_RESET_SQL = """
+    CLOSE ALL;
+    SET SESSION AUTHORIZATION DEFAULT;
+    RESET ALL;
+    UNLISTEN *;
+    SELECT pg_advisory_unlock_all();
+    DISCARD TEMP;
+    DISCARD SEQUENCES;
+"""
+
+
+def reset_session(conn):
+    """Roll back and clear session state before the connection goes back to the pool."""
+    conn.rollback()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SESSION_RESET_SQL)
+    finally:
+        conn.autocommit = False
+
+
+# ── Query instrumentation ──
+class QueryStats:
+    """
+    Statement count and database time of one request. Setting statements
+    to a list (as the profiling middleware does) also keeps a record of
+    every statement.
+    """
+
+    __slots__ = ("request", "count", "seconds", "statements")
+
+    def __init__(self, request: str = ""):
+        self.request = request
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = None
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+
+    @property
+    def milliseconds(self) -> float:
+        return round(self.seconds * 1000, 2)
+
+
+_query_stats: contextvars.ContextVar = contextvars.ContextVar("query_stats", default=None)
+
+
+def bind_query_stats(stats: QueryStats) -> contextvars.Token:
+    """Collect the statements run in the current context into stats; pass the token to unbind_query_stats."""
+    return _query_stats.set(stats)
+
+
+def unbind_query_stats(token: contextvars.Token):
+    _query_stats.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+def statement_text(cursor, query) -> str:
+    if isinstance(query, Composable):
+        query = query.as_string(cursor)
+    if isinstance(query, bytes):
+        query = query.decode(errors="replace")
+    return " ".join(str(query).split())
+
+
+def params_shape(params):
+    """Types (and lengths of sequences) of the parameters, never their values."""
+    def shape(value):
+        if isinstance(value, (list, tuple)):
+            return f"{type(value).__name__}[{len(value)}]"
+        return type(value).__name__
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: shape(value) for key, value in params.items()}
+    return [shape(value) for value in params]
+
+
+def is_read_only(text: str) -> bool:
+    """SELECTs (and EXECUTEs of registered SELECTs) are safe to run again under EXPLAIN ANALYZE."""
+    match = re.match(r"EXECUTE\s+(\w+)", text, re.IGNORECASE)
+    if match:
+        statement = _statements.get(match.group(1))
+        if statement is None:
+            return False
+        text = statement_text(None, statement.sql)
+    return (
+        re.match(r"(SELECT|WITH)\b", text, re.IGNORECASE) is not None
+        and re.search(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", text, re.IGNORECASE) is None
+    )
+
+
+def explain_analyze(cursor) -> Optional[str]:
+    """EXPLAIN (ANALYZE, BUFFERS) of the statement the cursor just ran, inside a savepoint."""
+    conn = cursor.connection
+    in_transaction = not conn.autocommit
+    with conn.cursor() as explain_cursor:
+        try:
+            if in_transaction:
+                explain_cursor.execute("SAVEPOINT slow_query_explain")
+            explain_cursor.execute(b"EXPLAIN (ANALYZE, BUFFERS) " + cursor.query)
+            plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+            if in_transaction:
+                explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except psycopg2.Error as e:
+            if in_transaction:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f"EXPLAIN failed: {e}"
+
+
+def statement_record(cursor, query, params, seconds: float, succeeded: bool) -> dict:
+    return {
+        "duration_ms": round(seconds * 1000, 2),
+        "rows": cursor.rowcount,
+        "statement": statement_text(cursor, query)[:2000],
+        "params": params_shape(params),
+        "failed": not succeeded,
+    }
+
+
+def log_slow_query(cursor, query, params, seconds: float, succeeded: bool):
+    stats = _query_stats.get()
+    record = {
+        "event": "slow_query",
+        "request": stats.request if stats else None,
+        **statement_record(cursor, query, params, seconds, succeeded),
+    }
+    if SLOW_QUERY_EXPLAIN and succeeded and cursor.query and is_read_only(statement_text(cursor, query)):
+        record["plan"] = explain_analyze(cursor)
+    logger.warning(json.dumps(record, default=str))
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor that adds each statement's time to the request's QueryStats and logs slow ones."""
+
+    def _timed(self, run, query, params):
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            result = run()
+            succeeded = True
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            stats = _query_stats.get()
+            if stats is not None:
+                stats.record(seconds)
+                if stats.statements is not None:
+                    stats.statements.append(statement_record(self, query, params, seconds, succeeded))
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                log_slow_query(self, query, params, seconds, succeeded)
+
+    def execute(self, query, vars=None):
+        return self._timed(lambda: super(InstrumentedCursor, self).execute(query, vars), query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        return self._timed(
+            lambda: super(InstrumentedCursor, self).executemany(query, vars_list),
+            query,
+            vars_list[0] if vars_list else None,
+        )
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(lambda: super(InstrumentedCursor, self).copy_expert(sql, file, size), sql, None)
 
 
 class PooledConnection:
@@ -45,13 +267,19 @@ class PooledConnection:
     def __getattr__(self, name):
         return getattr(self._conn, name)
 
+    def cursor(self, *args, **kwargs):
+        """Cursors are InstrumentedCursors unless a cursor_factory is given."""
+        kwargs.setdefault("cursor_factory", InstrumentedCursor)
+        return self._conn.cursor(*args, **kwargs)
+
     def close(self):
         """Return connection to pool instead of closing."""
         if not self._returned:
             self._returned = True
+            DB_POOL_CHECKED_OUT.dec()
             try:
                 if not self._conn.closed:
-                    self._conn.reset()
+                    reset_session(self._conn)
                 self._pool.putconn(self._conn)
             except Exception:
                 self._pool.putconn(self._conn, close=True)
@@ -70,11 +298,21 @@ def get_db_connection():
     Get a connection from the pool wrapped in PooledConnection.
     Calling conn.close() returns it to the pool.
     """
+    with DB_POOL_CHECKOUT_SECONDS.time():
+        conn = _checkout()
+    DB_POOL_CHECKED_OUT.inc()
+    return conn
+
+
+def _checkout():
+    """Check out and health-check a pooled connection (get_db_connection minus the timing)."""
     # Retry once with a fresh connection if the pooled one is stale.
     for attempt in range(2):
         try:
             raw = pool.getconn()
         except Exception as e:
+            if isinstance(e, PoolError):
+                DB_POOL_EXHAUSTED.inc()
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail=f"Database connection pool exhausted or unavailable: {e}",
@@ -83,6 +321,7 @@ def get_db_connection():
         try:
             # If Postgres already marked this connection closed, discard it.
             if raw.closed:
+                DB_POOL_HEALTH_CHECK_FAILURES.labels("closed").inc()
                 pool.putconn(raw, close=True)
                 if attempt == 0:
                     continue
@@ -99,6 +338,7 @@ def get_db_connection():
 
         except (psycopg2.OperationalError, psycopg2.InterfaceError):
             # Drop broken connection and retry once with a new one.
+            DB_POOL_HEALTH_CHECK_FAILURES.labels("error").inc()
             try:
                 pool.putconn(raw, close=True)
             except Exception:
@@ -113,6 +353,91 @@ def get_db_connection():
             )
 
 
+# ── Server-side prepared statements ──
+# Statement names already PREPAREd on each physical connection; entries go
+# away with the connection when the pool discards it
+_prepared_on = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+_statements = {}
+
+
+class PreparedStatement:
+    """
+    A statement PREPAREd on a pooled connection the first time that
+    connection runs it and EXECUTEd by name afterwards, so Postgres skips
+    parsing and, once it settles on a generic plan, planning too.
+
+    sql uses psycopg2 %s placeholders. Postgres infers the parameter types
+    at PREPARE time, so a placeholder whose type it cannot infer from the
+    surrounding expression needs a cast (%s::date).
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.prepares = 0
+        self.executions = 0
+
+        # %s -> $1, $2, ... and %% -> %, as psycopg2 would have rendered them
+        param_count = 0
+
+        def to_server_placeholder(match):
+            nonlocal param_count
+            if match.group() == "%%":
+                return "%"
+            param_count += 1
+            return f"${param_count}"
+
+        self.server_sql = re.sub(r"%[s%]", to_server_placeholder, sql)
+        self.execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * param_count)})" if param_count else f"EXECUTE {name}"
+
+    def execute(self, cursor, params=()):
+        if not DB_PREPARED_STATEMENTS:
+            cursor.execute(self.sql, params)
+            return
+
+        conn = cursor.connection
+        with _prepared_lock:
+            prepared = _prepared_on.setdefault(conn, set())
+        is_new = self.name not in prepared
+        if is_new:
+            cursor.execute(f"PREPARE {self.name} AS {self.server_sql}")
+            prepared.add(self.name)
+        cursor.execute(self.execute_sql, params)
+
+        with _prepared_lock:
+            self.executions += 1
+            if is_new:
+                self.prepares += 1
+        PREPARED_STATEMENT_EXECUTIONS.labels(self.name).inc()
+        if is_new:
+            PREPARED_STATEMENT_PREPARES.labels(self.name).inc()
+
+
+def prepared_statement(name: str, sql: str) -> PreparedStatement:
+    """Register a statement under a unique name; call once at module import."""
+    statement = _statements.get(name)
+    if statement is None:
+        statement = _statements[name] = PreparedStatement(name, sql)
+    elif statement.sql != sql:
+        raise ValueError(f"Prepared statement {name} is already registered with different SQL")
+    return statement
+
+
+def prepared_statement_stats() -> list:
+    """Per-statement PREPARE count, executions and hits (executions that reused a PREPARE)."""
+    with _prepared_lock:
+        return [
+            {
+                "name": statement.name,
+                "prepares": statement.prepares,
+                "executions": statement.executions,
+                "hits": statement.executions - statement.prepares,
+            }
+            for statement in _statements.values()
+        ]
+
+
 def close_pool():
     """Gracefully close all connections in the pool."""
     if pool and not pool.closed:
@@ -0,0 +1,25 @@
+"""
+gunicorn settings, picked up automatically from the working directory.
+
+Only the Prometheus multiprocess bookkeeping lives here; workers, bind
+address and worker class stay on the command line (see Dockerfile).
+"""
+
+import glob
+import os
+
+
+def on_starting(server):
+    # Values left over from a previous run would be summed into the new one
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges (in-flight requests, checked-out connections) of a dead worker
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,160 @@
+"""
+Prometheus metrics for GRAAVITONS SMS Backend, served at GET /metrics.
+
+Metrics are module-level prometheus_client objects updated where the work
+happens (request middleware, db_pool, bcrypt helpers, uploads). Under
+gunicorn every worker keeps its own values; set PROMETHEUS_MULTIPROC_DIR to
+an empty, writable directory and the endpoint reports the sum over all
+workers (gunicorn.conf.py clears the directory on start and drops the files
+of dead workers).
+
+What to look at when sizing:
+    DB_POOL_MAX      graavitons_db_pool_checked_out against
+                     graavitons_db_pool_max_connections, and
+                     graavitons_db_pool_checkout_seconds /
+                     graavitons_db_pool_exhausted_total
+    gunicorn workers graavitons_http_requests_in_flight and the share of
+                     graavitons_http_request_duration_seconds spent in
+                     graavitons_http_request_db_seconds (the rest is Python)
+"""
+
+import asyncio
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# ── HTTP ──
+HTTP_REQUEST_DURATION = Histogram(
+    "graavitons_http_request_duration_seconds",
+    "Time from request start to the last response chunk, by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    "graavitons_http_request_db_seconds",
+    "Time spent in database statements while handling a request",
+    ["method", "route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    "graavitons_http_request_queries",
+    "Database statements run while handling a request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "graavitons_http_requests_in_flight",
+    "Requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+# ── Database pool ──
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "graavitons_db_pool_max_connections",
+    "DB_POOL_MAX of each live worker's pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "graavitons_db_pool_checked_out",
+    "Pooled connections currently handed out by get_db_connection",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "graavitons_db_pool_checkout_seconds",
+    "Time get_db_connection takes, including the health check and any reconnect",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1),
+)
+DB_POOL_EXHAUSTED = Counter(
+    "graavitons_db_pool_exhausted_total",
+    "get_db_connection calls rejected because every pooled connection was in use",
+)
+DB_POOL_CONNECTIONS_CREATED = Counter(
+    "graavitons_db_pool_connections_created_total",
+    "Physical connections opened by the pool",
+)
+DB_POOL_HEALTH_CHECK_FAILURES = Counter(
+    "graavitons_db_pool_health_check_failures_total",
+    "Pooled connections found closed or broken by get_db_connection",
+    ["reason"],
+)
+
+# ── Prepared statement cache ──
+# Hit ratio: 1 - prepares / executions
+PREPARED_STATEMENT_EXECUTIONS = Counter(
+    "graavitons_prepared_statement_executions_total",
+    "Executions of registered prepared statements",
+    ["statement"],
+)
+PREPARED_STATEMENT_PREPARES = Counter(
+    "graavitons_prepared_statement_prepares_total",
+    "Executions that had to PREPARE the statement on their connection first",
+    ["statement"],
+)
+
+# ── Jobs and password hashing ──
+JOB_DURATION = Histogram(
+    "graavitons_job_duration_seconds",
+    "Duration of uploads and background jobs",
+    ["job", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+BCRYPT_SECONDS = Histogram(
+    "graavitons_bcrypt_seconds",
+    "Time spent hashing and verifying passwords",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1, 2),
+)
+
+
+def timed_job(job: str):
+    """
+    Decorator recording a function's duration in JOB_DURATION under `job`,
+    with outcome "error" when it raises. Works on route handlers (the
+    signature FastAPI inspects is preserved) and on background tasks.
+    """
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = await func(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    JOB_DURATION.labels(job, outcome).observe(time.perf_counter() - started)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = func(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    JOB_DURATION.labels(job, outcome).observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def render_metrics():
+    """The exposition text and its content type, summed over workers in multiprocess mode."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
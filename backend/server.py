@@ -1,16 +1,27 @@
 import sys
 import os
+import logging
 
 # Add the backend directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from fastapi.staticfiles import StaticFiles
 import uvicorn
-from config import APP_TITLE, CORS_ORIGINS, SERVER_HOST, SERVER_PORT, DEBUG
+from config import (
+    APP_TITLE, CORS_ORIGINS, SERVER_HOST, SERVER_PORT, DEBUG, LOG_LEVEL, METRICS_ENABLED, PROFILING_ENABLED,
+    COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+)
 from db_pool import close_pool
+from api.responses import FastJSONResponse
+from api.compression import CompressionMiddleware
+from api.instrumentation import QueryStatsMiddleware
+from metrics import render_metrics
+
+# Request and slow-query logs are single JSON lines
+logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 
 
 @asynccontextmanager
@@ -22,7 +33,7 @@ async def lifespan(app: FastAPI):
 
 
 # Create main FastAPI app
-app = FastAPI(title=APP_TITLE, lifespan=lifespan)
+app = FastAPI(title=APP_TITLE, lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # CORS configuration
 app.add_middleware(
@@ -33,6 +44,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiles of Admin requests sent with X-Profile (inside compression, so
+# only the handler is profiled)
+if PROFILING_ENABLED:
+    from api.profiling import ProfilingMiddleware
+    app.add_middleware(ProfilingMiddleware)
+
+# gzip / brotli compression of JSON and text responses
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
+
+# Query count and DB time per request (outermost, so the timing covers compression)
+app.add_middleware(QueryStatsMiddleware, expose_header=DEBUG)
+
 # Ensure uploads directory exists
 os.makedirs(os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "avatars"), exist_ok=True)
 
@@ -47,6 +75,7 @@ from api.exam import app as exam_app
 from api.analysis import app as analysis_app
 from api.achiever import app as achiever_app
 from api.auth import app as auth_app
+from api.export import app as export_app
 
 # Mount the routes from sub-applications
 for route in batch_app.routes:
@@ -67,6 +96,14 @@ for route in achiever_app.routes:
 for route in auth_app.routes:
     app.router.routes.append(route)
 
+for route in export_app.routes:
+    app.router.routes.append(route)
+
+if PROFILING_ENABLED:
+    from api.profiling import app as profiling_app
+    for route in profiling_app.routes:
+        app.router.routes.append(route)
+
 @app.get("/")
 async def root():
     return {
@@ -117,10 +154,18 @@ async def root():
             "auth_login": "POST /api/auth/login",
             "auth_register": "POST /api/auth/register",
             "auth_user": "GET /api/auth/user/{user_id}",
+            "metrics": "GET /metrics",
             "docs": "/docs"
         }
     }
 
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics (latency, pool, cache, job and bcrypt timings)"""
+        body, content_type = render_metrics()
+        return Response(content=body, headers={"Content-Type": content_type})
+
 if __name__ == '__main__':
     # Run the FastAPI application
     uvicorn.run(
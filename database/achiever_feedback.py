@@ -52,6 +52,9 @@ def create_achiever_feedback_tables():
                 created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        cursor.execute("""
+            CREATE INDEX idx_achievers_created ON achievers(created_at DESC, achievement_id DESC);
+        """)
         print("✅ achievers table created.")
 
         # ── 2. Student Feedback Table ──
@@ -3,6 +3,8 @@ from psycopg2 import sql
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import date
+from manage_mark_partitions import academic_year, create_partitions
 
 # Load .env from backend directory
 env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
@@ -33,10 +35,15 @@ def create_tables():
         # Drop tables if they exist (in reverse order due to foreign keys)
         print("\nDropping existing tables (if any)...")
         cursor.execute("""
+            DROP TABLE IF EXISTS batch_deletion_job CASCADE;
             DROP TABLE IF EXISTS feedback CASCADE;
             DROP TABLE IF EXISTS achievers CASCADE;
+            DROP VIEW IF EXISTS mock_test_wide;
+            DROP TABLE IF EXISTS mock_test_subject_mark CASCADE;
             DROP TABLE IF EXISTS mock_test CASCADE;
             DROP TABLE IF EXISTS daily_test CASCADE;
+            DROP TABLE IF EXISTS exam_subject CASCADE;
+            DROP TABLE IF EXISTS exam CASCADE;
             DROP TABLE IF EXISTS counselling_detail CASCADE;
             DROP TABLE IF EXISTS entrance_exams CASCADE;
             DROP TABLE IF EXISTS twelfth_mark CASCADE;
@@ -114,6 +121,7 @@ def create_tables():
                 email VARCHAR(255),
                 photo_url VARCHAR(255),
                 school_name VARCHAR(255),
+                sort_key TEXT GENERATED ALWAYS AS (CASE WHEN student_id ~ '^[0-9]+$' THEN '0' || LPAD(student_id, 20, '0') ELSE '1' || student_id END) STORED,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
         """)
@@ -218,50 +226,143 @@ def create_tables():
             );
         """)
         
+        # Create exam table (one row per unit test / monthly test of a batch)
+        print("Creating exam table...")
+        cursor.execute("""
+            CREATE TABLE exam (
+                exam_id BIGSERIAL PRIMARY KEY,
+                batch_id BIGINT REFERENCES batch(batch_id) ON DELETE CASCADE,
+                exam_type VARCHAR(10) NOT NULL CHECK (exam_type IN ('daily', 'mock')),
+                exam_name VARCHAR(255),
+                test_date DATE NOT NULL,
+                subject VARCHAR(100),
+                unit_name VARCHAR(255),
+                subject_key VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(COALESCE(subject, '')))) STORED,
+                unit_key TEXT NOT NULL DEFAULT '',
+                subject_total_marks INT,
+                test_total_marks INT,
+                version INT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (batch_id, exam_type, test_date, subject_key, unit_key)
+            );
+        """)
+
+        # Create exam_subject table (subject totals and units of a monthly test)
+        print("Creating exam_subject table...")
+        cursor.execute("""
+            CREATE TABLE exam_subject (
+                exam_id BIGINT NOT NULL REFERENCES exam(exam_id) ON DELETE CASCADE,
+                subject_key VARCHAR(50) NOT NULL,
+                total_marks INT,
+                unit_names TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY (exam_id, subject_key)
+            );
+        """)
+        
         # Create daily_test table
         print("Creating daily_test table...")
         cursor.execute("""
             CREATE TABLE daily_test (
-                test_id BIGSERIAL PRIMARY KEY,
+                test_id BIGSERIAL,
                 student_no BIGINT REFERENCES student(student_no) ON DELETE CASCADE,
+                exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE,
                 grade INT,
                 board VARCHAR(100),
-                test_date DATE,
+                test_date DATE NOT NULL,
                 subject VARCHAR(100),
                 unit_name VARCHAR(100),
                 total_marks VARCHAR(20),
                 subject_total_marks INT,
                 test_total_marks INT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
+                subject_key VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(subject))) STORED,
+                unit_key VARCHAR(100) GENERATED ALWAYS AS (COALESCE(unit_name, '')) STORED,
+                version INT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (test_id, test_date)
+            ) PARTITION BY RANGE (test_date);
         """)
         
         # Create mock_test table
         print("Creating mock_test table...")
         cursor.execute("""
             CREATE TABLE mock_test (
-                test_id BIGSERIAL PRIMARY KEY,
+                test_id BIGSERIAL,
                 student_no BIGINT REFERENCES student(student_no) ON DELETE CASCADE,
+                exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE,
                 grade INT,
                 board VARCHAR(100),
-                test_date DATE,
-                maths_marks VARCHAR(20),
-                physics_marks VARCHAR(20),
-                biology_marks VARCHAR(20),
-                chemistry_marks VARCHAR(20),
-                maths_total_marks INT,
-                physics_total_marks INT,
-                chemistry_total_marks INT,
-                biology_total_marks INT,
+                test_date DATE NOT NULL,
+                unit_key TEXT NOT NULL DEFAULT '',
                 test_total_marks INT,
-                maths_unit_names TEXT[],
-                chemistry_unit_names TEXT[],
-                biology_unit_names TEXT[],
-                physics_unit_names TEXT[],
                 total_marks VARCHAR(20),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                version INT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (test_id, test_date)
+            ) PARTITION BY RANGE (test_date);
+        """)
+
+        # Create mock_test_subject_mark table (one row per mock test and subject)
+        print("Creating mock_test_subject_mark table...")
+        cursor.execute("""
+            CREATE TABLE mock_test_subject_mark (
+                test_id BIGINT NOT NULL,
+                test_date DATE NOT NULL,
+                subject_key VARCHAR(50) NOT NULL,
+                marks VARCHAR(20),
+                total_marks INT,
+                unit_names TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY (test_id, subject_key),
+                FOREIGN KEY (test_id, test_date) REFERENCES mock_test(test_id, test_date) ON DELETE CASCADE
             );
         """)
+
+        # Wide per-subject view of mock tests for existing reads
+        print("Creating mock_test_wide view...")
+        cursor.execute("""
+            CREATE OR REPLACE VIEW mock_test_wide AS
+            SELECT
+                mt.test_id,
+                mt.student_no,
+                mt.grade,
+                mt.board,
+                mt.test_date,
+                sm.maths_marks,
+                sm.physics_marks,
+                sm.chemistry_marks,
+                sm.biology_marks,
+                sm.maths_total_marks,
+                sm.physics_total_marks,
+                sm.chemistry_total_marks,
+                sm.biology_total_marks,
+                mt.test_total_marks,
+                sm.maths_unit_names,
+                sm.physics_unit_names,
+                sm.chemistry_unit_names,
+                sm.biology_unit_names,
+                mt.total_marks,
+                mt.unit_key,
+                mt.version,
+                mt.created_at,
+                mt.exam_id
+            FROM mock_test mt
+            CROSS JOIN LATERAL (
+                SELECT
+                    MAX(marks) FILTER (WHERE subject_key = 'maths') AS maths_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'physics') AS physics_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'biology') AS biology_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'maths') AS maths_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'physics') AS physics_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'biology') AS biology_total_marks,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'maths'), '{}') AS maths_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'physics'), '{}') AS physics_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'chemistry'), '{}') AS chemistry_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'biology'), '{}') AS biology_unit_names
+                FROM mock_test_subject_mark
+                WHERE test_id = mt.test_id
+            ) sm;
+        """)
         
         # Create feedback table
         print("Creating feedback table...")
@@ -290,17 +391,64 @@ def create_tables():
             );
         """)
 
+        # Create batch_deletion_job table (progress of background batch deletions;
+        # no foreign key so the job outlives the batch it deletes)
+        print("Creating batch_deletion_job table...")
+        cursor.execute("""
+            CREATE TABLE batch_deletion_job (
+                job_id BIGSERIAL PRIMARY KEY,
+                batch_id BIGINT NOT NULL,
+                batch_name VARCHAR(50),
+                status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+                students_total INT NOT NULL DEFAULT 0,
+                students_deleted INT NOT NULL DEFAULT 0,
+                photos_removed INT NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_batch_deletion_job_batch ON batch_deletion_job(batch_id, job_id DESC);
+        """)
+
         # Create indexes for report and analysis performance
         print("Creating performance indexes...")
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_student_batch_id ON student(batch_id);
             CREATE INDEX IF NOT EXISTS idx_student_admission_no ON student(student_id);
+            CREATE INDEX IF NOT EXISTS idx_student_batch_sort ON student(batch_id, sort_key);
             CREATE INDEX IF NOT EXISTS idx_daily_test_student_date ON daily_test(student_no, test_date);
             CREATE INDEX IF NOT EXISTS idx_daily_test_batch_key ON daily_test(test_date, subject, unit_name);
             CREATE INDEX IF NOT EXISTS idx_mock_test_student_date ON mock_test(student_no, test_date);
             CREATE INDEX IF NOT EXISTS idx_mock_test_date ON mock_test(test_date);
-            CREATE INDEX IF NOT EXISTS idx_feedback_student_date ON feedback(student_no, feedback_date DESC);
+            CREATE INDEX IF NOT EXISTS idx_daily_test_exam ON daily_test(exam_id);
+            CREATE INDEX IF NOT EXISTS idx_mock_test_exam ON mock_test(exam_id);
+            CREATE INDEX IF NOT EXISTS idx_feedback_student_date ON feedback(student_no, feedback_date DESC, feedback_id DESC);
+            CREATE INDEX IF NOT EXISTS idx_achievers_created ON achievers(created_at DESC, achievement_id DESC);
+        """)
+
+        # Trigram indexes serving substring and fuzzy student search
+        print("Creating student search indexes...")
+        cursor.execute("""
+            CREATE EXTENSION IF NOT EXISTS pg_trgm;
+            CREATE INDEX IF NOT EXISTS idx_student_id_trgm ON student USING GIN (student_id gin_trgm_ops);
+            CREATE INDEX IF NOT EXISTS idx_student_name_trgm ON student USING GIN (student_name gin_trgm_ops);
         """)
+
+        # Natural keys used by INSERT ... ON CONFLICT mark upserts
+        print("Creating mark upsert keys...")
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_test_student_test
+                ON daily_test(student_no, test_date, subject_key, unit_key);
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_mock_test_student_test
+                ON mock_test(student_no, test_date, unit_key);
+        """)
+
+        # Academic-year partitions of the marks tables (later years are added
+        # by manage_mark_partitions.py)
+        print("Creating marks table partitions...")
+        current_year = academic_year(date.today())
+        for name in create_partitions(cursor, current_year, current_year + 1):
+            print(f"  - {name}")
         
         # Commit all changes
         conn.commit()
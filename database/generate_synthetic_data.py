@@ -0,0 +1,455 @@
+"""
+Load-testing script: Generate a synthetic dataset
+Creates batches spread over several academic years, each with students
+(plus parent info, 10th/12th marks, entrance exams and counselling
+details), unit tests and monthly tests. The unit and monthly test marks
+mix in absent marks ('A' and '-') the way teachers enter them. Everything
+is loaded with COPY, one transaction per batch, so 10x / 100x the
+production volume loads in minutes.
+
+Scores follow a normal distribution around --mean. Each student gets a
+fixed ability offset (--spread), each subject a fixed difficulty, and each
+test some noise (--noise), so rankings, weak subjects and at-risk students
+come out realistic. --seed makes a run reproducible.
+
+Generated batches are named "SYN-<year>-<n>". --remove deletes them, with
+all their students and tests:
+
+    python generate_synthetic_data.py                                   # 4 batches x 60 students
+    python generate_synthetic_data.py --batches 40 --students 150 --years 4
+    python generate_synthetic_data.py --unit-tests 40 --mock-tests 12 --absent-rate 0.1
+    python generate_synthetic_data.py --remove
+
+Never run this against the production database.
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import psycopg2
+from dotenv import load_dotenv
+from pathlib import Path
+
+from manage_mark_partitions import ACADEMIC_YEAR_START_MONTH, academic_year, create_partitions
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+BATCH_PREFIX = 'SYN-'
+
+# Batch type -> subjects, as configured on real batches
+BATCH_TYPES = {
+    'NEET': ['Physics', 'Chemistry', 'Biology'],
+    'JEE': ['Maths', 'Physics', 'Chemistry'],
+}
+
+# Added to a student's score in each subject (percentage points)
+SUBJECT_DIFFICULTY = {'maths': -6, 'physics': -8, 'chemistry': -2, 'biology': 4}
+
+# Subjects stored per monthly test (api/exam.py MOCK_SUBJECTS)
+MOCK_SUBJECTS = ['maths', 'physics', 'chemistry', 'biology']
+
+UNIT_TEST_TOTALS = [25, 50, 50, 100]
+UNITS_PER_SUBJECT = 12
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Akash', 'Anjali', 'Arjun', 'Bhavya', 'Deepak', 'Divya', 'Gokul', 'Harini',
+    'Karthik', 'Kavya', 'Lakshmi', 'Manoj', 'Meena', 'Naveen', 'Nithya', 'Pradeep', 'Priya', 'Rahul',
+    'Revathi', 'Sanjay', 'Shalini', 'Surya', 'Swathi', 'Tharun', 'Vignesh', 'Vishnu', 'Yamini', 'Keerthana',
+]
+LAST_NAMES = [
+    'Kumar', 'Raj', 'Krishnan', 'Subramanian', 'Ramesh', 'Murugan', 'Sundaram', 'Natarajan', 'Iyer', 'Pillai',
+    'Balaji', 'Selvam', 'Ganesan', 'Venkatesh', 'Shankar', 'Mohan', 'Prakash', 'Rajendran', 'Anand', 'Srinivasan',
+]
+COMMUNITIES = ['OC', 'BC', 'BCM', 'MBC', 'SC', 'ST']
+COMMUNITY_WEIGHTS = [10, 40, 5, 25, 17, 3]
+OCCUPATIONS = ['Farmer', 'Teacher', 'Engineer', 'Business', 'Driver', 'Doctor', 'Clerk', 'Homemaker']
+SCHOOLS = [
+    'Government Higher Secondary School', 'St. Joseph Matriculation School', 'Vidya Mandir',
+    'Kendriya Vidyalaya', 'Sri Ramakrishna Matric HSS', 'DAV Public School',
+]
+COLLEGES = ['Madras Medical College', 'Stanley Medical College', 'NIT Trichy', 'Anna University', 'IIT Madras', 'PSG Tech']
+
+STUDENT_COLUMNS = [
+    'student_no', 'student_id', 'batch_id', 'student_name', 'dob', 'grade', 'community', 'enrollment_year',
+    'course', 'board', 'gender', 'student_mobile', 'email', 'school_name',
+]
+PARENT_COLUMNS = [
+    'student_no', 'father_name', 'mother_name', 'father_occupation', 'mother_occupation',
+    'father_mobile', 'mother_mobile',
+]
+TENTH_COLUMNS = [
+    'student_no', 'school_name', 'year_of_passing', 'board_of_study',
+    'english', 'tamil', 'maths', 'science', 'social_science', 'total_marks',
+]
+TWELFTH_COLUMNS = [
+    'student_no', 'school_name', 'year_of_passing', 'board_of_study',
+    'english', 'tamil', 'physics', 'chemistry', 'maths', 'biology', 'total_marks',
+]
+ENTRANCE_COLUMNS = ['student_no', 'entrance_exam_1', 'entrance_exam_1_percentile', 'entrance_exam_1_mark']
+COUNSELLING_COLUMNS = [
+    'student_no', 'counselling_forum_1', 'counselling_round_1', 'all_india_rank_1', 'community_rank_1',
+    'counselling_college_1',
+]
+EXAM_COLUMNS = [
+    'exam_id', 'batch_id', 'exam_type', 'exam_name', 'test_date', 'subject', 'unit_name', 'unit_key',
+    'subject_total_marks', 'test_total_marks',
+]
+EXAM_SUBJECT_COLUMNS = ['exam_id', 'subject_key', 'total_marks', 'unit_names']
+DAILY_TEST_COLUMNS = [
+    'student_no', 'exam_id', 'grade', 'board', 'test_date', 'subject', 'unit_name',
+    'total_marks', 'subject_total_marks', 'test_total_marks',
+]
+MOCK_TEST_COLUMNS = [
+    'test_id', 'student_no', 'exam_id', 'grade', 'board', 'test_date', 'unit_key',
+    'test_total_marks', 'total_marks',
+]
+MOCK_SUBJECT_MARK_COLUMNS = ['test_id', 'test_date', 'subject_key', 'marks', 'total_marks', 'unit_names']
+
+
+def copy_rows(cursor, table: str, columns: list, rows) -> int:
+    """COPY rows into table. None is loaded as NULL and '' as an empty string."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(['\\N' if value is None else value for value in row])
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    return count
+
+
+def reserve_ids(cursor, table: str, column: str, count: int) -> list:
+    """Take count values from the serial sequence behind table.column"""
+    cursor.execute(
+        "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+        (table, column, count)
+    )
+    return [r[0] for r in cursor.fetchall()]
+
+
+def pg_array(values) -> str:
+    return '{' + ','.join(f'"{v}"' for v in values) + '}'
+
+
+def mock_unit_key(unit_names_by_subject: dict) -> str:
+    """Same canonical form as api/exam.py mock_unit_key"""
+    return ';'.join(
+        f"{subject}:{','.join(units)}"
+        for subject, units in sorted(unit_names_by_subject.items())
+        if units
+    )
+
+
+def test_dates(rng, year: int, count: int, weekday: int) -> list:
+    """count distinct dates on the given weekday between June and March of an academic year, none in the future"""
+    start = date(year, ACADEMIC_YEAR_START_MONTH, 1)
+    end = min(date(year + 1, 3, 31), date.today())
+    days = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+    days = [d for d in days if d.weekday() == weekday] or days
+    return sorted(rng.sample(days, min(count, len(days))))
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.totals = {}
+
+    def count(self, table: str, rows: int):
+        self.totals[table] = self.totals.get(table, 0) + rows
+
+    def percent(self, ability: float, subject_key: str) -> float:
+        score = ability + SUBJECT_DIFFICULTY.get(subject_key, 0) + self.rng.gauss(0, self.args.noise)
+        return min(100.0, max(0.0, score))
+
+    def mark(self, ability: float, subject_key: str, total: int):
+        """A mark out of total as entered in the sheets, or 'A' / '-' for an absent student"""
+        if self.rng.random() < self.args.absent_rate:
+            return self.rng.choice(['A', '-'])
+        return str(round(self.percent(ability, subject_key) * total / 100))
+
+    def generate_batch(self, cursor, batch_number: int, year: int):
+        rng = self.rng
+        args = self.args
+        batch_type = rng.choice(list(BATCH_TYPES))
+        subjects = BATCH_TYPES[batch_type]
+
+        cursor.execute("""
+            INSERT INTO batch (batch_name, start_year, end_year, type, subjects)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING batch_id
+        """, (f"{BATCH_PREFIX}{year}-{batch_number:03d}", year, year + 1, batch_type, subjects))
+        batch_id = cursor.fetchone()[0]
+        self.count('batch', 1)
+
+        # ── Students and their details ──
+        student_nos = reserve_ids(cursor, 'student', 'student_no', args.students)
+        students = []
+        for n, student_no in enumerate(student_nos, start=1):
+            students.append({
+                'student_no': student_no,
+                'board': rng.choices(['CBSE', 'State'], weights=[60, 40])[0],
+                'ability': rng.gauss(args.mean, args.spread),
+                'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'community': rng.choices(COMMUNITIES, weights=COMMUNITY_WEIGHTS)[0],
+                'admission': f"{year}{batch_number:03d}{n:04d}",
+            })
+
+        self.count('student', copy_rows(cursor, 'student', STUDENT_COLUMNS, (
+            (
+                s['student_no'], s['admission'], batch_id, s['name'],
+                date(year - 17, 1, 1) + timedelta(days=rng.randrange(365)), '12', s['community'], year,
+                batch_type, s['board'], rng.choice(['Male', 'Female']),
+                f"9{rng.randrange(10 ** 9):09d}", f"{s['admission']}@example.com", rng.choice(SCHOOLS),
+            )
+            for s in students
+        )))
+        self.count('parent_info', copy_rows(cursor, 'parent_info', PARENT_COLUMNS, (
+            (
+                s['student_no'], f"{rng.choice(FIRST_NAMES)} {s['name'].split()[1]}",
+                f"{rng.choice(FIRST_NAMES)} {s['name'].split()[1]}",
+                rng.choice(OCCUPATIONS), rng.choice(OCCUPATIONS),
+                f"9{rng.randrange(10 ** 9):09d}", f"8{rng.randrange(10 ** 9):09d}",
+            )
+            for s in students
+        )))
+
+        def board_mark(s, subject_key=''):
+            return round(min(100.0, self.percent(s['ability'] + 15, subject_key)))
+
+        tenth_rows = []
+        twelfth_rows = []
+        for s in students:
+            tenth = [board_mark(s), board_mark(s), board_mark(s, 'maths'), board_mark(s, 'chemistry'), board_mark(s)]
+            tenth_rows.append((s['student_no'], rng.choice(SCHOOLS), year - 1, s['board'], *tenth, sum(tenth)))
+            twelfth = {key: board_mark(s, key) for key in ('english', 'tamil', 'physics', 'chemistry', 'maths', 'biology')}
+            if batch_type == 'NEET':
+                twelfth['maths'] = None
+            else:
+                twelfth['biology'] = None
+            twelfth_rows.append((
+                s['student_no'], rng.choice(SCHOOLS), year + 1, s['board'], *twelfth.values(),
+                sum(v for v in twelfth.values() if v is not None),
+            ))
+        self.count('tenth_mark', copy_rows(cursor, 'tenth_mark', TENTH_COLUMNS, tenth_rows))
+        self.count('twelfth_mark', copy_rows(cursor, 'twelfth_mark', TWELFTH_COLUMNS, twelfth_rows))
+
+        # Entrance results and counselling only exist once the batch has finished
+        if year < academic_year(date.today()):
+            entrance_rows = []
+            counselling_rows = []
+            max_mark = 720 if batch_type == 'NEET' else 300
+            for s in students:
+                if rng.random() > 0.8:
+                    continue
+                percent = sum(self.percent(s['ability'], subject.lower()) for subject in subjects) / len(subjects)
+                percentile = round(min(99.99, max(0.0, 50 + (percent - args.mean) * 2.5)), 2)
+                entrance_rows.append((
+                    s['student_no'], 'NEET' if batch_type == 'NEET' else 'JEE Main',
+                    percentile, round(percent * max_mark / 100),
+                ))
+                rank = max(1, int((100 - percentile) * 20000) + rng.randrange(500))
+                if percentile > 70 and rng.random() < 0.6:
+                    counselling_rows.append((
+                        s['student_no'], 'TNMCC' if batch_type == 'NEET' else 'TNEA',
+                        rng.randint(1, 3), rank, max(1, rank // 4), rng.choice(COLLEGES),
+                    ))
+            self.count('entrance_exams', copy_rows(cursor, 'entrance_exams', ENTRANCE_COLUMNS, entrance_rows))
+            self.count('counselling_detail', copy_rows(cursor, 'counselling_detail', COUNSELLING_COLUMNS, counselling_rows))
+
+        # ── Unit tests: one exam per subject and date ──
+        daily_exams = []
+        for weekday, subject in enumerate(subjects):
+            for i, test_date in enumerate(test_dates(rng, year, args.unit_tests, weekday)):
+                unit_name = f"Unit {i % UNITS_PER_SUBJECT + 1}"
+                total = rng.choice(UNIT_TEST_TOTALS)
+                daily_exams.append((subject, test_date, unit_name, total))
+        exam_ids = reserve_ids(cursor, 'exam', 'exam_id', len(daily_exams))
+        self.count('exam', copy_rows(cursor, 'exam', EXAM_COLUMNS, (
+            (exam_id, batch_id, 'daily', None, test_date, subject, unit_name, unit_name, total, total)
+            for exam_id, (subject, test_date, unit_name, total) in zip(exam_ids, daily_exams)
+        )))
+        self.count('daily_test', copy_rows(cursor, 'daily_test', DAILY_TEST_COLUMNS, (
+            (
+                s['student_no'], exam_id, 12, s['board'], test_date, subject, unit_name,
+                self.mark(s['ability'], subject.lower(), total), total, total,
+            )
+            for exam_id, (subject, test_date, unit_name, total) in zip(exam_ids, daily_exams)
+            for s in students
+        )))
+
+        # ── Monthly tests: one exam per date, marks per subject ──
+        mock_subjects = [subject.lower() for subject in subjects if subject.lower() in MOCK_SUBJECTS]
+        mock_exams = []
+        for i, test_date in enumerate(test_dates(rng, year, args.mock_tests, 5)):
+            unit_names = {key: [f"{key[0].upper()}{i % UNITS_PER_SUBJECT + 1}"] for key in mock_subjects}
+            subject_totals = {key: 180 if key == 'biology' else 120 for key in mock_subjects}
+            mock_exams.append((i + 1, test_date, unit_names, subject_totals))
+        exam_ids = reserve_ids(cursor, 'exam', 'exam_id', len(mock_exams))
+        self.count('exam', copy_rows(cursor, 'exam', EXAM_COLUMNS, (
+            (
+                exam_id, batch_id, 'mock', f"Monthly Test {number}", test_date, None, None,
+                mock_unit_key(unit_names), None, sum(subject_totals.values()),
+            )
+            for exam_id, (number, test_date, unit_names, subject_totals) in zip(exam_ids, mock_exams)
+        )))
+        self.count('exam_subject', copy_rows(cursor, 'exam_subject', EXAM_SUBJECT_COLUMNS, (
+            (exam_id, key, subject_totals[key], pg_array(unit_names[key]))
+            for exam_id, (_, _, unit_names, subject_totals) in zip(exam_ids, mock_exams)
+            for key in mock_subjects
+        )))
+
+        test_ids = iter(reserve_ids(cursor, 'mock_test', 'test_id', len(mock_exams) * len(students)))
+        mock_rows = []
+        subject_rows = []
+        for exam_id, (_, test_date, unit_names, subject_totals) in zip(exam_ids, mock_exams):
+            test_total = sum(subject_totals.values())
+            for s in students:
+                test_id = next(test_ids)
+                # Monthly tests are missed as a whole
+                absent = rng.random() < self.args.absent_rate
+                marks = {
+                    key: rng.choice(['A', '-']) if absent else str(round(self.percent(s['ability'], key) * subject_totals[key] / 100))
+                    for key in mock_subjects
+                }
+                total = 'A' if absent else str(sum(int(m) for m in marks.values()))
+                mock_rows.append((
+                    test_id, s['student_no'], exam_id, 12, s['board'], test_date,
+                    mock_unit_key(unit_names), test_total, total,
+                ))
+                subject_rows.extend(
+                    (test_id, test_date, key, marks[key], subject_totals[key], pg_array(unit_names[key]))
+                    for key in mock_subjects
+                )
+        self.count('mock_test', copy_rows(cursor, 'mock_test', MOCK_TEST_COLUMNS, mock_rows))
+        self.count('mock_test_subject_mark', copy_rows(cursor, 'mock_test_subject_mark', MOCK_SUBJECT_MARK_COLUMNS, subject_rows))
+
+
+def generate(args):
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+
+        last_year = academic_year(date.today())
+        first_year = last_year - args.years + 1
+
+        # Tests of past years belong in their own partitions, not the DEFAULT one
+        for name in create_partitions(cursor, first_year, last_year):
+            print(f"  ✅ Created partition {name}")
+        conn.commit()
+
+        generator = Generator(args)
+        started = time.perf_counter()
+        for batch_number in range(1, args.batches + 1):
+            year = first_year + (batch_number - 1) % args.years
+            generator.generate_batch(cursor, batch_number, year)
+            conn.commit()
+            print(f"  ✅ Batch {batch_number}/{args.batches} ({year}-{year + 1}) loaded")
+
+        print("\nAnalyzing tables...")
+        for table in generator.totals:
+            cursor.execute(f"ANALYZE {table}")
+        conn.commit()
+
+        print(f"\n✅ Synthetic data generated in {time.perf_counter() - started:.1f}s")
+        for table, rows in generator.totals.items():
+            print(f"  - {table}: {rows:,} rows")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+def remove():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+
+        # Students first: batch has no ON DELETE CASCADE to them; their details
+        # and marks cascade from student, the exams from batch
+        cursor.execute("""
+            DELETE FROM student
+            WHERE batch_id IN (SELECT batch_id FROM batch WHERE batch_name LIKE %s)
+        """, (f"{BATCH_PREFIX}%",))
+        students = cursor.rowcount
+        cursor.execute("DELETE FROM batch WHERE batch_name LIKE %s", (f"{BATCH_PREFIX}%",))
+        batches = cursor.rowcount
+        conn.commit()
+        print(f"\n✅ Removed {batches} synthetic batches and {students} students")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic batches, students and marks for load testing")
+    parser.add_argument('--batches', type=int, default=4, help="Batches to create (default: 4)")
+    parser.add_argument('--students', type=int, default=60, help="Students per batch (default: 60)")
+    parser.add_argument('--years', type=int, default=3,
+                        help="Academic years the batches are spread over, ending with the current one (default: 3)")
+    parser.add_argument('--unit-tests', type=int, default=24, help="Unit tests per subject and batch (default: 24)")
+    parser.add_argument('--mock-tests', type=int, default=8, help="Monthly tests per batch (default: 8)")
+    parser.add_argument('--absent-rate', type=float, default=0.05,
+                        help="Share of marks entered as absent, 'A' or '-' (default: 0.05)")
+    parser.add_argument('--mean', type=float, default=62, help="Mean score in percent (default: 62)")
+    parser.add_argument('--spread', type=float, default=14,
+                        help="Standard deviation of student ability in percentage points (default: 14)")
+    parser.add_argument('--noise', type=float, default=9,
+                        help="Standard deviation of a single test around a student's ability (default: 9)")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed for a reproducible dataset")
+    parser.add_argument('--remove', action='store_true', help="Delete all previously generated batches instead")
+    args = parser.parse_args()
+
+    if args.remove:
+        remove()
+    else:
+        generate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Maintenance script: Academic-year partitions of daily_test and mock_test
+Both marks tables are range-partitioned on test_date, one partition per
+academic year (e.g. daily_test_2025_26 holds June 2025 - May 2026), plus a
+DEFAULT partition catching dates no year partition covers yet.
+
+Run this script at least once a year (a cron job is fine) to create the
+partitions ahead of time:
+
+    python manage_mark_partitions.py                 # current + next year
+    python manage_mark_partitions.py --years-ahead 3
+    python manage_mark_partitions.py --detach-before 2020
+
+--detach-before detaches the partitions of academic years that started
+before the given year. Detached partitions stay in the database as plain
+tables (e.g. daily_test_2019_20, with the monthly test subject marks copied
+to mock_test_subject_mark_2019_20) and can be dumped and dropped to archive
+them; they are no longer visible through daily_test / mock_test.
+"""
+
+import argparse
+import psycopg2
+from psycopg2 import sql
+import os
+from datetime import date
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+# First month of the academic year (June)
+ACADEMIC_YEAR_START_MONTH = int(os.getenv('ACADEMIC_YEAR_START_MONTH', '6'))
+
+PARTITIONED_TABLES = ['daily_test', 'mock_test']
+
+# Tables whose rows reference a partitioned table with ON DELETE CASCADE and
+# must be carried along when rows are moved out of the DEFAULT partition
+DEPENDENT_TABLES = {'mock_test': 'mock_test_subject_mark'}
+
+
+def academic_year(d: date) -> int:
+    """Starting calendar year of the academic year containing d"""
+    return d.year if d.month >= ACADEMIC_YEAR_START_MONTH else d.year - 1
+
+
+def partition_name(table: str, year: int) -> str:
+    return f"{table}_{year}_{(year + 1) % 100:02d}"
+
+
+def partition_bounds(year: int) -> tuple:
+    return date(year, ACADEMIC_YEAR_START_MONTH, 1), date(year + 1, ACADEMIC_YEAR_START_MONTH, 1)
+
+
+def _insertable_columns(cursor, table: str) -> list:
+    """Columns of table that accept explicit values (generated columns are skipped)"""
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (table,))
+    return [r[0] for r in cursor.fetchall()]
+
+
+def create_default_partition(cursor, table: str):
+    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+        sql.Identifier(f"{table}_default"), sql.Identifier(table)
+    ))
+
+
+def create_year_partition(cursor, table: str, year: int) -> bool:
+    """
+    Create the partition of one academic year if it does not exist yet.
+    Rows of that year already sitting in the DEFAULT partition are moved into it.
+    Returns True when a partition was created.
+    """
+    name = partition_name(table, year)
+    cursor.execute("SELECT to_regclass(%s)", (name,))
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    start, end = partition_bounds(year)
+    default_name = f"{table}_default"
+    cursor.execute("SELECT to_regclass(%s)", (default_name,))
+    has_default = cursor.fetchone()[0] is not None
+
+    moved = 0
+    if has_default:
+        # Postgres refuses to add a partition while the DEFAULT partition holds
+        # rows of its range, so park them (and their dependent rows) first
+        columns = sql.SQL(", ").join(map(sql.Identifier, _insertable_columns(cursor, table)))
+        cursor.execute(sql.SQL("""
+            CREATE TEMP TABLE _moved_rows ON COMMIT DROP AS
+            SELECT {columns} FROM {default} WHERE test_date >= %s AND test_date < %s
+        """).format(columns=columns, default=sql.Identifier(default_name)), (start, end))
+        moved = cursor.rowcount
+
+        dependent = DEPENDENT_TABLES.get(table)
+        if moved and dependent:
+            cursor.execute(sql.SQL("""
+                CREATE TEMP TABLE _moved_dependent_rows ON COMMIT DROP AS
+                SELECT d.* FROM {dependent} d JOIN _moved_rows m ON m.test_id = d.test_id
+            """).format(dependent=sql.Identifier(dependent)))
+
+        if moved:
+            cursor.execute(sql.SQL("DELETE FROM {} WHERE test_date >= %s AND test_date < %s").format(
+                sql.Identifier(default_name)
+            ), (start, end))
+
+    cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+        sql.Identifier(name), sql.Identifier(table)
+    ), (start, end))
+
+    if moved:
+        cursor.execute(sql.SQL("INSERT INTO {table} ({columns}) SELECT {columns} FROM _moved_rows").format(
+            table=sql.Identifier(table), columns=columns
+        ))
+        if DEPENDENT_TABLES.get(table):
+            cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM _moved_dependent_rows").format(
+                sql.Identifier(DEPENDENT_TABLES[table])
+            ))
+            cursor.execute("DROP TABLE _moved_dependent_rows")
+    if has_default:
+        cursor.execute("DROP TABLE _moved_rows")
+    return True
+
+
+def create_partitions(cursor, first_year: int, last_year: int) -> list:
+    """Create year partitions first_year..last_year of every marks table; returns the names created"""
+    created = []
+    for table in PARTITIONED_TABLES:
+        create_default_partition(cursor, table)
+        for year in range(first_year, last_year + 1):
+            if create_year_partition(cursor, table, year):
+                created.append(partition_name(table, year))
+    return created
+
+
+def detach_partitions_before(cursor, year: int) -> list:
+    """Detach year partitions of academic years starting before year; returns the names detached"""
+    detached = []
+    for table in PARTITIONED_TABLES:
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            ORDER BY c.relname
+        """, (table,))
+        for (name,) in cursor.fetchall():
+            suffix = name[len(table) + 1:]
+            if not suffix[:4].isdigit() or int(suffix[:4]) >= year:
+                continue
+            dependent = DEPENDENT_TABLES.get(table)
+            if dependent:
+                # Dependent rows are copied next to the detached partition
+                # (e.g. mock_test_subject_mark_2019_20) before they are removed
+                cursor.execute(sql.SQL("""
+                    CREATE TABLE {archive} AS
+                    SELECT d.* FROM {dependent} d JOIN {partition} p ON p.test_id = d.test_id
+                """).format(
+                    archive=sql.Identifier(f"{dependent}_{suffix}"),
+                    dependent=sql.Identifier(dependent),
+                    partition=sql.Identifier(name),
+                ))
+                cursor.execute(sql.SQL("DELETE FROM {} d USING {} p WHERE d.test_id = p.test_id").format(
+                    sql.Identifier(dependent), sql.Identifier(name)
+                ))
+            cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                sql.Identifier(table), sql.Identifier(name)
+            ))
+            detached.append(name)
+    return detached
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create / detach academic-year partitions of the marks tables")
+    parser.add_argument('--years-ahead', type=int, default=1,
+                        help="Academic years after the current one to create partitions for (default: 1)")
+    parser.add_argument('--detach-before', type=int, default=None,
+                        help="Detach partitions of academic years starting before this year")
+    args = parser.parse_args()
+
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+
+        current_year = academic_year(date.today())
+        created = create_partitions(cursor, current_year, current_year + args.years_ahead)
+        for name in created:
+            print(f"  ✅ Created partition {name}")
+        if not created:
+            print("  ✅ All partitions already exist")
+
+        if args.detach_before is not None:
+            for name in detach_partitions_before(cursor, args.detach_before):
+                print(f"  ✅ Detached partition {name}")
+
+        conn.commit()
+        print("\n✅ Partition maintenance completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Migration script: Background batch deletion jobs
+Deleting a batch now runs as a background job that removes students in
+chunks; batch_deletion_job records each job's progress so the client can
+poll it.
+
+Run this script ONCE against your existing database.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Batch deletion jobs ---\n")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS batch_deletion_job (
+                job_id BIGSERIAL PRIMARY KEY,
+                batch_id BIGINT NOT NULL,
+                batch_name VARCHAR(50),
+                status VARCHAR(20) NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+                students_total INT NOT NULL DEFAULT 0,
+                students_deleted INT NOT NULL DEFAULT 0,
+                photos_removed INT NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+        """)
+        print("  ✅ batch_deletion_job table created")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_batch_deletion_job_batch
+            ON batch_deletion_job(batch_id, job_id DESC);
+        """)
+        print("  ✅ idx_batch_deletion_job_batch created")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Batch Deletion Jobs Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will create the batch_deletion_job table.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
@@ -0,0 +1,234 @@
+"""
+Migration script: Add the exam table
+Each unit test / monthly test of a batch becomes one exam row, and the
+daily_test and mock_test mark rows reference it through exam_id. Mark groups
+are then addressed by exam_id instead of by their (date, subject, unit, totals)
+value tuple.
+
+Run this script ONCE against your existing database, after
+migrate_mock_subject_marks.py. Totals for an exam are taken from the most
+recently inserted mark row of that test.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Add exam table ---\n")
+
+        # 1. exam header tables
+        print("Creating exam tables...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS exam (
+                exam_id BIGSERIAL PRIMARY KEY,
+                batch_id BIGINT REFERENCES batch(batch_id) ON DELETE CASCADE,
+                exam_type VARCHAR(10) NOT NULL CHECK (exam_type IN ('daily', 'mock')),
+                exam_name VARCHAR(255),
+                test_date DATE NOT NULL,
+                subject VARCHAR(100),
+                unit_name VARCHAR(255),
+                subject_key VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(COALESCE(subject, '')))) STORED,
+                unit_key TEXT NOT NULL DEFAULT '',
+                subject_total_marks INT,
+                test_total_marks INT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (batch_id, exam_type, test_date, subject_key, unit_key)
+            );
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS exam_subject (
+                exam_id BIGINT NOT NULL REFERENCES exam(exam_id) ON DELETE CASCADE,
+                subject_key VARCHAR(50) NOT NULL,
+                total_marks INT,
+                unit_names TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY (exam_id, subject_key)
+            );
+        """)
+        print("  ✅ exam / exam_subject created")
+
+        cursor.execute("""
+            ALTER TABLE daily_test
+            ADD COLUMN IF NOT EXISTS exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE;
+        """)
+        cursor.execute("""
+            ALTER TABLE mock_test
+            ADD COLUMN IF NOT EXISTS exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE;
+        """)
+        print("  ✅ daily_test.exam_id / mock_test.exam_id added")
+
+        # 2. Daily tests: one exam per batch, date, subject and unit
+        print("\nBackfilling daily test exams...")
+        cursor.execute("""
+            INSERT INTO exam (
+                batch_id, exam_type, test_date, subject, unit_name, unit_key,
+                subject_total_marks, test_total_marks, created_at
+            )
+            SELECT DISTINCT ON (s.batch_id, dt.test_date, dt.subject_key, dt.unit_key)
+                s.batch_id, 'daily', dt.test_date, dt.subject, dt.unit_name, dt.unit_key,
+                dt.subject_total_marks, dt.test_total_marks, dt.created_at
+            FROM daily_test dt
+            JOIN student s ON s.student_no = dt.student_no
+            WHERE dt.exam_id IS NULL AND dt.test_date IS NOT NULL
+            ORDER BY s.batch_id, dt.test_date, dt.subject_key, dt.unit_key, dt.created_at DESC, dt.test_id DESC
+            ON CONFLICT (batch_id, exam_type, test_date, subject_key, unit_key) DO NOTHING
+        """)
+        print(f"  ✅ {cursor.rowcount} daily exams created")
+
+        cursor.execute("""
+            UPDATE daily_test dt
+            SET exam_id = e.exam_id
+            FROM student s, exam e
+            WHERE s.student_no = dt.student_no
+              AND e.batch_id = s.batch_id
+              AND e.exam_type = 'daily'
+              AND e.test_date = dt.test_date
+              AND e.subject_key = dt.subject_key
+              AND e.unit_key = dt.unit_key
+              AND dt.exam_id IS NULL
+        """)
+        print(f"  ✅ {cursor.rowcount} daily_test rows linked")
+
+        # 3. Mock tests: one exam per batch, date and unit combination
+        print("\nBackfilling mock test exams...")
+        cursor.execute("""
+            INSERT INTO exam (batch_id, exam_type, test_date, unit_key, test_total_marks, created_at)
+            SELECT DISTINCT ON (s.batch_id, mt.test_date, mt.unit_key)
+                s.batch_id, 'mock', mt.test_date, mt.unit_key, mt.test_total_marks, mt.created_at
+            FROM mock_test mt
+            JOIN student s ON s.student_no = mt.student_no
+            WHERE mt.exam_id IS NULL AND mt.test_date IS NOT NULL
+            ORDER BY s.batch_id, mt.test_date, mt.unit_key, mt.created_at DESC, mt.test_id DESC
+            ON CONFLICT (batch_id, exam_type, test_date, subject_key, unit_key) DO NOTHING
+        """)
+        print(f"  ✅ {cursor.rowcount} mock exams created")
+
+        cursor.execute("""
+            UPDATE mock_test mt
+            SET exam_id = e.exam_id
+            FROM student s, exam e
+            WHERE s.student_no = mt.student_no
+              AND e.batch_id = s.batch_id
+              AND e.exam_type = 'mock'
+              AND e.test_date = mt.test_date
+              AND e.subject_key = ''
+              AND e.unit_key = mt.unit_key
+              AND mt.exam_id IS NULL
+        """)
+        print(f"  ✅ {cursor.rowcount} mock_test rows linked")
+
+        cursor.execute("""
+            INSERT INTO exam_subject (exam_id, subject_key, total_marks, unit_names)
+            SELECT DISTINCT ON (mt.exam_id, sm.subject_key)
+                mt.exam_id, sm.subject_key, sm.total_marks, sm.unit_names
+            FROM mock_test mt
+            JOIN mock_test_subject_mark sm ON sm.test_id = mt.test_id
+            WHERE mt.exam_id IS NOT NULL
+            ORDER BY mt.exam_id, sm.subject_key, mt.created_at DESC, mt.test_id DESC
+            ON CONFLICT (exam_id, subject_key) DO NOTHING
+        """)
+        print(f"  ✅ {cursor.rowcount} exam_subject rows created")
+
+        # 4. Indexes and the wide view (now exposes exam_id)
+        print("\nCreating indexes...")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_test_exam ON daily_test(exam_id);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mock_test_exam ON mock_test(exam_id);")
+        print("  ✅ idx_daily_test_exam / idx_mock_test_exam created")
+
+        cursor.execute("""
+            CREATE OR REPLACE VIEW mock_test_wide AS
+            SELECT
+                mt.test_id,
+                mt.student_no,
+                mt.grade,
+                mt.board,
+                mt.test_date,
+                sm.maths_marks,
+                sm.physics_marks,
+                sm.chemistry_marks,
+                sm.biology_marks,
+                sm.maths_total_marks,
+                sm.physics_total_marks,
+                sm.chemistry_total_marks,
+                sm.biology_total_marks,
+                mt.test_total_marks,
+                sm.maths_unit_names,
+                sm.physics_unit_names,
+                sm.chemistry_unit_names,
+                sm.biology_unit_names,
+                mt.total_marks,
+                mt.unit_key,
+                mt.version,
+                mt.created_at,
+                mt.exam_id
+            FROM mock_test mt
+            CROSS JOIN LATERAL (
+                SELECT
+                    MAX(marks) FILTER (WHERE subject_key = 'maths') AS maths_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'physics') AS physics_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'biology') AS biology_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'maths') AS maths_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'physics') AS physics_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'biology') AS biology_total_marks,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'maths'), '{}') AS maths_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'physics'), '{}') AS physics_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'chemistry'), '{}') AS chemistry_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'biology'), '{}') AS biology_unit_names
+                FROM mock_test_subject_mark
+                WHERE test_id = mt.test_id
+            ) sm;
+        """)
+        print("  ✅ mock_test_wide view updated")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Exam Table Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will create the exam table and link existing daily_test and mock_test rows to it.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
@@ -0,0 +1,88 @@
+"""
+Migration script: Add a version column to the exam header table
+The group version used for edit conflict checks moves from the mark rows to
+the exam header. Every write to a test (upload, group edit, group delete)
+bumps it under a row lock, so it always rises when the group changes.
+
+Run this script ONCE against your existing database, after migrate_exam_entity.py.
+Existing tests start at the highest version of their mark rows, so screens
+opened before the migration can still save.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Add version column to exam ---\n")
+
+        cursor.execute("""
+            ALTER TABLE exam
+            ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+        """)
+        print("  ✅ exam.version added")
+
+        for table in ['daily_test', 'mock_test']:
+            cursor.execute(f"""
+                UPDATE exam e
+                SET version = g.version
+                FROM (
+                    SELECT exam_id, MAX(version) AS version
+                    FROM {table}
+                    GROUP BY exam_id
+                ) g
+                WHERE e.exam_id = g.exam_id
+                  AND e.version < g.version
+            """)
+            print(f"  ✅ {cursor.rowcount} exam versions carried over from {table}")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Exam Version Column Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will add a version column to exam.\nExisting data will be preserved. Continue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
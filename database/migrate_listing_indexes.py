@@ -0,0 +1,81 @@
+"""
+Migration script: Indexes for keyset-paginated listings
+The achievers and feedback listings page on (created_at, achievement_id) and
+(feedback_date, feedback_id); these indexes let each page be read straight
+off the index in order instead of sorting the whole table.
+
+Run this script ONCE against your existing database.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Listing pagination indexes ---\n")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_achievers_created
+            ON achievers(created_at DESC, achievement_id DESC);
+        """)
+        print("  ✅ idx_achievers_created created")
+
+        # The feedback index gains feedback_id as a tie-breaker for entries
+        # sharing a date
+        cursor.execute("DROP INDEX IF EXISTS idx_feedback_student_date")
+        cursor.execute("""
+            CREATE INDEX idx_feedback_student_date
+            ON feedback(student_no, feedback_date DESC, feedback_id DESC);
+        """)
+        print("  ✅ idx_feedback_student_date rebuilt")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Listing Indexes Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will add / rebuild the achievers and feedback listing indexes.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
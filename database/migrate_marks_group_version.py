@@ -0,0 +1,74 @@
+"""
+Migration script: Add a version column to daily_test and mock_test
+Every write bumps the row version. The manage-marks screen sends back the
+group version it loaded, so a save made on stale data is rejected (409)
+instead of silently overwriting another teacher's edits.
+
+Run this script ONCE against your existing database.
+Existing rows start at version 1.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Add version column to mark tables ---\n")
+
+        for table in ['daily_test', 'mock_test']:
+            cursor.execute(f"""
+                ALTER TABLE {table}
+                ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+            """)
+            print(f"  ✅ {table}.version added")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Mark Version Column Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will add a version column to daily_test and mock_test.\nExisting data will be preserved. Continue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
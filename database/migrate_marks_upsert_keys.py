@@ -0,0 +1,129 @@
+"""
+Migration script: Add natural unique keys to daily_test and mock_test
+Mark uploads use INSERT ... ON CONFLICT on these keys, so re-uploading a
+corrected sheet overwrites the existing marks instead of duplicating them.
+
+Run this script ONCE against your existing database.
+Duplicate mark rows for the same student and test are removed first,
+keeping the most recently inserted row (highest test_id).
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+MOCK_UNIT_COLUMNS = ['maths_unit_names', 'physics_unit_names', 'chemistry_unit_names', 'biology_unit_names']
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Add mark upsert keys ---\n")
+
+        # 1. daily_test: generated key columns, so subject casing and a missing
+        #    unit name resolve to the same test
+        print("Adding daily_test key columns...")
+        cursor.execute("""
+            ALTER TABLE daily_test
+            ADD COLUMN IF NOT EXISTS subject_key VARCHAR(100)
+                GENERATED ALWAYS AS (LOWER(TRIM(subject))) STORED,
+            ADD COLUMN IF NOT EXISTS unit_key VARCHAR(100)
+                GENERATED ALWAYS AS (COALESCE(unit_name, '')) STORED;
+        """)
+        print("  ✅ daily_test.subject_key / unit_key added")
+
+        cursor.execute("""
+            DELETE FROM daily_test dt
+            USING daily_test newer
+            WHERE newer.student_no = dt.student_no
+              AND newer.test_date = dt.test_date
+              AND newer.subject_key = dt.subject_key
+              AND newer.unit_key = dt.unit_key
+              AND newer.test_id > dt.test_id
+        """)
+        print(f"  ✅ Removed {cursor.rowcount} duplicate daily_test rows")
+
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_test_student_test
+            ON daily_test(student_no, test_date, subject_key, unit_key);
+        """)
+        print("  ✅ uq_daily_test_student_test created")
+
+        # 2. mock_test: unit name arrays become NOT NULL so they can take part
+        #    in the unique key (NULLs never conflict)
+        print("\nAltering mock_test unit name columns...")
+        for col in MOCK_UNIT_COLUMNS:
+            cursor.execute(f"UPDATE mock_test SET {col} = '{{}}' WHERE {col} IS NULL")
+            cursor.execute(f"""
+                ALTER TABLE mock_test
+                ALTER COLUMN {col} SET DEFAULT '{{}}',
+                ALTER COLUMN {col} SET NOT NULL;
+            """)
+            print(f"  ✅ mock_test.{col} set NOT NULL DEFAULT '{{}}'")
+
+        cursor.execute("""
+            DELETE FROM mock_test mt
+            USING mock_test newer
+            WHERE newer.student_no = mt.student_no
+              AND newer.test_date = mt.test_date
+              AND newer.maths_unit_names = mt.maths_unit_names
+              AND newer.physics_unit_names = mt.physics_unit_names
+              AND newer.chemistry_unit_names = mt.chemistry_unit_names
+              AND newer.biology_unit_names = mt.biology_unit_names
+              AND newer.test_id > mt.test_id
+        """)
+        print(f"  ✅ Removed {cursor.rowcount} duplicate mock_test rows")
+
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_mock_test_student_test
+            ON mock_test(student_no, test_date, maths_unit_names, physics_unit_names, chemistry_unit_names, biology_unit_names);
+        """)
+        print("  ✅ uq_mock_test_student_test created")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Mark Upsert Keys Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will remove duplicate mark rows and add unique keys to daily_test and mock_test.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
@@ -0,0 +1,195 @@
+"""
+Migration script: Move mock_test subject columns into mock_test_subject_mark
+mock_test keeps one header row per student and test. Marks, totals and unit
+names of each subject move to mock_test_subject_mark (one row per subject),
+so new subjects need no schema change. The mock_test_wide view exposes the
+old maths_/physics_/chemistry_/biology_ columns for existing reads.
+
+Run this script ONCE against your existing database, after
+migrate_marks_upsert_keys.py and migrate_marks_group_version.py.
+All marks are copied before the wide columns are dropped.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+MOCK_SUBJECTS = ['maths', 'physics', 'chemistry', 'biology']
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: mock_test subject columns → mock_test_subject_mark ---\n")
+
+        # 1. Long-format subject table
+        print("Creating mock_test_subject_mark table...")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS mock_test_subject_mark (
+                test_id BIGINT NOT NULL REFERENCES mock_test(test_id) ON DELETE CASCADE,
+                subject_key VARCHAR(50) NOT NULL,
+                marks VARCHAR(20),
+                total_marks INT,
+                unit_names TEXT[] NOT NULL DEFAULT '{}',
+                PRIMARY KEY (test_id, subject_key)
+            );
+        """)
+        print("  ✅ mock_test_subject_mark created")
+
+        # 2. Copy subject data, skipping subjects with no mark, total or units
+        values = ",\n".join(
+            f"('{s}', mt.{s}_marks, mt.{s}_total_marks, COALESCE(mt.{s}_unit_names, ARRAY[]::text[]))"
+            for s in MOCK_SUBJECTS
+        )
+        cursor.execute(f"""
+            INSERT INTO mock_test_subject_mark (test_id, subject_key, marks, total_marks, unit_names)
+            SELECT mt.test_id, v.subject_key, v.marks, v.total_marks, v.unit_names
+            FROM mock_test mt
+            CROSS JOIN LATERAL (VALUES {values}) AS v(subject_key, marks, total_marks, unit_names)
+            WHERE v.marks IS NOT NULL OR v.total_marks IS NOT NULL OR cardinality(v.unit_names) > 0
+            ON CONFLICT (test_id, subject_key) DO NOTHING
+        """)
+        print(f"  ✅ Copied {cursor.rowcount} subject rows")
+
+        # 3. Header unit key (same format as mock_unit_key() in backend/api/exam.py)
+        print("\nAdding mock_test.unit_key...")
+        cursor.execute("ALTER TABLE mock_test ADD COLUMN IF NOT EXISTS unit_key TEXT NOT NULL DEFAULT ''")
+        cursor.execute("""
+            UPDATE mock_test mt
+            SET unit_key = k.unit_key
+            FROM (
+                SELECT
+                    test_id,
+                    string_agg(subject_key || ':' || array_to_string(unit_names, ','), ';' ORDER BY subject_key COLLATE "C") AS unit_key
+                FROM mock_test_subject_mark
+                WHERE cardinality(unit_names) > 0
+                GROUP BY test_id
+            ) k
+            WHERE k.test_id = mt.test_id
+        """)
+        print(f"  ✅ unit_key set on {cursor.rowcount} rows")
+
+        cursor.execute("""
+            DELETE FROM mock_test mt
+            USING mock_test newer
+            WHERE newer.student_no = mt.student_no
+              AND newer.test_date = mt.test_date
+              AND newer.unit_key = mt.unit_key
+              AND newer.test_id > mt.test_id
+        """)
+        print(f"  ✅ Removed {cursor.rowcount} duplicate mock_test rows")
+
+        # 4. Drop the wide columns (drops the old unit-array unique index too)
+        print("\nDropping wide subject columns...")
+        cursor.execute("DROP VIEW IF EXISTS mock_test_wide")
+        for s in MOCK_SUBJECTS:
+            cursor.execute(f"""
+                ALTER TABLE mock_test
+                DROP COLUMN IF EXISTS {s}_marks,
+                DROP COLUMN IF EXISTS {s}_total_marks,
+                DROP COLUMN IF EXISTS {s}_unit_names;
+            """)
+            print(f"  ✅ mock_test.{s}_* dropped")
+
+        cursor.execute("""
+            DROP INDEX IF EXISTS uq_mock_test_student_test;
+            CREATE UNIQUE INDEX uq_mock_test_student_test
+            ON mock_test(student_no, test_date, unit_key);
+        """)
+        print("  ✅ uq_mock_test_student_test recreated on (student_no, test_date, unit_key)")
+
+        # 5. Compatibility view
+        print("\nCreating mock_test_wide view...")
+        cursor.execute("""
+            CREATE OR REPLACE VIEW mock_test_wide AS
+            SELECT
+                mt.test_id,
+                mt.student_no,
+                mt.grade,
+                mt.board,
+                mt.test_date,
+                sm.maths_marks,
+                sm.physics_marks,
+                sm.chemistry_marks,
+                sm.biology_marks,
+                sm.maths_total_marks,
+                sm.physics_total_marks,
+                sm.chemistry_total_marks,
+                sm.biology_total_marks,
+                mt.test_total_marks,
+                sm.maths_unit_names,
+                sm.physics_unit_names,
+                sm.chemistry_unit_names,
+                sm.biology_unit_names,
+                mt.total_marks,
+                mt.unit_key,
+                mt.version,
+                mt.created_at
+            FROM mock_test mt
+            CROSS JOIN LATERAL (
+                SELECT
+                    MAX(marks) FILTER (WHERE subject_key = 'maths') AS maths_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'physics') AS physics_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'biology') AS biology_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'maths') AS maths_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'physics') AS physics_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'biology') AS biology_total_marks,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'maths'), '{}') AS maths_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'physics'), '{}') AS physics_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'chemistry'), '{}') AS chemistry_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'biology'), '{}') AS biology_unit_names
+                FROM mock_test_subject_mark
+                WHERE test_id = mt.test_id
+            ) sm;
+        """)
+        print("  ✅ mock_test_wide created")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Mock Test Subject Marks Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will move mock_test subject columns into mock_test_subject_mark and drop the wide columns.\nBack up the database first. Continue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
@@ -0,0 +1,250 @@
+"""
+Migration script: Partition daily_test and mock_test by academic year
+Both marks tables become range-partitioned on test_date with one partition
+per academic year (June - May) plus a DEFAULT partition, so date-filtered
+queries only scan the years they ask for and old years can be detached and
+archived (see manage_mark_partitions.py).
+
+Run this script ONCE against your existing database, after
+migrate_exam_entity.py. Rows are copied into the new tables, keeping their
+test_id. Rows without a test_date cannot be placed in a partition and are
+removed (the count is printed).
+"""
+
+import psycopg2
+import os
+from datetime import date
+from dotenv import load_dotenv
+from pathlib import Path
+
+from manage_mark_partitions import academic_year, create_partitions
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+DAILY_TEST_COLUMNS = (
+    'test_id, student_no, exam_id, grade, board, test_date, subject, unit_name, '
+    'total_marks, subject_total_marks, test_total_marks, version, created_at'
+)
+MOCK_TEST_COLUMNS = (
+    'test_id, student_no, exam_id, grade, board, test_date, unit_key, '
+    'test_total_marks, total_marks, version, created_at'
+)
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Partition marks tables by academic year ---\n")
+
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = 'daily_test'")
+        if cursor.fetchone()[0] == 'p':
+            print("  ✅ daily_test is already partitioned, nothing to do")
+            return
+
+        # 1. Set the old tables aside
+        print("Renaming existing tables...")
+        cursor.execute("DROP VIEW IF EXISTS mock_test_wide")
+        cursor.execute("""
+            ALTER TABLE mock_test_subject_mark
+            DROP CONSTRAINT IF EXISTS mock_test_subject_mark_test_id_fkey
+        """)
+        for table in ('daily_test', 'mock_test'):
+            cursor.execute(f"DELETE FROM {table} WHERE test_date IS NULL")
+            print(f"  ✅ Removed {cursor.rowcount} {table} rows without a test_date")
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            cursor.execute(f"ALTER INDEX {table}_pkey RENAME TO {table}_old_pkey")
+        print("  ✅ daily_test / mock_test renamed to *_old")
+
+        # 2. Partitioned tables, reusing the existing test_id sequences
+        print("\nCreating partitioned tables...")
+        cursor.execute("""
+            CREATE TABLE daily_test (
+                test_id BIGINT NOT NULL DEFAULT nextval('daily_test_test_id_seq'),
+                student_no BIGINT REFERENCES student(student_no) ON DELETE CASCADE,
+                exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE,
+                grade INT,
+                board VARCHAR(100),
+                test_date DATE NOT NULL,
+                subject VARCHAR(100),
+                unit_name VARCHAR(100),
+                total_marks VARCHAR(20),
+                subject_total_marks INT,
+                test_total_marks INT,
+                subject_key VARCHAR(100) GENERATED ALWAYS AS (LOWER(TRIM(subject))) STORED,
+                unit_key VARCHAR(100) GENERATED ALWAYS AS (COALESCE(unit_name, '')) STORED,
+                version INT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (test_id, test_date)
+            ) PARTITION BY RANGE (test_date);
+        """)
+        cursor.execute("""
+            CREATE TABLE mock_test (
+                test_id BIGINT NOT NULL DEFAULT nextval('mock_test_test_id_seq'),
+                student_no BIGINT REFERENCES student(student_no) ON DELETE CASCADE,
+                exam_id BIGINT REFERENCES exam(exam_id) ON DELETE CASCADE,
+                grade INT,
+                board VARCHAR(100),
+                test_date DATE NOT NULL,
+                unit_key TEXT NOT NULL DEFAULT '',
+                test_total_marks INT,
+                total_marks VARCHAR(20),
+                version INT NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (test_id, test_date)
+            ) PARTITION BY RANGE (test_date);
+        """)
+        cursor.execute("ALTER SEQUENCE daily_test_test_id_seq OWNED BY daily_test.test_id")
+        cursor.execute("ALTER SEQUENCE mock_test_test_id_seq OWNED BY mock_test.test_id")
+        print("  ✅ daily_test / mock_test created")
+
+        # 3. One partition per academic year present in the data, through next year
+        cursor.execute("""
+            SELECT MIN(test_date), MAX(test_date)
+            FROM (
+                SELECT test_date FROM daily_test_old
+                UNION ALL
+                SELECT test_date FROM mock_test_old
+            ) d
+        """)
+        first_date, last_date = cursor.fetchone()
+        next_year = academic_year(date.today()) + 1
+        first_year = academic_year(first_date) if first_date else next_year - 1
+        last_year = max(academic_year(last_date), next_year) if last_date else next_year
+        for name in create_partitions(cursor, first_year, last_year):
+            print(f"  ✅ Created partition {name}")
+
+        # 4. Copy rows
+        print("\nCopying rows...")
+        cursor.execute(f"INSERT INTO daily_test ({DAILY_TEST_COLUMNS}) SELECT {DAILY_TEST_COLUMNS} FROM daily_test_old")
+        print(f"  ✅ {cursor.rowcount} daily_test rows copied")
+        cursor.execute(f"INSERT INTO mock_test ({MOCK_TEST_COLUMNS}) SELECT {MOCK_TEST_COLUMNS} FROM mock_test_old")
+        print(f"  ✅ {cursor.rowcount} mock_test rows copied")
+
+        # 5. Subject marks reference (test_id, test_date) now
+        cursor.execute("ALTER TABLE mock_test_subject_mark ADD COLUMN IF NOT EXISTS test_date DATE")
+        cursor.execute("""
+            UPDATE mock_test_subject_mark sm
+            SET test_date = mt.test_date
+            FROM mock_test mt
+            WHERE mt.test_id = sm.test_id
+        """)
+        cursor.execute("DELETE FROM mock_test_subject_mark WHERE test_date IS NULL")
+        print(f"  ✅ Removed {cursor.rowcount} orphaned mock_test_subject_mark rows")
+        cursor.execute("""
+            ALTER TABLE mock_test_subject_mark
+            ALTER COLUMN test_date SET NOT NULL,
+            ADD FOREIGN KEY (test_id, test_date) REFERENCES mock_test(test_id, test_date) ON DELETE CASCADE;
+        """)
+        print("  ✅ mock_test_subject_mark.test_date added")
+
+        cursor.execute("DROP TABLE daily_test_old")
+        cursor.execute("DROP TABLE mock_test_old")
+        print("  ✅ Old tables dropped")
+
+        # 6. Indexes (created on the parent, so every partition gets them) and the view
+        print("\nCreating indexes...")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daily_test_student_date ON daily_test(student_no, test_date);
+            CREATE INDEX IF NOT EXISTS idx_daily_test_batch_key ON daily_test(test_date, subject, unit_name);
+            CREATE INDEX IF NOT EXISTS idx_mock_test_student_date ON mock_test(student_no, test_date);
+            CREATE INDEX IF NOT EXISTS idx_mock_test_date ON mock_test(test_date);
+            CREATE INDEX IF NOT EXISTS idx_daily_test_exam ON daily_test(exam_id);
+            CREATE INDEX IF NOT EXISTS idx_mock_test_exam ON mock_test(exam_id);
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_daily_test_student_test
+                ON daily_test(student_no, test_date, subject_key, unit_key);
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_mock_test_student_test
+                ON mock_test(student_no, test_date, unit_key);
+        """)
+        print("  ✅ Indexes created")
+
+        cursor.execute("""
+            CREATE OR REPLACE VIEW mock_test_wide AS
+            SELECT
+                mt.test_id,
+                mt.student_no,
+                mt.grade,
+                mt.board,
+                mt.test_date,
+                sm.maths_marks,
+                sm.physics_marks,
+                sm.chemistry_marks,
+                sm.biology_marks,
+                sm.maths_total_marks,
+                sm.physics_total_marks,
+                sm.chemistry_total_marks,
+                sm.biology_total_marks,
+                mt.test_total_marks,
+                sm.maths_unit_names,
+                sm.physics_unit_names,
+                sm.chemistry_unit_names,
+                sm.biology_unit_names,
+                mt.total_marks,
+                mt.unit_key,
+                mt.version,
+                mt.created_at,
+                mt.exam_id
+            FROM mock_test mt
+            CROSS JOIN LATERAL (
+                SELECT
+                    MAX(marks) FILTER (WHERE subject_key = 'maths') AS maths_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'physics') AS physics_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_marks,
+                    MAX(marks) FILTER (WHERE subject_key = 'biology') AS biology_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'maths') AS maths_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'physics') AS physics_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'chemistry') AS chemistry_total_marks,
+                    MAX(total_marks) FILTER (WHERE subject_key = 'biology') AS biology_total_marks,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'maths'), '{}') AS maths_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'physics'), '{}') AS physics_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'chemistry'), '{}') AS chemistry_unit_names,
+                    COALESCE(MAX(unit_names) FILTER (WHERE subject_key = 'biology'), '{}') AS biology_unit_names
+                FROM mock_test_subject_mark
+                WHERE test_id = mt.test_id
+            ) sm;
+        """)
+        print("  ✅ mock_test_wide view recreated")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Marks Partitioning Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will rebuild daily_test and mock_test as tables partitioned by academic year.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
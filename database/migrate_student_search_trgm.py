@@ -0,0 +1,86 @@
+"""
+Migration script: Add trigram indexes for student search
+Enables the pg_trgm extension and adds GIN trigram indexes on
+student.student_id and student.student_name, so substring searches
+(ILIKE '%q%') and fuzzy name matches use an index instead of scanning
+every student.
+
+Run this script ONCE against your existing database. pg_trgm ships with
+PostgreSQL and is a trusted extension (PG 13+), so the database owner can
+enable it; on older servers a superuser has to run it.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Student search trigram indexes ---\n")
+
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        print("  ✅ pg_trgm extension enabled")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_student_id_trgm
+            ON student USING GIN (student_id gin_trgm_ops);
+        """)
+        print("  ✅ idx_student_id_trgm created")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_student_name_trgm
+            ON student USING GIN (student_name gin_trgm_ops);
+        """)
+        print("  ✅ idx_student_name_trgm created")
+
+        cursor.execute("ANALYZE student;")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Student Search Index Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will enable pg_trgm and add trigram indexes on the student table.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
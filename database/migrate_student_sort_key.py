@@ -0,0 +1,89 @@
+"""
+Migration script: Add a stored natural-sort key to student
+Rosters are ordered by admission number with numeric ids first (by value)
+and the rest alphabetically. student.sort_key stores that order as a
+generated column, and the (batch_id, sort_key) index returns a batch's
+students already ordered, without a regex and cast per row at query time.
+It replaces the plain batch_id index.
+
+Run this script ONCE against your existing database. Adding a stored
+generated column rewrites the student table.
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Load .env from backend directory
+env_path = Path(__file__).resolve().parent.parent / "backend" / ".env"
+load_dotenv(dotenv_path=env_path)
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': int(os.getenv('DB_PORT', '5432')),
+    'database': os.getenv('DB_NAME', 'graavitons_db'),
+    'user': os.getenv('DB_USER', 'graav_user'),
+    'password': os.getenv('DB_PASSWORD', ''),
+}
+
+
+def migrate():
+    conn = None
+    cursor = None
+
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        cursor = conn.cursor()
+
+        print("Connected to database successfully!")
+        print("\n--- Migration: Add student sort key ---\n")
+
+        cursor.execute("""
+            ALTER TABLE student
+            ADD COLUMN IF NOT EXISTS sort_key TEXT GENERATED ALWAYS AS (
+                CASE WHEN student_id ~ '^[0-9]+$' THEN '0' || LPAD(student_id, 20, '0') ELSE '1' || student_id END
+            ) STORED;
+        """)
+        print("  ✅ student.sort_key added")
+
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_student_batch_sort
+            ON student(batch_id, sort_key);
+        """)
+        print("  ✅ idx_student_batch_sort created")
+
+        # (batch_id, sort_key) also serves plain batch_id lookups
+        cursor.execute("DROP INDEX IF EXISTS idx_student_batch_id;")
+        print("  ✅ idx_student_batch_id dropped (superseded)")
+
+        cursor.execute("ANALYZE student;")
+
+        conn.commit()
+        print("\n✅ Migration completed successfully!")
+
+    except psycopg2.Error as e:
+        print(f"\n❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+        print("\nDatabase connection closed.")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("GRAAVITONS SMS - Student Sort Key Migration")
+    print("=" * 60)
+
+    confirmation = input("\nThis will add a generated sort_key column and index to the student table.\nContinue? (yes/no): ")
+
+    if confirmation.lower() == 'yes':
+        migrate()
+    else:
+        print("Migration cancelled.")
@@ -7,6 +7,8 @@ import { API_BASE } from '../config';
 import { authFetch } from '../utils/api';
 import { useToast } from './Toast';
 
+const PAGE_SIZE = 24;
+
 const AchieversSection = ({ onBack }) => {
     const toast = useToast();
     const [selectedStudent, setSelectedStudent] = useState(null);
@@ -14,6 +16,8 @@ const AchieversSection = ({ onBack }) => {
     const [achieversList, setAchieversList] = useState([]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     // Fetch achievers from API on mount
     useEffect(() => {
@@ -24,10 +28,11 @@ const AchieversSection = ({ onBack }) => {
         setLoading(true);
         setError('');
         try {
-            const response = await authFetch(`${API_BASE}/api/achiever`);
+            const response = await authFetch(`${API_BASE}/api/achiever?limit=${PAGE_SIZE}`);
             if (!response.ok) throw new Error(`Failed to fetch achievers: ${response.statusText}`);
             const data = await response.json();
             setAchieversList(data.achievers || []);
+            setNextCursor(data.next_cursor || null);
         } catch (err) {
             console.error('Error fetching achievers:', err);
             setError(err.message);
@@ -36,6 +41,25 @@ const AchieversSection = ({ onBack }) => {
         }
     };
 
+    const loadMoreAchievers = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const response = await authFetch(
+                `${API_BASE}/api/achiever?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(nextCursor)}`
+            );
+            if (!response.ok) throw new Error(`Failed to fetch achievers: ${response.statusText}`);
+            const data = await response.json();
+            setAchieversList(prev => [...prev, ...(data.achievers || [])]);
+            setNextCursor(data.next_cursor || null);
+        } catch (err) {
+            console.error('Error fetching achievers:', err);
+            toast.error(err.message);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleAchieverClick = (achiever) => {
         setSelectedStudent(achiever);
     };
@@ -127,6 +151,14 @@ const AchieversSection = ({ onBack }) => {
                     ))}
                 </div>
             )}
+
+            {!loading && nextCursor && (
+                <div style={{ textAlign: 'center', padding: '20px' }}>
+                    <button className="add-achiever-btn" onClick={loadMoreAchievers} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
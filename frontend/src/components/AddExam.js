@@ -879,7 +879,8 @@ const AddExam = ({ batch, students, onBack, onSave }) => {
           `Total Exams Parsed: ${result.total_tests_parsed}\n` +
           `Successful: ${result.successful_exams}\n` +
           `Failed: ${result.failed_exams_count}\n` +
-          `Inserted Records: ${result.total_inserted_records}`
+          `Inserted Records: ${result.total_inserted_records}\n` +
+          `Overwritten Records: ${result.total_updated_records}`
         );
 
         onSave({ ...examData, bulk: true });
@@ -928,7 +929,8 @@ const AddExam = ({ batch, students, onBack, onSave }) => {
           `Total Exams: ${result.total_exams}\n` +
           `Successful: ${result.successful_exams}\n` +
           `Failed: ${result.failed_exams_count}\n` +
-          `Inserted Records: ${result.total_inserted_records}`
+          `Inserted Records: ${result.total_inserted_records}\n` +
+          `Overwritten Records: ${result.total_updated_records}`
         );
 
         onSave({ ...examData, bulk: true, bulk_count: excelBulkUpload.exams.length });
@@ -998,6 +1000,9 @@ const AddExam = ({ batch, students, onBack, onSave }) => {
       // Show success message with details
       let successMessage = `${result.message}\n\n`;
       successMessage += `Inserted: ${result.inserted_count}/${result.total_students} students\n`;
+      if (result.updated_count > 0) {
+        successMessage += `Overwritten: ${result.updated_count} students\n`;
+      }
       
       if (result.failed_students && result.failed_students.length > 0) {
         successMessage += `\nFailed students:\n`;
@@ -281,7 +281,7 @@ const AddStudent = ({ batch, onBack, onSave, editMode = false, studentNo = null
       setUploadResult(result);
       
       if (result.success_count > 0) {
-        toast.success(`Upload completed!\nSuccessfully added: ${result.success_count} students\nErrors: ${result.error_count}`);
+        toast.success(`Upload completed!\nSuccessfully added: ${result.success_count} students\nErrors: ${result.error_count}\nWarnings: ${result.warning_count || 0}`);
       } else if (result.success_count === 0 && result.error_count > 0) {
         toast.error(`Upload failed!\nNo students were added to the database.\nErrors: ${result.error_count}\n\nThis usually happens when students already exist in the database or required fields are missing.`);
       } else {
@@ -515,17 +515,22 @@ const AddStudent = ({ batch, onBack, onSave, editMode = false, studentNo = null
             {uploadResult && (
               <div style={{
                 padding: '15px',
-                backgroundColor: uploadResult.error_count === 0 ? '#d4edda' : '#fff3cd',
-                color: uploadResult.error_count === 0 ? '#155724' : '#856404',
+                backgroundColor: uploadResult.error_count === 0 && !uploadResult.warning_count ? '#d4edda' : '#fff3cd',
+                color: uploadResult.error_count === 0 && !uploadResult.warning_count ? '#155724' : '#856404',
                 borderRadius: '8px',
                 marginBottom: '20px',
-                border: `1px solid ${uploadResult.error_count === 0 ? '#c3e6cb' : '#ffeaa7'}`
+                border: `1px solid ${uploadResult.error_count === 0 && !uploadResult.warning_count ? '#c3e6cb' : '#ffeaa7'}`
               }}>
                 <h4 style={{ margin: '0 0 10px 0' }}>Upload Results:</h4>
                 <p style={{ margin: '5px 0' }}>✅ Successfully added: {uploadResult.success_count} students</p>
-                {uploadResult.error_count > 0 && (
+                {(uploadResult.error_count > 0 || uploadResult.warning_count > 0) && (
                   <>
-                    <p style={{ margin: '5px 0' }}>❌ Errors: {uploadResult.error_count}</p>
+                    {uploadResult.error_count > 0 && (
+                      <p style={{ margin: '5px 0' }}>❌ Errors: {uploadResult.error_count}</p>
+                    )}
+                    {uploadResult.warning_count > 0 && (
+                      <p style={{ margin: '5px 0' }}>⚠️ Warnings (values left blank): {uploadResult.warning_count}</p>
+                    )}
                     {uploadResult.errors && uploadResult.errors.length > 0 && (
                       <div style={{ marginTop: '10px' }}>
                         <strong>Error Details:</strong>
@@ -791,11 +791,11 @@ const BatchDetail = ({ batch, onBack }) => {
               borderRadius: '12px', padding: '20px',
               background: bulkEditResult.error
                 ? '#fee'
-                : bulkEditResult.error_count === 0 ? '#d4edda' : '#fff3cd',
+                : bulkEditResult.error_count === 0 && !bulkEditResult.warning_count ? '#d4edda' : '#fff3cd',
               color: bulkEditResult.error
                 ? '#c00'
-                : bulkEditResult.error_count === 0 ? '#155724' : '#856404',
-              border: `1px solid ${bulkEditResult.error ? '#fcc' : bulkEditResult.error_count === 0 ? '#c3e6cb' : '#ffeaa7'}`,
+                : bulkEditResult.error_count === 0 && !bulkEditResult.warning_count ? '#155724' : '#856404',
+              border: `1px solid ${bulkEditResult.error ? '#fcc' : bulkEditResult.error_count === 0 && !bulkEditResult.warning_count ? '#c3e6cb' : '#ffeaa7'}`,
             }}>
               {bulkEditResult.error ? (
                 <p><strong>Error:</strong> {bulkEditResult.error}</p>
@@ -806,9 +806,14 @@ const BatchDetail = ({ batch, onBack }) => {
                   {bulkEditResult.skipped_count > 0 && (
                     <p style={{ margin: '5px 0' }}>⏭️ Skipped: <strong>{bulkEditResult.skipped_count}</strong> rows</p>
                   )}
-                  {bulkEditResult.error_count > 0 && (
+                  {(bulkEditResult.error_count > 0 || bulkEditResult.warning_count > 0) && (
                     <>
-                      <p style={{ margin: '5px 0' }}>❌ Errors: <strong>{bulkEditResult.error_count}</strong></p>
+                      {bulkEditResult.error_count > 0 && (
+                        <p style={{ margin: '5px 0' }}>❌ Errors: <strong>{bulkEditResult.error_count}</strong></p>
+                      )}
+                      {bulkEditResult.warning_count > 0 && (
+                        <p style={{ margin: '5px 0' }}>⚠️ Warnings (cells skipped): <strong>{bulkEditResult.warning_count}</strong></p>
+                      )}
                       {bulkEditResult.errors && bulkEditResult.errors.length > 0 && (
                         <ul style={{ margin: '10px 0', paddingLeft: '20px' }}>
                           {bulkEditResult.errors.map((err, idx) => (
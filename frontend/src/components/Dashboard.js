@@ -69,7 +69,36 @@ const Dashboard = () => {
         const errData = await response.json();
         throw new Error(errData.detail || 'Failed to delete batch');
       }
+      // Deletion runs in the background; the batch drops out of the list
+      // straight away and the job is polled until it finishes
+      const { job } = await response.json();
+      toast.info(`Deleting "${batchName}" (${job.students_total} students)...`);
       fetchBatches();
+      waitForBatchDeletion(job.job_id, batchName);
+    } catch (err) {
+      toast.error(err.message || 'Failed to delete batch');
+      console.error('Error deleting batch:', err);
+    }
+  };
+
+  const waitForBatchDeletion = async (jobId, batchName) => {
+    try {
+      for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const response = await authFetch(`${API_BASE}/api/batch/deletion-jobs/${jobId}`);
+        if (!response.ok) {
+          throw new Error('Failed to check batch deletion progress');
+        }
+        const job = await response.json();
+        if (job.status === 'completed') {
+          toast.success(`Batch "${batchName}" and all related data deleted`);
+          return;
+        }
+        if (job.status === 'failed') {
+          fetchBatches();
+          throw new Error(`Deleting "${batchName}" failed after ${job.students_deleted} of ${job.students_total} students: ${job.error}`);
+        }
+      }
     } catch (err) {
       toast.error(err.message || 'Failed to delete batch');
       console.error('Error deleting batch:', err);
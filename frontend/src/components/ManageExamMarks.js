@@ -166,11 +166,6 @@ const ManageExamMarks = ({ batchId }) => {
             chemistry_total_marks: examMeta?.chemistry_total_marks ?? selectedGroup.chemistry_total_marks ?? null,
             biology_total_marks: examMeta?.biology_total_marks ?? selectedGroup.biology_total_marks ?? null,
             test_total_marks: examMeta?.test_total_marks ?? selectedGroup.test_total_marks ?? null,
-            original_maths_total_marks: selectedGroup.maths_total_marks ?? null,
-            original_physics_total_marks: selectedGroup.physics_total_marks ?? null,
-            original_chemistry_total_marks: selectedGroup.chemistry_total_marks ?? null,
-            original_biology_total_marks: selectedGroup.biology_total_marks ?? null,
-            original_test_total_marks: selectedGroup.test_total_marks ?? null,
             studentMarks: records.map((r) => ({
               student_id: r.student_id,
               maths_marks: r.maths_marks || '',
@@ -193,6 +188,7 @@ const ManageExamMarks = ({ batchId }) => {
 
       const result = await response.json();
       toast.success(`${result.message}\nUpdated: ${result.updated_count}, Inserted: ${result.inserted_count}, Deleted: ${result.deleted_count}`);
+      setSelectedGroup((prev) => (prev ? { ...prev, version: result.version } : prev));
       await fetchGroups();
     } catch (error) {
       toast.error(error.message || 'Failed to update marks');